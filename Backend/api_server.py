@@ -1,25 +1,46 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from generate_script import GenerateScript
+from generate_script import GenerateScript, StoryNotFoundError
+from job_queue import JobQueue, QueueFullError, UnknownStoryError
+from tool.logmaker import request_id_var, flush_logs, recent_logs
+from tool.metrics import HTTP_REQUESTS_IN_FLIGHT, render as render_metrics
+import asyncio
+import json
 import sys
+from contextlib import asynccontextmanager
 import threading
 import time
+import uuid
 import webbrowser
 from pathlib import Path
+from typing import Optional
 
 # --- Pydantic model for request body ---
 class StoryLine(BaseModel):
     """Request model for receiving text prompts."""
     line: str
 
+# --- Startup/shutdown of background helpers ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the generation service's background tasks for the lifetime of the app."""
+    await generate_script_service.start_background_tasks()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    await generate_script_service.stop_background_tasks()
+    generate_script_service.db_manager.close()
+    flush_logs(timeout=5)
+
 # --- FastAPI application initialization ---
 app = FastAPI(
     title="story gen api",
     description="make story",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware to allow frontend connections
@@ -31,6 +52,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tag every log record written while handling a request with its id
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+    finally:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # Mount static files from React build
 def get_frontend_build_path():
     """Get the correct path to frontend build directory, whether running as script or executable."""
@@ -55,20 +90,292 @@ try:
     generate_script_service = GenerateScript()
 except ValueError:
     # Exit if service cannot be initialized
-    print("Failed to initialize GenerateScript service. Check your API key configuration.")
+    print("Failed to initialize GenerateScript service. Check your API key or AGVN_LLM_BACKEND configuration.")
     sys.exit(1)
 
+# Queued generation jobs run by a bounded worker pool
+job_queue = JobQueue(
+    generate_script_service.db_manager, generate_script_service.generate_script, generate_script_service.run_blocking
+)
+
 # --- API endpoints ---
 @app.post("/generate script", summary="Generate script from prompt")
-async def generate_script(index: int):
-    """Generates a script based on the provided prompt and ws index using Gemini API."""
+async def generate_script(index: int, story_id: Optional[int] = None):
+    """Generates a script based on the provided prompt and ws index using the configured LLM backend.
+
+    ``index=1`` starts a new story (or restarts ``story_id`` if given); later
+    indices continue the story named by ``story_id``, which is returned with
+    every chapter.
+    """
     try:
-        result = generate_script_service.generate_script(index)
+        result = await generate_script_service.generate_script(index, story_id)
         return result
+    except StoryNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         # Handle errors that may occur during API calls
         print(f"An error occurred: {e}")
-        raise HTTPException(status_code=500, detail="Failed to generate content from Gemini API.")
+        if generate_script_service.backend.is_retryable(e):
+            # Every retry failed on a transient error; the request itself is fine
+            raise HTTPException(status_code=503, detail="The LLM backend is temporarily unavailable; try again.")
+        raise HTTPException(status_code=500, detail="Failed to generate content from the LLM backend.")
+
+@app.post("/generate script/stream", summary="Stream a generated script line by line")
+async def stream_script(index: int, story_id: Optional[int] = None):
+    """Streams a generated chapter as newline-delimited JSON events.
+
+    Each line is one of ``{"type": "story_id", ...}`` (always first),
+    ``{"type": "scene_background", ...}``,
+    ``{"type": "script", ...}``, a final ``{"type": "chapter", ...}`` with the
+    saved chapter, or ``{"type": "error", ...}`` if generation fails midway.
+    """
+    async def event_lines():
+        try:
+            async for event, value in generate_script_service.stream_script(index, story_id):
+                payload = {"type": event, event: value}
+                yield json.dumps(payload, ensure_ascii=False) + "\n"
+        except StoryNotFoundError as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            yield json.dumps({"type": "error", "detail": "Failed to generate content from the LLM backend."}) + "\n"
+
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
+@app.websocket("/ws/story/{story_id}")
+async def story_socket(websocket: WebSocket, story_id: int):
+    """One persistent connection per player for generating and following a story.
+
+    Use ``story_id`` 0 to start a new game. The client sends
+    ``{"type": "generate", "index": N}``; the server answers with the events of
+    ``/generate script/stream`` (``story_id``, ``scene_background``, each
+    normalized ``script`` line, ``chapter``, or ``error``) plus ``progress``
+    events (``started``, ``writing``, ``saved`` with the lines so far). It also
+    pushes ``prefetched`` when the next chapter has been generated ahead of time.
+    One chapter is generated at a time per connection; when the socket closes,
+    its running generation is cancelled.
+    """
+    await websocket.accept()
+    outbox = asyncio.Queue()
+    current = story_id or None
+    if current is not None:
+        generate_script_service.subscribe_story(current, outbox)
+
+    async def generate(index: int):
+        nonlocal current
+        lines = 0
+        try:
+            async for event, value in generate_script_service.stream_script(index, current):
+                if event == "story_id":
+                    if value != current:
+                        if current is not None:
+                            generate_script_service.unsubscribe_story(current, outbox)
+                        current = value
+                        generate_script_service.subscribe_story(current, outbox)
+                    outbox.put_nowait({"type": event, event: value})
+                    outbox.put_nowait({"type": "progress", "progress": {"index": index, "stage": "started", "lines": 0}})
+                    continue
+                if event == "script":
+                    lines += 1
+                    if lines == 1:
+                        outbox.put_nowait({"type": "progress", "progress": {"index": index, "stage": "writing", "lines": 0}})
+                outbox.put_nowait({"type": event, event: value})
+                if event == "chapter":
+                    outbox.put_nowait({"type": "progress", "progress": {"index": index, "stage": "saved", "lines": lines}})
+        except StoryNotFoundError as e:
+            outbox.put_nowait({"type": "error", "detail": str(e)})
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            outbox.put_nowait({"type": "error", "detail": "Failed to generate content from the LLM backend."})
+
+    async def send_events():
+        while True:
+            await websocket.send_json(await outbox.get())
+
+    sender = asyncio.create_task(send_events())
+    generation = None
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                message = None
+            if not isinstance(message, dict) or message.get("type") != "generate":
+                outbox.put_nowait({"type": "error", "detail": 'Expected {"type": "generate", "index": N}'})
+                continue
+            index = message.get("index")
+            if not isinstance(index, int) or isinstance(index, bool) or index < 1:
+                outbox.put_nowait({"type": "error", "detail": "index must be a positive integer"})
+            elif generation is not None and not generation.done():
+                outbox.put_nowait({"type": "error", "detail": "A chapter is already being generated"})
+            else:
+                generation = asyncio.create_task(generate(index))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in (generation, sender):
+            if task is not None:
+                task.cancel()
+        if current is not None:
+            generate_script_service.unsubscribe_story(current, outbox)
+        await asyncio.gather(*(task for task in (generation, sender) if task is not None), return_exceptions=True)
+
+# --- Generation jobs ---
+@app.post("/api/jobs", status_code=202, summary="Queue a chapter generation job")
+async def submit_job(index: int, story_id: Optional[int] = None,
+                     priority: str = Query("interactive", description="interactive, speculative or batch")):
+    """Queues generation of chapter ``index`` and returns the job at once.
+
+    Poll ``GET /api/jobs/{id}`` or connect to ``/ws/jobs/{id}`` for progress and
+    the chapter. Returns 429 with a Retry-After header when the queue is full.
+    """
+    try:
+        return await job_queue.submit(index, story_id, priority)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except UnknownStoryError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+@app.get("/api/jobs/{job_id}", summary="Status and result of a generation job")
+async def get_job(job_id: int):
+    """``status`` is queued (with its ``position``), running, done (with ``result``) or failed (with ``error``)."""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.websocket("/ws/jobs/{job_id}")
+async def watch_job(websocket: WebSocket, job_id: int):
+    """Sends the job as JSON now and on every status change, then closes once it finished.
+
+    A client that disconnects is noticed at once, not only at the next update.
+    """
+    await websocket.accept()
+    updates = job_queue.subscribe(job_id)
+
+    async def wait_disconnect():
+        while (await websocket.receive())['type'] != 'websocket.disconnect':
+            pass
+
+    disconnected = asyncio.create_task(wait_disconnect())
+    update = None
+    try:
+        job = await job_queue.get(job_id)
+        if job is None:
+            await websocket.close(code=4404, reason=f"Job {job_id} not found")
+            return
+        await websocket.send_json(job)
+        while job['status'] not in ('done', 'failed'):
+            update = asyncio.create_task(updates.get())
+            await asyncio.wait((update, disconnected), return_when=asyncio.FIRST_COMPLETED)
+            if not update.done():
+                return
+            job = update.result()
+            await websocket.send_json(job)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        job_queue.unsubscribe(job_id, updates)
+        for task in (update, disconnected):
+            if task is not None:
+                task.cancel()
+
+@app.get("/api/jobs", summary="Generation job queue statistics")
+def job_queue_stats():
+    """Waiting and running jobs and lifetime counters of the job queue."""
+    return {
+        "workers": job_queue.workers,
+        "max_depth": job_queue.max_depth,
+        "waiting": {priority: job_queue.depth(priority) for priority in ("interactive", "speculative", "batch")},
+        "running": len(job_queue.running),
+        **job_queue.stats,
+    }
+
+# --- Chapter history (backlog screen) ---
+@app.get("/api/chapters", summary="Page through saved chapters")
+async def list_chapters(story_id: Optional[int] = None, after: Optional[int] = None,
+                        limit: int = Query(20, ge=1, le=100)):
+    """Returns up to ``limit`` chapters with their scripts, oldest first.
+
+    Pass the returned ``next_cursor`` as ``after`` to get the following page;
+    it is null on the last page.
+    """
+    db_manager = generate_script_service.db_manager
+    if story_id is not None and not await generate_script_service.run_blocking(db_manager.story_exists, story_id):
+        raise HTTPException(status_code=404, detail=f"Story {story_id} not found")
+
+    # One extra chapter tells whether another page follows
+    chapters = await generate_script_service.run_blocking(
+        lambda: list(db_manager.iter_chapters(story_id, after, limit + 1))
+    )
+    next_cursor = chapters[limit - 1]['id'] if len(chapters) > limit else None
+    return {"chapters": chapters[:limit], "next_cursor": next_cursor}
+
+# --- Dialogue search ---
+@app.get("/api/search", summary="Full-text search over dialogue")
+async def search_dialogue(q: str = Query(..., min_length=1), story_id: Optional[int] = None,
+                          limit: int = Query(20, ge=1, le=100)):
+    """Returns the best-matching script lines for ``q``, optionally within one story.
+
+    Each result carries a ``snippet``: the HTML-escaped line with the matched
+    text wrapped in ``<mark>`` tags.
+    """
+    results = await generate_script_service.run_blocking(
+        generate_script_service.db_manager.search_dialogue, q, story_id, limit
+    )
+    return {"results": results}
+
+# --- Speculative pre-generation statistics ---
+@app.get("/api/speculative", summary="Speculative pre-generation statistics")
+def speculative_stats():
+    """Hit/miss counters of background next-chapter generation."""
+    prefetcher = generate_script_service.prefetcher
+    return {
+        "enabled": prefetcher.enabled,
+        "running": prefetcher.running,
+        "max_jobs": prefetcher.max_jobs,
+        **prefetcher.stats,
+    }
+
+# --- Opening chapter pool statistics ---
+@app.get("/api/opening-pool", summary="Opening chapter pool statistics")
+def opening_pool_stats():
+    """Size and hit/miss counters of the pre-generated opening chapter pool."""
+    pool = generate_script_service.opening_pool
+    return {
+        "enabled": pool.enabled,
+        "size": pool.size,
+        **pool.stats,
+    }
+
+# --- LLM response cache statistics ---
+@app.get("/api/response-cache", summary="LLM response cache statistics")
+async def response_cache_stats():
+    """Size and hit/miss counters of the chapter response cache."""
+    cache = generate_script_service.response_cache
+    storage = await generate_script_service.run_blocking(generate_script_service.db_manager.get_response_cache_stats)
+    return {
+        "enabled": cache.enabled,
+        "ttl_seconds": cache.ttl_seconds,
+        "max_mb": cache.max_mb,
+        **storage,
+        **cache.stats,
+    }
+
+# --- Prometheus metrics ---
+@app.get("/api/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage timings, token usage, in-flight requests and database operation counts in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# --- Recent prompts and responses kept in memory ---
+@app.get("/api/logs/recent", summary="Recent prompts and responses")
+def recent_log_records(name: str = Query("chat_context", description="Log name, e.g. chat_context or response_text")):
+    """The last records of one log from the in-memory ring buffer (empty unless AGVN_LOG_RING_SIZE is set)."""
+    return {"name": name, "records": recent_logs(name)}
 
 # --- Health check endpoint ---
 @app.get("/api/health", summary="Health check")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end load on the API server
+
+Drives the real FastAPI app (in process, through httpx's ASGI transport) with
+N concurrent simulated players. Each player starts a story with index=1 and
+keeps requesting the next chapter. Chapters come from the fake LLM backend
+with injected latency, so the numbers reflect the server itself: request
+handling, prompt building, database work and event-loop scheduling.
+
+Reports request latency percentiles, throughput, event-loop lag and database
+time per request, and writes them as JSON for comparison between commits.
+Other AGVN_* settings (speculative prefetch, opening pool, ...) are taken from
+the environment as usual. ``--candidates N`` turns on best-of-N generation;
+LLM requests per chapter then shows what it costs.
+
+Usage: python benchmarks/bench_api_load.py [--players 20] [--chapters 5] [--latency-ms 200]
+                                           [--candidates 1] [--candidate-policy first]
+                                           [--output result.json] [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Metrics compared against --baseline: (key path, True if higher is better)
+COMPARED_METRICS = [
+    (("throughput_rps",), True),
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p95"), False),
+    (("latency_ms", "p99"), False),
+    (("loop_lag_ms", "p99"), False),
+    (("db_ms_per_request",), False),
+    (("llm_requests_per_request",), False),
+]
+
+
+def percentile(samples: list, q: float) -> float:
+    """Nearest-rank percentile of ``samples`` (0 when empty)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list) -> dict:
+    return {
+        'p50': round(percentile(samples, 50), 3),
+        'p95': round(percentile(samples, 95), 3),
+        'p99': round(percentile(samples, 99), 3),
+        'max': round(max(samples), 3) if samples else 0.0,
+        'mean': round(statistics.fmean(samples), 3) if samples else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class DatabaseTimer:
+    """Wraps the public methods of a DatabaseManager instance to sum their wall time."""
+
+    def __init__(self, db_manager):
+        self.lock = threading.Lock()
+        self.seconds = 0.0
+        self.calls = 0
+        for name in dir(db_manager):
+            attr = getattr(db_manager, name)
+            if not name.startswith('_') and callable(attr):
+                setattr(db_manager, name, self.wrap(attr))
+
+    def wrap(self, method):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self.seconds += elapsed
+                    self.calls += 1
+        return timed
+
+
+async def measure_loop_lag(samples: list, interval: float = 0.01):
+    """Record how late the event loop wakes up from ``interval`` sleeps, in ms."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, (loop.time() - start - interval) * 1000))
+
+
+async def player(client, chapters: int, latencies: list, errors: list):
+    """One simulated player: a new story followed by ``chapters - 1`` continuations."""
+    story_id = None
+    for index in range(1, chapters + 1):
+        params = {'index': index}
+        if story_id is not None:
+            params['story_id'] = story_id
+        start = time.perf_counter()
+        response = await client.post('/generate script', params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+            if story_id is None:
+                return
+            continue
+        story_id = response.json()['story_id']
+
+
+async def run(args) -> dict:
+    import httpx
+    from api_server import app, generate_script_service
+    from tool.metrics import LLM_ATTEMPTS, CANDIDATES
+
+    db_timer = DatabaseTimer(generate_script_service.db_manager)
+    latencies, errors, loop_lag = [], [], []
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+            lag_task = asyncio.create_task(measure_loop_lag(loop_lag))
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                player(client, args.chapters, latencies, errors) for _ in range(args.players)
+            ))
+            duration = time.perf_counter() - start
+            lag_task.cancel()
+
+    requests = len(latencies)
+    llm_requests = sum(LLM_ATTEMPTS.values.values())
+    return {
+        'benchmark': 'api_load',
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'config': {
+            'players': args.players,
+            'chapters': args.chapters,
+            'latency_ms': args.latency_ms,
+            'latency_dist': args.latency_dist,
+            'tokens_per_second': args.tokens_per_second,
+            'failure_rate': args.failure_rate,
+            'lines': args.lines,
+            'seed': args.seed,
+            'speculative': os.getenv('AGVN_SPECULATIVE', '0'),
+            'opening_pool_size': os.getenv('AGVN_OPENING_POOL_SIZE', '0'),
+            'io_workers': os.getenv('AGVN_IO_WORKERS', '4'),
+            'candidates': args.candidates,
+            'candidate_policy': args.candidate_policy,
+        },
+        'requests': requests,
+        'errors': len(errors),
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(requests / duration, 3) if duration else 0.0,
+        'latency_ms': summarize(latencies),
+        'loop_lag_ms': summarize(loop_lag),
+        'db_ms_per_request': round(db_timer.seconds * 1000 / requests, 3) if requests else 0.0,
+        'db_calls_per_request': round(db_timer.calls / requests, 2) if requests else 0.0,
+        'llm_requests_per_request': round(llm_requests / requests, 2) if requests else 0.0,
+        'candidates': {key[0]: value for key, value in CANDIDATES.values.items()},
+    }
+
+
+def compare(result: dict, baseline: dict) -> None:
+    print(f"\nvs. baseline {baseline.get('commit', '?')}:")
+    for path, higher_is_better in COMPARED_METRICS:
+        new, old = result, baseline
+        for key in path:
+            new, old = new.get(key, {}), old.get(key, {})
+        if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+            continue
+        change = (new - old) / old * 100
+        better = change > 0 if higher_is_better else change < 0
+        print(f"  {'.'.join(path):<20} {old:>10.2f} -> {new:>10.2f}  ({change:+.1f}%{'' if better or not change else ' worse'})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API server under concurrent players")
+    parser.add_argument('--players', type=int, default=20, help='Concurrent simulated players')
+    parser.add_argument('--chapters', type=int, default=5, help='Chapters requested by each player')
+    parser.add_argument('--latency-ms', type=float, default=200, help='Fake backend median latency')
+    parser.add_argument('--latency-dist', default='lognormal', choices=['fixed', 'uniform', 'lognormal'])
+    parser.add_argument('--tokens-per-second', type=float, default=0, help='Fake backend output rate (0 = instant)')
+    parser.add_argument('--failure-rate', type=float, default=0, help='Fraction of fake requests that fail')
+    parser.add_argument('--lines', type=int, default=20, help='Script lines per fake chapter')
+    parser.add_argument('--seed', type=int, default=0, help='Fake backend random seed')
+    parser.add_argument('--candidates', type=int, default=1, help='Concurrent candidates per chapter (best-of-N)')
+    parser.add_argument('--candidate-policy', default='first', choices=['first', 'best'])
+    parser.add_argument('--output', help='Write the JSON result to this file')
+    parser.add_argument('--baseline', help='Earlier JSON result to compare against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'AGVN_LLM_BACKEND': 'fake',
+            'AGVN_DB_PATH': os.path.join(tmp, 'bench.db'),
+            'AGVN_FAKE_LATENCY_MS': str(args.latency_ms),
+            'AGVN_FAKE_LATENCY_DIST': args.latency_dist,
+            'AGVN_FAKE_TOKENS_PER_SECOND': str(args.tokens_per_second),
+            'AGVN_FAKE_FAILURE_RATE': str(args.failure_rate),
+            'AGVN_FAKE_LINES': str(args.lines),
+            'AGVN_FAKE_SEED': str(args.seed),
+            'AGVN_CANDIDATES': str(args.candidates),
+            'AGVN_CANDIDATE_POLICY': args.candidate_policy,
+        })
+        # The service logs chatty progress to stdout; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(run(args))
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
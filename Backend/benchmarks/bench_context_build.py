@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prompt context build time as a story grows
+
+Compares the legacy full join (get_all_scripts_concatenated) with
+StoryContextBuilder, which reads the materialized story context or cached
+summaries. Summaries come from an instant fake summarizer, so only database
+and string work is measured.
+
+Usage: python benchmarks/bench_context_build.py [--sizes 10 100 1000 3000] [--lines 40]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from context_builder import StoryContextBuilder
+from database_manager import DatabaseManager
+
+
+def make_chapter(number: int, lines: int) -> dict:
+    return {
+        "scene_background": "Classroom_Day",
+        "scripts": [
+            {"role": "강지훈" if i % 2 else "Narrator", "emotion": "neutral",
+             "script": f"{number}장 {i}번째 대사입니다. " + "가나다라마바사 " * 8}
+            for i in range(lines)
+        ],
+    }
+
+
+async def run_inline(func, *args):
+    return func(*args)
+
+
+async def fake_summarize(text: str) -> str:
+    return "요약: " + text[:200]
+
+
+def timed(func, repeat: int = 5) -> float:
+    """Median wall time of ``func`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark story context building")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 3000],
+                        help='Chapter counts at which to measure')
+    parser.add_argument('--lines', type=int, default=40, help='Script lines per chapter')
+    parser.add_argument('--legacy-max', type=int, default=1000,
+                        help='Skip the (slow) legacy join above this many chapters')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        story_id = db.create_story()
+        builder = StoryContextBuilder(db, fake_summarize, run_inline)
+        results = []
+        saved = 0
+
+        for size in sorted(args.sizes):
+            while saved < size - 1:
+                db.save_chapter(make_chapter(saved, args.lines), story_id)
+                saved += 1
+            # Generate all summaries up to here, then add the chapter being measured
+            await builder.build(story_id)
+            db.save_chapter(make_chapter(saved, args.lines), story_id)
+            saved += 1
+
+            start = time.perf_counter()
+            context = await builder.build(story_id)
+            cold_ms = (time.perf_counter() - start) * 1000
+
+            warm_samples = []
+            for _ in range(5):
+                start = time.perf_counter()
+                await builder.build(story_id)
+                warm_samples.append((time.perf_counter() - start) * 1000)
+            warm_ms = statistics.median(warm_samples)
+
+            legacy_ms = None
+            if size <= args.legacy_max:
+                legacy_ms = timed(lambda: db.get_all_scripts_concatenated(story_id), repeat=3)
+            results.append((size, legacy_ms, cold_ms, warm_ms, len(context)))
+
+    print(f"{'chapters':>9} {'legacy join ms':>15} {'build new ms':>13} {'build cached ms':>16} {'context chars':>14}")
+    for size, legacy_ms, cold_ms, warm_ms, chars in results:
+        legacy = f"{legacy_ms:.2f}" if legacy_ms is not None else "-"
+        print(f"{size:>9} {legacy:>15} {cold_ms:>13.2f} {warm_ms:>16.3f} {chars:>14}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: script inserts and lookups on a large database
+
+Fills a database with 100k+ script rows through DatabaseManager.save_chapter,
+then times chapter writes (one executemany batch vs. one execute per row)
+and the per-chapter lookups with the schema v2 covering index and without it.
+
+Usage: python benchmarks/bench_db_indexes.py [--stories 100] [--chapters 50] [--lines 25]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database_manager import DatabaseManager
+
+ROLES = ["Narrator", "강지훈", "윤서아", "박민지", "김태성", "정미연"]
+INSERT_SQL = "INSERT INTO scripts (chapter_id, role, emotion, script, order_index) VALUES (?, ?, ?, ?, ?)"
+
+
+def make_chapter(number: int, lines: int) -> dict:
+    return {
+        "scene_background": "Classroom_Day",
+        "scripts": [
+            {"role": ROLES[(number + i) % len(ROLES)], "emotion": "neutral",
+             "script": f"{number}장 {i}번째 대사입니다. " + "가나다라마바사 " * 6}
+            for i in range(lines)
+        ],
+    }
+
+
+def timed(func, repeat: int) -> float:
+    """Median wall time of ``func`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def insert_rows(db: DatabaseManager, chapter: dict, batched: bool):
+    """Insert one chapter's script rows the new (batched) or old (per-row) way"""
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO chapters (scene_background) VALUES (?)", (chapter["scene_background"],))
+        chapter_id = cursor.lastrowid
+        rows = [(chapter_id, s["role"], s["emotion"], s["script"], i) for i, s in enumerate(chapter["scripts"])]
+        if batched:
+            cursor.executemany(INSERT_SQL, rows)
+        else:
+            for row in rows:
+                cursor.execute(INSERT_SQL, row)
+
+
+def measure_lookups(db: DatabaseManager, chapter_ids: list, story_ids: list) -> dict:
+    rng = random.Random(0)
+    return {
+        'get_chapter': timed(lambda: db.get_chapter(rng.choice(chapter_ids)), repeat=200),
+        'concatenate story': timed(lambda: db.get_all_scripts_concatenated(rng.choice(story_ids)), repeat=50),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark script inserts and lookups")
+    parser.add_argument('--stories', type=int, default=100, help='Stories in the database')
+    parser.add_argument('--chapters', type=int, default=50, help='Chapters per story')
+    parser.add_argument('--lines', type=int, default=25, help='Script lines per chapter')
+    parser.add_argument('--writes', type=int, default=200, help='Chapters written per insert measurement')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        story_ids, chapter_ids = [], []
+        start = time.perf_counter()
+        for story in range(args.stories):
+            story_id = db.create_story()
+            story_ids.append(story_id)
+            for number in range(args.chapters):
+                chapter_ids.append(db.save_chapter(make_chapter(story * args.chapters + number, args.lines), story_id))
+        fill_s = time.perf_counter() - start
+        rows = db.get_database_stats()['total_scripts']
+
+        chapter = make_chapter(0, args.lines)
+        insert_ms = {
+            mode: timed(lambda: insert_rows(db, chapter, batched), repeat=args.writes)
+            for mode, batched in (('per-row execute', False), ('executemany', True))
+        }
+
+        indexed = measure_lookups(db, chapter_ids, story_ids)
+        with db.connection() as conn:
+            conn.execute("DROP INDEX idx_scripts_chapter")
+        unindexed = measure_lookups(db, chapter_ids, story_ids)
+        db.close()
+
+    print(f"{rows} script rows in {len(chapter_ids)} chapters (filled in {fill_s:.1f} s)\n")
+    print(f"{'chapter write (' + str(args.lines) + ' lines)':<28} {'median ms':>10}")
+    for mode, ms in insert_ms.items():
+        print(f"{mode:<28} {ms:>10.3f}")
+    print(f"\n{'lookup':<28} {'no index ms':>12} {'indexed ms':>11} {'speedup':>8}")
+    for name in indexed:
+        print(f"{name:<28} {unindexed[name]:>12.3f} {indexed[name]:>11.3f} {unindexed[name] / indexed[name]:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
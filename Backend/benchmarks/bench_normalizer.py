@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: character name normalization with a large cast
+
+Builds a mapping with hundreds of generated characters (several variations
+each) and normalizes a batch of chapter roles with the previous linear scan
+over every mapping and with CharacterNameMatcher, uncached and cached.
+Then times single fuzzy lookups of misspelled romanizations (cache cleared
+before each one), the slowest path through the matcher.
+
+Usage: python benchmarks/bench_normalizer.py [--characters 300] [--roles 20000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tool.character_normalizer import CharacterNameMatcher
+
+SURNAMES = ["kim", "lee", "park", "choi", "jung", "kang", "cho", "yoon", "jang", "lim", "han", "oh"]
+SYLLABLES = ["ji", "seo", "min", "tae", "hoon", "ah", "yeon", "sung", "woo", "hyun", "jin", "soo", "eun", "ha"]
+
+
+def make_mappings(characters: int, rng: random.Random) -> dict:
+    mappings = {}
+    while len(set(mappings.values())) < characters:
+        given = f"{rng.choice(SYLLABLES)}-{rng.choice(SYLLABLES)}{rng.choice(SYLLABLES)}"
+        full = f"{rng.choice(SURNAMES)} {given}"
+        standardized = full.title()
+        for variation in (full, given, f"captain {full}", f"{full} the {rng.choice(SYLLABLES)}"):
+            mappings.setdefault(variation, standardized)
+    return mappings
+
+
+def make_roles(mappings: dict, count: int, rng: random.Random) -> list:
+    """Roles as a model writes them: exact names, decorated names and unknown extras."""
+    variations = list(mappings)
+    roles = []
+    for _ in range(count):
+        kind = rng.random()
+        variation = rng.choice(variations)
+        if kind < 0.5:
+            roles.append(variation.title())
+        elif kind < 0.85:
+            roles.append(f"{variation.title()} ({rng.choice(['whisper', 'angry', 'v.o.'])})")
+        else:
+            roles.append(f"Student {rng.randint(1, 500)}")
+    return roles
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """One random substitution, insertion or deletion in the given name"""
+    position = rng.randrange(len(name))
+    edit = rng.choice(("substitute", "insert", "delete"))
+    letter = rng.choice("aeiouknmsl")
+    if edit == "substitute":
+        return name[:position] + letter + name[position + 1:]
+    if edit == "insert":
+        return name[:position] + letter + name[position:]
+    return name[:position] + name[position + 1:]
+
+
+def legacy_normalize(mappings: dict, character_name: str) -> str:
+    """The previous implementation: direct lookup, then a scan of every mapping"""
+    lowercase_name = character_name.lower().strip()
+    if lowercase_name in mappings:
+        return mappings[lowercase_name]
+    for mapping_key, standardized_name in mappings.items():
+        if mapping_key in lowercase_name or lowercase_name in mapping_key:
+            return standardized_name
+    return character_name
+
+
+def timed(func, repeat: int = 5) -> float:
+    """Median wall time of ``func`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark character name normalization")
+    parser.add_argument('--characters', type=int, default=300, help='Characters in the mapping')
+    parser.add_argument('--roles', type=int, default=20000, help='Role names normalized per run')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    mappings = make_mappings(args.characters, rng)
+    roles = make_roles(mappings, args.roles, rng)
+
+    start = time.perf_counter()
+    matcher = CharacterNameMatcher(mappings)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    def uncached():
+        matcher.resolve.cache_clear()
+        for role in roles:
+            matcher.normalize(role)
+
+    results = [
+        ("linear scan (previous)", timed(lambda: [legacy_normalize(mappings, role) for role in roles])),
+        ("automaton, cold cache", timed(uncached)),
+        ("automaton, warm cache", timed(lambda: [matcher.normalize(role) for role in roles])),
+    ]
+
+    misspelled = [misspell(variation, rng) for variation in rng.sample(list(mappings), 1000)]
+    lookups = []
+    matched = 0
+    for name in misspelled:
+        matcher.resolve.cache_clear()
+        start = time.perf_counter()
+        matched += matcher.normalize(name) != name
+        lookups.append((time.perf_counter() - start) * 1000)
+    lookups.sort()
+
+    print(f"{args.characters} characters, {len(mappings)} variations, {len(roles)} roles "
+          f"(compiled in {compile_ms:.1f} ms)\n")
+    print(f"{'method':<24} {'ms':>10} {'us/role':>9} {'speedup':>8}")
+    baseline = results[0][1]
+    for name, ms in results:
+        print(f"{name:<24} {ms:>10.2f} {ms * 1000 / len(roles):>9.2f} {baseline / ms:>7.1f}x")
+    print(f"\nfuzzy lookup of {len(misspelled)} misspelled names ({matched} matched): "
+          f"p50 {lookups[len(lookups) // 2]:.3f} ms, p99 {lookups[int(len(lookups) * 0.99)]:.3f} ms, "
+          f"max {lookups[-1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dialogue search on a large database
+
+Bulk-imports generated chapters (1M script lines by default), then compares
+search_dialogue (FTS5 trigram index) with a LIKE scan of the scripts table
+for rare, medium and common terms.
+
+Usage: python benchmarks/bench_search.py [--lines 1000000]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database_manager import DatabaseManager
+
+ROLES = ["Narrator", "강지훈", "윤서아", "박민지", "김태성", "정미연"]
+WORDS = ["오늘", "교실", "창밖", "벚꽃잎", "흩날린다", "도시락", "시험", "범위", "같이", "가자",
+         "늦겠어", "고마워", "진심으로", "부끄럽잖아", "운동장", "방과후", "동아리", "축제", "비밀", "약속"]
+# (label, query): a word in one line out of ~10k, a common word, and a two-word query
+QUERIES = [("rare", "수학여행"), ("common", "도시락"), ("two terms", "벚꽃잎 약속")]
+LINES_PER_CHAPTER = 25
+
+
+def write_archive(path: str, lines: int) -> None:
+    rng = random.Random(0)
+    with open(path, 'w', encoding='utf-8') as f:
+        for number in range(lines // LINES_PER_CHAPTER):
+            scripts = []
+            for _ in range(LINES_PER_CHAPTER):
+                words = rng.sample(WORDS, 6)
+                if rng.random() < 0.0001:
+                    words.append("수학여행")
+                scripts.append({"role": rng.choice(ROLES), "emotion": "neutral", "script": " ".join(words) + "."})
+            chapter = {"story_id": number // 100, "scene_background": "Classroom_Day", "scripts": scripts}
+            f.write(json.dumps(chapter, ensure_ascii=False) + "\n")
+
+
+def timed(func, repeat: int = 5) -> float:
+    """Median wall time of ``func`` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def like_scan(db: DatabaseManager, query: str, limit: int = 20) -> list:
+    conditions = " AND ".join("(role LIKE ? OR script LIKE ?)" for _ in query.split())
+    params = [p for term in query.split() for p in (f"%{term}%", f"%{term}%")]
+    return db.connection().execute(
+        f"SELECT id, role, script FROM scripts WHERE {conditions} LIMIT ?", params + [limit]
+    ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dialogue search")
+    parser.add_argument('--lines', type=int, default=1_000_000, help='Script lines in the database')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        archive = os.path.join(tmp, "seed.jsonl")
+        write_archive(archive, args.lines)
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        db.import_from_jsonl(archive)
+        import_s = time.perf_counter() - start
+        rows = db.get_database_stats()['total_scripts']
+
+        results = []
+        for label, query in QUERIES:
+            matches = len(db.search_dialogue(query, limit=20))
+            fts_ms = timed(lambda: db.search_dialogue(query, limit=20))
+            scan_ms = timed(lambda: like_scan(db, query))
+            results.append((label, query, matches, scan_ms, fts_ms))
+        db.close()
+
+    print(f"{rows} script lines (bulk import with FTS triggers: {import_s:.1f} s)\n")
+    print(f"{'query':<22} {'top-20 hits':>11} {'LIKE scan ms':>13} {'FTS5 ms':>9}")
+    for label, query, matches, scan_ms, fts_ms in results:
+        print(f"{label + ' (' + query + ')':<22} {matches:>11} {scan_ms:>13.2f} {fts_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
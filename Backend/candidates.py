@@ -0,0 +1,139 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from llm_backend import LLMResult
+from story_models import Chapter
+from tool.character_normalizer import get_all_standardized_characters, normalize_many
+from tool.logmaker import log
+from tool.metrics import CANDIDATES
+
+CHECKS = ('roles', 'sprites', 'lines')
+POLICIES = ('first', 'best')
+
+
+def default_sprite_dir() -> Path:
+    """Character sprite folders shipped with the frontend (``<name>/<emotion>.png``)."""
+    if getattr(sys, 'frozen', False):
+        # Running as PyInstaller executable
+        return Path(sys._MEIPASS) / "frontend" / "build" / "assets" / "characters"
+    return Path(__file__).parent.parent / "frontend" / "public" / "assets" / "characters"
+
+
+class CandidateSelector:
+    """Best-of-N chapter generation: N concurrent candidates, first valid one wins.
+
+    A candidate is valid when it passes every enabled check:
+    - ``roles``: every role normalizes to a known character
+    - ``sprites``: every role has a sprite for the line's emotion
+    - ``lines``: the chapter has at least ``min_lines`` lines
+
+    With the ``first`` policy the first valid candidate is returned and the
+    others are cancelled. With ``best`` every candidate is awaited and the
+    valid one with the most lines wins. If no candidate is valid, the first
+    one that parsed is returned anyway. The cost is up to N requests per
+    chapter, so ``candidates`` defaults to 1 (off).
+    """
+
+    def __init__(self, candidates: int = None, checks: List[str] = None, min_lines: int = None,
+                 policy: str = None, sprite_dir: Path = None):
+        """Initialize the selector.
+
+        Args:
+            candidates: Concurrent generations per chapter (1 disables best-of-N)
+            checks: Enabled validation checks, a subset of ``CHECKS``
+            min_lines: Minimum lines for the ``lines`` check
+            policy: ``first`` (cancel the rest on the first valid) or ``best``
+            sprite_dir: Folder with one subfolder of emotion sprites per character
+        """
+        self.candidates = max(1, candidates or int(os.getenv("AGVN_CANDIDATES", "1")))
+        if checks is None:
+            checks = [c.strip() for c in os.getenv("AGVN_CANDIDATE_CHECKS", ",".join(CHECKS)).split(",") if c.strip()]
+        unknown = set(checks) - set(CHECKS)
+        if unknown:
+            raise ValueError(f"Unknown candidate checks: {sorted(unknown)}")
+        self.checks = list(checks)
+        self.min_lines = min_lines if min_lines is not None else int(os.getenv("AGVN_CANDIDATE_MIN_LINES", "8"))
+        self.policy = policy or os.getenv("AGVN_CANDIDATE_POLICY", "first")
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown candidate policy: {self.policy}")
+        self.known_roles: Set[str] = set(get_all_standardized_characters())
+        self.sprites = self.load_sprites(sprite_dir or Path(os.getenv("AGVN_SPRITE_DIR", str(default_sprite_dir()))))
+
+    @property
+    def enabled(self) -> bool:
+        return self.candidates > 1
+
+    def load_sprites(self, sprite_dir: Path) -> Optional[Dict[str, Set[str]]]:
+        """Map lowercased character folder names to their available emotions."""
+        if not sprite_dir.is_dir():
+            if 'sprites' in self.checks:
+                log('candidates', f'Sprite folder {sprite_dir} not found; sprite check disabled')
+            return None
+        return {
+            folder.name.lower(): {sprite.stem for sprite in folder.glob('*.png')}
+            for folder in sprite_dir.iterdir() if folder.is_dir()
+        }
+
+    def problems(self, chapter: Chapter) -> List[str]:
+        """Reasons a chapter fails the enabled checks (empty when it is valid)."""
+        problems = []
+        roles = normalize_many([script.role for script in chapter.scripts])
+        if 'lines' in self.checks and len(chapter.scripts) < self.min_lines:
+            problems.append(f'{len(chapter.scripts)} lines, need {self.min_lines}')
+        if 'roles' in self.checks:
+            unknown = sorted(set(roles) - self.known_roles)
+            if unknown:
+                problems.append(f'unknown roles {unknown}')
+        if 'sprites' in self.checks and self.sprites is not None:
+            missing = sorted({
+                f'{role}/{script.emotion.value}' for role, script in zip(roles, chapter.scripts)
+                if script.emotion.value not in self.sprites.get(role.lower(), ())
+            })
+            if missing:
+                problems.append(f'missing sprites {missing}')
+        return problems
+
+    async def select(self, generate: Callable[[], Awaitable[LLMResult]]) -> LLMResult:
+        """Run ``candidates`` generations concurrently and return the selected result.
+
+        Raises the last error if every candidate failed.
+        """
+        tasks = [asyncio.create_task(generate()) for _ in range(self.candidates)]
+        valid, fallback, error = [], None, None
+        try:
+            for completed in asyncio.as_completed(tasks):
+                try:
+                    result = await completed
+                except Exception as e:
+                    CANDIDATES.inc(outcome='error')
+                    error = e
+                    continue
+
+                problems = self.problems(result.parsed)
+                if problems:
+                    CANDIDATES.inc(outcome='invalid')
+                    log('candidates', f'Rejected candidate: {"; ".join(problems)}')
+                    fallback = fallback or result
+                    continue
+
+                CANDIDATES.inc(outcome='valid')
+                if self.policy == 'first':
+                    return result
+                valid.append(result)
+
+            if valid:
+                return max(valid, key=lambda result: len(result.parsed.scripts))
+            if fallback is not None:
+                log('candidates', f'No valid candidate among {self.candidates}; using the first that parsed')
+                return fallback
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    CANDIDATES.inc(outcome='cancelled')
+                elif not task.cancelled():
+                    task.exception()  # Mark failures of unused candidates as retrieved
@@ -0,0 +1,184 @@
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, List
+
+from database_manager import DatabaseManager
+from tool.logmaker import log
+
+# Rough characters-per-token ratio used to estimate prompt size without a tokenizer
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class StoryContextBuilder:
+    """Builds the 'Previous story' section of a prompt within a token budget.
+
+    While a story fits in the budget its materialized history (maintained by
+    ``DatabaseManager.save_chapter``) is passed verbatim. Past that point
+    the last ``recent_chapters`` chapters stay verbatim and everything older
+    is replaced by summaries stored in the ``chapter_summaries`` table:
+
+    - level 0 summarizes a single chapter
+    - level L+1 summarizes ``fanout`` consecutive level-L summaries
+
+    Groups are aligned from the start of the story, so a summary is generated
+    once and reused by every later request. The older part of the story is
+    covered by at most ``fanout - 1`` summaries per level, which keeps the
+    prompt size roughly constant as the story grows.
+    """
+
+    def __init__(self, db_manager: DatabaseManager,
+                 summarize: Callable[[str], Awaitable[str]],
+                 run_blocking: Callable[..., Awaitable],
+                 token_budget: int = None, recent_chapters: int = None, fanout: int = None,
+                 cache_size: int = 256):
+        """Initialize the builder.
+
+        Args:
+            db_manager: Database holding chapters and cached summaries
+            summarize: Coroutine turning a text into its summary
+            run_blocking: Coroutine running a blocking callable off the event loop
+            token_budget: Maximum estimated tokens for the story context
+            recent_chapters: Number of latest chapters always kept verbatim
+            fanout: Number of summaries merged into one summary of the next level
+            cache_size: Number of stories whose built context is kept in memory
+        """
+        self.db_manager = db_manager
+        self.summarize = summarize
+        self.run_blocking = run_blocking
+        self.token_budget = token_budget or int(os.getenv("AGVN_CONTEXT_TOKEN_BUDGET", "24000"))
+        self.recent_chapters = recent_chapters or int(os.getenv("AGVN_CONTEXT_RECENT_CHAPTERS", "3"))
+        self.fanout = max(2, fanout or int(os.getenv("AGVN_SUMMARY_FANOUT", "4")))
+        self.cache_size = cache_size
+        # story_id -> (context_version, context), least recently used first
+        self.cache = OrderedDict()
+
+    async def build(self, story_id: int) -> str:
+        """Return the context for the next chapter of a story.
+
+        The result is cached in memory and reused until the story's
+        ``context_version`` changes, so repeated builds cost one row read.
+        """
+        state = await self.run_blocking(self.db_manager.get_story_context_state, story_id)
+        if state is None:
+            return "Previous story:\n"
+        version, context_chars = state
+
+        cached = self.cache.get(story_id)
+        if cached is not None and cached[0] == version:
+            self.cache.move_to_end(story_id)
+            return cached[1]
+
+        fits_budget = context_chars // CHARS_PER_TOKEN + 1 <= self.token_budget
+        if fits_budget and context_chars <= self.db_manager.CONTEXT_TEXT_LIMIT:
+            version, text = await self.run_blocking(self.db_manager.get_story_context, story_id)
+            context = "Previous story:\n" + text
+        elif fits_budget:
+            # Budget larger than the materialized limit: assemble from chapter texts
+            chapter_ids = await self.run_blocking(self.db_manager.get_story_chapter_ids, story_id)
+            texts = await self.run_blocking(self.db_manager.get_chapter_texts, chapter_ids)
+            context = "Previous story:\n" + "\n".join(texts[chapter_id] for chapter_id in chapter_ids)
+        else:
+            context = await self.build_summarized(story_id)
+
+        self.cache[story_id] = (version, context)
+        self.cache.move_to_end(story_id)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return context
+
+    async def build_summarized(self, story_id: int) -> str:
+        """Build the context from cached summaries plus the latest chapters"""
+        chapter_ids = await self.run_blocking(self.db_manager.get_story_chapter_ids, story_id)
+        older = chapter_ids[:-self.recent_chapters]
+        recent = chapter_ids[-self.recent_chapters:]
+
+        covering = await self.summarize_older_chapters(story_id, older)
+
+        summary_texts = await self.run_blocking(
+            self.db_manager.get_summary_texts, story_id, [(level, first) for level, first, _ in covering]
+        )
+        chapter_texts = await self.run_blocking(self.db_manager.get_chapter_texts, recent)
+        return self.fit_to_budget(
+            [summary_texts.get((level, first), "") for level, first, _ in covering],
+            [chapter_texts.get(chapter_id, "") for chapter_id in recent],
+        )
+
+    async def summarize_older_chapters(self, story_id: int, older: List[int]) -> List[tuple]:
+        """Make sure all needed summaries exist and return the spans covering ``older``.
+
+        Spans are ``(level, first_chapter_id, last_chapter_id)`` tuples in story order.
+        """
+        spans = await self.run_blocking(self.db_manager.get_chapter_summary_spans, story_id)
+        known = {(level, first): (level, first, last) for level, first, last in spans}
+
+        # Level 0: one summary per chapter
+        missing = [chapter_id for chapter_id in older if (0, chapter_id) not in known]
+        if missing:
+            texts = await self.run_blocking(self.db_manager.get_chapter_texts, missing)
+            for chapter_id in missing:
+                known[(0, chapter_id)] = await self.store_summary(
+                    story_id, 0, chapter_id, chapter_id, texts.get(chapter_id, "")
+                )
+        levels = [[known[(0, chapter_id)] for chapter_id in older]]
+
+        # Higher levels: summaries of complete groups of lower-level summaries
+        while len(levels[-1]) >= self.fanout:
+            lower = levels[-1]
+            level = len(levels)
+            upper = []
+            for start in range(0, len(lower) - self.fanout + 1, self.fanout):
+                group = lower[start:start + self.fanout]
+                key = (level, group[0][1])
+                if key not in known:
+                    texts = await self.run_blocking(
+                        self.db_manager.get_summary_texts, story_id, [(item[0], item[1]) for item in group]
+                    )
+                    merged = "\n\n".join(texts.get((item[0], item[1]), "") for item in group)
+                    known[key] = await self.store_summary(story_id, level, group[0][1], group[-1][2], merged)
+                upper.append(known[key])
+            levels.append(upper)
+
+        # Cover the older chapters with the coarsest summaries available
+        covering = []
+        covered_until = None
+        for items in reversed(levels):
+            for item in items:
+                if covered_until is None or item[1] > covered_until:
+                    covering.append(item)
+                    covered_until = item[2]
+
+        return covering
+
+    async def store_summary(self, story_id: int, level: int, first_chapter_id: int,
+                            last_chapter_id: int, text: str) -> tuple:
+        """Generate a summary, persist it and return its span"""
+        summary = await self.summarize(text)
+        await self.run_blocking(
+            self.db_manager.save_chapter_summary, story_id, level, first_chapter_id, last_chapter_id, summary
+        )
+        log('context_builder', f'Story {story_id}: stored level {level} summary for chapters {first_chapter_id}-{last_chapter_id}')
+        return (level, first_chapter_id, last_chapter_id)
+
+    def fit_to_budget(self, summaries: List[str], recent: List[str]) -> str:
+        """Join summaries and recent chapters, dropping the oldest parts that overflow"""
+        summaries = list(summaries)
+        recent = list(recent)
+
+        def total() -> int:
+            return sum(estimate_tokens(part) for part in summaries + recent)
+
+        while summaries and total() > self.token_budget:
+            summaries.pop(0)
+        while len(recent) > 1 and total() > self.token_budget:
+            recent.pop(0)
+
+        parts = []
+        if summaries:
+            parts.append("Summary of earlier chapters:\n" + "\n\n".join(summaries))
+        parts.append("Previous story:\n" + "\n".join(recent))
+        return "\n\n".join(parts)
@@ -1,34 +1,147 @@
+import gzip
+import html
+import os
+import re
 import sqlite3
+import threading
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional
 from tool.logmaker import log
+from tool.metrics import DB_OPERATIONS
 
 class DatabaseManager:
     """Database manager for cutted_script data storage and retrieval"""
 
-    def __init__(self, db_path: str = "data/scripts.db"):
-        """Initialize database manager with database path"""
+    # Stories longer than this stop growing story_contexts.context_text (prompts use
+    # summaries long before that), so a save never rewrites an unbounded value
+    CONTEXT_TEXT_LIMIT = 1_000_000
+
+    # Schema migrations as (version, description, method), applied in order by
+    # initialize_database; PRAGMA user_version records the last one applied
+    MIGRATIONS = [
+        (1, 'story columns on chapters', '_migrate_story_columns'),
+        (2, 'covering index on scripts', '_migrate_script_indexes'),
+        (3, 'full-text index on scripts', '_migrate_script_search'),
+        (4, 'LLM response cache', '_migrate_response_cache'),
+        (5, 'chapter index within a story', '_migrate_chapter_index'),
+        (6, 'generation job queue', '_migrate_generation_jobs'),
+        (7, 'jobs remember the story they created', '_migrate_job_new_story'),
+    ]
+    SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+    # search_dialogue ranks at most this many of the newest matches
+    SEARCH_RANK_WINDOW = 1000
+
+    # Appends :text (:chars characters) to a story's materialized context
+    APPEND_CONTEXT_SQL = """
+        UPDATE story_contexts
+        SET context_text = CASE
+                WHEN context_chars = 0 THEN :text
+                WHEN context_chars + 1 + :chars <= :limit THEN context_text || char(10) || :text
+                ELSE context_text
+            END,
+            context_chars = context_chars + :chars + (CASE WHEN context_chars = 0 THEN 0 ELSE 1 END),
+            context_version = context_version + 1
+        WHERE story_id = :story_id
+    """
+
+    def __init__(self, db_path: str = None):
+        """Initialize database manager with database path
+
+        Defaults to AGVN_DB_PATH, or data/scripts.db next to this module.
+        Relative paths are resolved from this module's directory.
+        """
+        db_path = db_path or os.getenv("AGVN_DB_PATH", "data/scripts.db")
         self.db_path = Path(__file__).parent / db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Connection settings, applied once to every pooled connection
+        self.busy_timeout_ms = int(os.getenv("AGVN_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+        self.cache_size_kb = int(os.getenv("AGVN_SQLITE_CACHE_KB", "16384"))
+        self.mmap_size_mb = int(os.getenv("AGVN_SQLITE_MMAP_MB", "256"))
+        # thread id -> that thread's connection
+        self.connections: Dict[int, sqlite3.Connection] = {}
+        self.connections_lock = threading.Lock()
+
         self.initialize_database()
 
+    def connection(self, operation: str = 'other') -> sqlite3.Connection:
+        """Return the calling thread's pooled connection, opening it on first use.
+
+        Use it as ``with self.connection('save_chapter') as conn:`` exactly like
+        a fresh ``sqlite3.connect``: the block commits on success and rolls back
+        on error, but the connection stays open for the thread's next call.
+        ``operation`` is the public method the checkout is counted under;
+        direct callers (tests, benchmarks) are counted as ``other``.
+        """
+        DB_OPERATIONS.inc(operation=operation)
+        thread_id = threading.get_ident()
+        conn = self.connections.get(thread_id)
+        if conn is None:
+            # check_same_thread=False only so close() can run from any thread;
+            # each connection is still used by a single thread at a time
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{self.cache_size_kb}")
+            conn.execute(f"PRAGMA mmap_size={self.mmap_size_mb * 1024 * 1024}")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            with self.connections_lock:
+                self.connections[thread_id] = conn
+        return conn
+
+    def close(self):
+        """Close every pooled connection (they are reopened on next use)"""
+        with self.connections_lock:
+            connections = list(self.connections.values())
+            self.connections.clear()
+        for conn in connections:
+            conn.close()
+
     def initialize_database(self):
         """Create database tables if they don't exist"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection('initialize_database') as conn:
                 cursor = conn.cursor()
 
+                # WAL lets readers proceed while a chapter is being written;
+                # the journal mode is stored in the database file itself
+                cursor.execute("PRAGMA journal_mode=WAL")
+
+                # Create stories table (one row per playthrough)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS stories (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+
+                # Create story_contexts table: the materialized 'Role: Script' history of
+                # each story, appended to by save_chapter. context_text is kept last so
+                # reading the version and size never touches its overflow pages
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS story_contexts (
+                        story_id INTEGER PRIMARY KEY REFERENCES stories(id),
+                        context_version INTEGER NOT NULL DEFAULT 0,
+                        context_chars INTEGER NOT NULL DEFAULT 0,
+                        context_text TEXT NOT NULL DEFAULT ''
+                    )
+                """)
+
                 # Create chapters table
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS chapters (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         scene_background TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        story_id INTEGER REFERENCES stories(id),
+                        script_text TEXT
                     )
                 """)
 
+
                 # Create scripts table with foreign key to chapters
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS scripts (
@@ -42,6 +155,37 @@ class DatabaseManager:
                     )
                 """)
 
+                # Create chapter_summaries table: level 0 summarizes one chapter,
+                # level L+1 summarizes a run of level-L summaries
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS chapter_summaries (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        story_id INTEGER NOT NULL,
+                        level INTEGER NOT NULL,
+                        first_chapter_id INTEGER NOT NULL,
+                        last_chapter_id INTEGER NOT NULL,
+                        summary TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        UNIQUE (story_id, level, first_chapter_id),
+                        FOREIGN KEY (story_id) REFERENCES stories(id)
+                    )
+                """)
+
+                # Create opening_pool table: pre-generated, unused first chapters
+                # tagged with the hash of the prompt that produced them
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS opening_pool (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        prompt_hash TEXT NOT NULL,
+                        chapter_json TEXT NOT NULL,
+                        response_text TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_opening_pool_hash ON opening_pool(prompt_hash, id)")
+
+                self._migrate(cursor)
+
                 conn.commit()
                 log('database_manager', 'Database tables initialized successfully')
 
@@ -49,10 +193,234 @@ class DatabaseManager:
             log('database_manager', f'Error initializing database: {e}')
             raise e
 
-    def save_chapter(self, chapter_data: Dict) -> int:
-        """Save chapter data to database and return chapter ID"""
+    def _migrate(self, cursor: sqlite3.Cursor):
+        """Apply the schema migrations newer than the database's user_version.
+
+        Every migration is idempotent, so one interrupted halfway simply runs
+        again on the next start.
+        """
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+        if version > self.SCHEMA_VERSION:
+            log('database_manager', f'Database schema version {version} is newer than this build ({self.SCHEMA_VERSION})')
+            return
+
+        for target, description, method in self.MIGRATIONS:
+            if version < target:
+                getattr(self, method)(cursor)
+                # PRAGMA does not accept bound parameters; target is a constant from MIGRATIONS
+                cursor.execute(f"PRAGMA user_version = {target}")
+                log('database_manager', f'Migrated database to schema version {target}: {description}')
+
+    def _migrate_story_columns(self, cursor: sqlite3.Cursor):
+        """v1: per-story chapters with materialized script text"""
+        # Databases created by older versions lack some columns
+        self._add_missing_column(cursor, 'chapters', 'story_id', 'INTEGER REFERENCES stories(id)')
+        self._add_missing_column(cursor, 'chapters', 'script_text', 'TEXT')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chapters_story ON chapters(story_id, id)")
+        self._backfill_script_text(cursor)
+
+    def _migrate_script_indexes(self, cursor: sqlite3.Cursor):
+        """v2: covering index for reading a chapter's scripts in order"""
+        # Serves every per-chapter read (get_chapter, concatenation, backfill,
+        # reset) without touching the table rows
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_scripts_chapter
+            ON scripts(chapter_id, order_index, role, emotion, script)
+        """)
+
+    def _migrate_script_search(self, cursor: sqlite3.Cursor):
+        """v3: FTS5 index over scripts(role, script), kept in sync by triggers"""
+        # External-content table: the index refers to scripts rows instead of
+        # storing a second copy of the text. The trigram tokenizer indexes every
+        # 3-character substring, which works for Korean without word segmentation
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS scripts_fts USING fts5(
+                role, script, content='scripts', content_rowid='id', tokenize='trigram'
+            )
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS scripts_fts_insert AFTER INSERT ON scripts BEGIN
+                INSERT INTO scripts_fts (rowid, role, script) VALUES (new.id, new.role, new.script);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS scripts_fts_delete AFTER DELETE ON scripts BEGIN
+                INSERT INTO scripts_fts (scripts_fts, rowid, role, script) VALUES ('delete', old.id, old.role, old.script);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS scripts_fts_update AFTER UPDATE ON scripts BEGIN
+                INSERT INTO scripts_fts (scripts_fts, rowid, role, script) VALUES ('delete', old.id, old.role, old.script);
+                INSERT INTO scripts_fts (rowid, role, script) VALUES (new.id, new.role, new.script);
+            END
+        """)
+        # Index the rows saved before the table existed
+        cursor.execute("INSERT INTO scripts_fts (scripts_fts) VALUES ('rebuild')")
+
+    def _migrate_response_cache(self, cursor: sqlite3.Cursor):
+        """v4: cached chapter responses keyed by a hash of backend settings and prompt"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                cache_key TEXT PRIMARY KEY,
+                response_text TEXT NOT NULL,
+                prompt_tokens INTEGER,
+                output_tokens INTEGER,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache(last_used)")
+
+    def _migrate_chapter_index(self, cursor: sqlite3.Cursor):
+        """v5: position of each chapter in its story, unique per story"""
+        self._add_missing_column(cursor, 'chapters', 'chapter_index', 'INTEGER')
+        # Number existing chapters in saving order; running again renumbers identically
+        cursor.execute("""
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY story_id ORDER BY id)
+            FROM chapters WHERE story_id IS NOT NULL
+        """)
+        cursor.executemany("UPDATE chapters SET chapter_index = ? WHERE id = ?",
+                           [(number, chapter_id) for chapter_id, number in cursor.fetchall()])
+        # Makes saving a chapter idempotent on (story_id, chapter_index); rows
+        # without a story keep a NULL index, which never conflicts
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_chapters_story_index ON chapters(story_id, chapter_index)")
+
+    def _migrate_generation_jobs(self, cursor: sqlite3.Cursor):
+        """v6: persisted chapter generation jobs"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS generation_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                story_id INTEGER REFERENCES stories(id),
+                chapter_index INTEGER NOT NULL,
+                priority TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result_json TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        # Only unfinished jobs are looked up by status (recovery on start)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_generation_jobs_unfinished
+            ON generation_jobs(status) WHERE status IN ('queued', 'running')
+        """)
+
+    def _migrate_job_new_story(self, cursor: sqlite3.Cursor):
+        """v7: whether a job's story was created for it (a queued new game)"""
+        self._add_missing_column(cursor, 'generation_jobs', 'new_story', 'INTEGER NOT NULL DEFAULT 0')
+
+    @staticmethod
+    def _add_missing_column(cursor: sqlite3.Cursor, table: str, column: str, definition: str):
+        """Add a column to an existing table if it is not there yet"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            log('database_manager', f'Added {column} column to {table} table')
+
+    def _backfill_script_text(self, cursor: sqlite3.Cursor):
+        """Materialize script_text and story contexts for rows saved by older versions"""
+        cursor.execute("INSERT OR IGNORE INTO story_contexts (story_id) SELECT id FROM stories")
+
+        cursor.execute("SELECT id, story_id FROM chapters WHERE script_text IS NULL")
+        stale_chapters = cursor.fetchall()
+        if not stale_chapters:
+            return
+
+        for chapter_id, _ in stale_chapters:
+            cursor.execute(
+                "SELECT role, script FROM scripts WHERE chapter_id = ? ORDER BY order_index",
+                (chapter_id,)
+            )
+            text = "\n".join(f"{role}: {script}" for role, script in cursor.fetchall())
+            cursor.execute("UPDATE chapters SET script_text = ? WHERE id = ?", (text, chapter_id))
+
+        for story_id in {story_id for _, story_id in stale_chapters if story_id is not None}:
+            cursor.execute("SELECT script_text FROM chapters WHERE story_id = ? ORDER BY id", (story_id,))
+            texts = [row[0] for row in cursor.fetchall()]
+            context_chars = sum(len(text) for text in texts) + max(len(texts) - 1, 0)
+            context_text = "\n".join(texts) if context_chars <= self.CONTEXT_TEXT_LIMIT else ""
+            cursor.execute(
+                "UPDATE story_contexts SET context_text = ?, context_chars = ?, context_version = context_version + 1 WHERE story_id = ?",
+                (context_text, context_chars, story_id)
+            )
+        log('database_manager', f'Backfilled script_text for {len(stale_chapters)} chapters')
+
+    @staticmethod
+    def render_scripts(scripts: List[Dict]) -> str:
+        """Render scripts as the 'Role: Script' lines used in prompts"""
+        return "\n".join(f"{script['role']}: {script['script']}" for script in scripts)
+
+    def create_story(self) -> int:
+        """Create a new story and return its ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection('create_story') as conn:
+                cursor = conn.cursor()
+                cursor.execute("INSERT INTO stories DEFAULT VALUES")
+                story_id = cursor.lastrowid
+                cursor.execute("INSERT INTO story_contexts (story_id) VALUES (?)", (story_id,))
+                conn.commit()
+                log('database_manager', f'Story created with ID: {story_id}')
+                return story_id
+
+        except Exception as e:
+            log('database_manager', f'Error creating story: {e}')
+            raise e
+
+    def story_exists(self, story_id: int) -> bool:
+        """Check whether a story with the given ID exists"""
+        try:
+            with self.connection('story_exists') as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM stories WHERE id = ?", (story_id,))
+                return cursor.fetchone() is not None
+
+        except Exception as e:
+            log('database_manager', f'Error checking story {story_id}: {e}')
+            raise e
+
+    def reset_story(self, story_id: int) -> int:
+        """Delete every chapter of one story, leaving other stories untouched.
+
+        Returns:
+            int: Number of chapters removed
+        """
+        try:
+            with self.connection('reset_story') as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "DELETE FROM scripts WHERE chapter_id IN (SELECT id FROM chapters WHERE story_id = ?)",
+                    (story_id,)
+                )
+                cursor.execute("DELETE FROM chapters WHERE story_id = ?", (story_id,))
+                removed = cursor.rowcount
+                cursor.execute("DELETE FROM chapter_summaries WHERE story_id = ?", (story_id,))
+                cursor.execute(
+                    "UPDATE story_contexts SET context_text = '', context_chars = 0, context_version = context_version + 1 WHERE story_id = ?",
+                    (story_id,)
+                )
+                conn.commit()
+                log('database_manager', f'Story {story_id} reset, removed {removed} chapters')
+                return removed
+
+        except Exception as e:
+            log('database_manager', f'Error resetting story {story_id}: {e}')
+            raise e
+
+    def save_chapter(self, chapter_data: Dict, story_id: Optional[int] = None,
+                     chapter_index: Optional[int] = None) -> int:
+        """Save chapter data to database and return chapter ID
+
+        Chapters of a story are numbered by ``chapter_index`` (the next free
+        number when omitted). Saving is idempotent on ``(story_id,
+        chapter_index)``: if that chapter already exists, its ID is returned
+        and nothing is written.
+        """
+        try:
+            with self.connection('save_chapter') as conn:
                 cursor = conn.cursor()
 
                 # Handle enum values - convert to string if needed
@@ -60,26 +428,51 @@ class DatabaseManager:
                 if hasattr(scene_background, 'value'):  # Handle enum objects
                     scene_background = scene_background.value
 
-                # Insert chapter record
+                scripts = chapter_data.get('scripts', [])
+                script_text = self.render_scripts(scripts)
+
+                if story_id is not None and chapter_index is None:
+                    cursor.execute(
+                        "SELECT COALESCE(MAX(chapter_index), 0) + 1 FROM chapters WHERE story_id = ?",
+                        (story_id,)
+                    )
+                    chapter_index = cursor.fetchone()[0]
+
+                # Insert chapter record; only a duplicate (story_id, chapter_index) is ignored
                 cursor.execute(
-                    "INSERT INTO chapters (scene_background) VALUES (?)",
-                    (scene_background,)
+                    "INSERT INTO chapters (scene_background, story_id, script_text, chapter_index) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT(story_id, chapter_index) DO NOTHING",
+                    (scene_background, story_id, script_text, chapter_index)
                 )
+                if cursor.rowcount == 0:
+                    cursor.execute(
+                        "SELECT id FROM chapters WHERE story_id = ? AND chapter_index = ?",
+                        (story_id, chapter_index)
+                    )
+                    chapter_id = cursor.fetchone()[0]
+                    log('database_manager', f'Chapter {chapter_index} of story {story_id} already saved with ID: {chapter_id}')
+                    return chapter_id
 
                 chapter_id = cursor.lastrowid
 
-                # Insert script records
-                scripts = chapter_data.get('scripts', [])
-                for idx, script in enumerate(scripts):
-                    # Handle enum values for emotion
-                    emotion = script['emotion']
-                    if hasattr(emotion, 'value'):  # Handle enum objects
-                        emotion = emotion.value
+                # Insert script records in one batch
+                cursor.executemany(
+                    "INSERT INTO scripts (chapter_id, role, emotion, script, order_index) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (chapter_id, script['role'],
+                         # Handle enum values for emotion
+                         getattr(script['emotion'], 'value', script['emotion']),
+                         script['script'], idx)
+                        for idx, script in enumerate(scripts)
+                    ]
+                )
 
-                    cursor.execute(
-                        "INSERT INTO scripts (chapter_id, role, emotion, script, order_index) VALUES (?, ?, ?, ?, ?)",
-                        (chapter_id, script['role'], emotion, script['script'], idx)
-                    )
+                # Append to the story's materialized context in the same transaction
+                if story_id is not None:
+                    cursor.execute(self.APPEND_CONTEXT_SQL, {
+                        'text': script_text, 'chars': len(script_text),
+                        'limit': self.CONTEXT_TEXT_LIMIT, 'story_id': story_id,
+                    })
 
                 conn.commit()
                 log('database_manager', f'Chapter saved with ID: {chapter_id}, {len(scripts)} scripts')
@@ -92,12 +485,12 @@ class DatabaseManager:
     def get_chapter(self, chapter_id: int) -> Optional[Dict]:
         """Retrieve chapter data by ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection('get_chapter') as conn:
                 cursor = conn.cursor()
 
                 # Get chapter info
                 cursor.execute(
-                    "SELECT id, scene_background, created_at FROM chapters WHERE id = ?",
+                    "SELECT id, scene_background, created_at, story_id FROM chapters WHERE id = ?",
                     (chapter_id,)
                 )
                 chapter_row = cursor.fetchone()
@@ -116,6 +509,7 @@ class DatabaseManager:
                     'id': chapter_row[0],
                     'scene_background': chapter_row[1],
                     'created_at': chapter_row[2],
+                    'story_id': chapter_row[3],
                     'scripts': [
                         {'role': row[0], 'emotion': row[1], 'script': row[2]}
                         for row in script_rows
@@ -126,32 +520,108 @@ class DatabaseManager:
             log('database_manager', f'Error retrieving chapter {chapter_id}: {e}')
             raise e
 
-    def get_all_chapters(self) -> List[Dict]:
-        """Retrieve all chapters with their scripts"""
+    def get_story_chapter(self, story_id: int, chapter_index: int) -> Optional[Dict]:
+        """Retrieve the chapter saved at ``chapter_index`` of a story, if any"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection('get_story_chapter') as conn:
                 cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id FROM chapters WHERE story_id = ? AND chapter_index = ?",
+                    (story_id, chapter_index)
+                )
+                row = cursor.fetchone()
+
+        except Exception as e:
+            log('database_manager', f'Error retrieving chapter {chapter_index} of story {story_id}: {e}')
+            raise e
+
+        return self.get_chapter(row[0]) if row is not None else None
+
+    def get_all_chapters(self, story_id: Optional[int] = None) -> List[Dict]:
+        """Retrieve all chapters with their scripts, optionally for a single story"""
+        return list(self._chapters('get_all_chapters', story_id))
+
+    def iter_chapters(self, story_id: Optional[int] = None, after_id: Optional[int] = None,
+                      limit: Optional[int] = None) -> Iterator[Dict]:
+        """Stream chapters with their scripts in chapter ID order.
 
-                cursor.execute("SELECT id FROM chapters ORDER BY created_at")
-                chapter_ids = [row[0] for row in cursor.fetchall()]
+        Runs one ordered join and groups its rows into chapters as they are
+        read, so only the chapter being assembled is held in memory.
 
-                return [self.get_chapter(chapter_id) for chapter_id in chapter_ids]
+        Args:
+            story_id: Only chapters of this story (all stories when None)
+            after_id: Only chapters with an ID greater than this (keyset cursor)
+            limit: Maximum number of chapters to return
+
+        Yields:
+            Dict: Chapter in the same shape as ``get_chapter``
+        """
+        return self._chapters('iter_chapters', story_id, after_id, limit)
+
+    def _chapters(self, operation: str, story_id: Optional[int] = None, after_id: Optional[int] = None,
+                  limit: Optional[int] = None) -> Iterator[Dict]:
+        """Chapter stream behind ``iter_chapters`` and ``get_all_chapters``."""
+        conditions, params = [], []
+        if story_id is not None:
+            conditions.append("story_id = ?")
+            params.append(story_id)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        limit_clause = "LIMIT ?" if limit is not None else ""
+        if limit is not None:
+            params.append(limit)
+
+        try:
+            with self.connection(operation) as conn:
+                # Chapter IDs increase with insertion, so they order chapters by creation
+                cursor = conn.execute(f"""
+                    SELECT c.id, c.scene_background, c.created_at, c.story_id, s.role, s.emotion, s.script
+                    FROM (SELECT id, scene_background, created_at, story_id FROM chapters
+                          {where} ORDER BY id {limit_clause}) c
+                    LEFT JOIN scripts s ON s.chapter_id = c.id
+                    ORDER BY c.id, s.order_index
+                """, params)
+
+                chapter = None
+                for chapter_id, scene_background, created_at, chapter_story_id, role, emotion, script in cursor:
+                    if chapter is None or chapter['id'] != chapter_id:
+                        if chapter is not None:
+                            yield chapter
+                        chapter = {
+                            'id': chapter_id,
+                            'scene_background': scene_background,
+                            'created_at': created_at,
+                            'story_id': chapter_story_id,
+                            'scripts': [],
+                        }
+                    if role is not None:
+                        chapter['scripts'].append({'role': role, 'emotion': emotion, 'script': script})
+                if chapter is not None:
+                    yield chapter
 
         except Exception as e:
-            log('database_manager', f'Error retrieving all chapters: {e}')
+            log('database_manager', f'Error iterating chapters: {e}')
             raise e
 
     def search_scripts_by_role(self, role: str) -> List[Dict]:
         """Search scripts by character role"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection('search_scripts_by_role') as conn:
                 cursor = conn.cursor()
 
-                cursor.execute("""
+                # The trigram index serves LIKE for 3+ characters; shorter
+                # patterns cannot use it and scan the table as before
+                if len(role) >= 3:
+                    role_filter = "s.id IN (SELECT rowid FROM scripts_fts WHERE role LIKE ?)"
+                else:
+                    role_filter = "s.role LIKE ?"
+                cursor.execute(f"""
                     SELECT c.id, c.scene_background, c.created_at, s.role, s.emotion, s.script, s.order_index
                     FROM chapters c
                     JOIN scripts s ON c.id = s.chapter_id
-                    WHERE s.role LIKE ?
+                    WHERE {role_filter}
                     ORDER BY c.created_at, s.order_index
                 """, (f'%{role}%',))
 
@@ -173,10 +643,119 @@ class DatabaseManager:
             log('database_manager', f'Error searching scripts by role {role}: {e}')
             raise e
 
+    def search_dialogue(self, query: str, story_id: Optional[int] = None, limit: int = 20) -> List[Dict]:
+        """Full-text search over script roles and lines, best matches first.
+
+        Every whitespace-separated term must appear (as a substring) in the
+        role or the line. Terms of 3+ characters are matched through the
+        trigram index and ranked with BM25. Scoring every match of a very
+        common term is slow, so only the newest ``SEARCH_RANK_WINDOW``
+        matches are ranked. Shorter terms can only be checked with LIKE, so
+        a query made only of short terms returns the newest matches unranked.
+
+        Args:
+            query: Search terms
+            story_id: Only search this story (all stories when None)
+            limit: Maximum number of results
+
+        Returns:
+            List[Dict]: Matches with chapter/story IDs, the script line and a
+            ``snippet``: the HTML-escaped line with matches wrapped in <mark>
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        long_terms = [term for term in terms if len(term) >= 3]
+        short_terms = [term for term in terms if len(term) < 3]
+
+        conditions, params = [], []
+        for term in short_terms:
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append("(s.role LIKE ? ESCAPE '\\' OR s.script LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern])
+        if story_id is not None:
+            conditions.append("c.story_id = ?")
+            params.append(story_id)
+
+        # snippet() and bm25() need a MATCH; \x02/\x03 mark matches until the text is escaped
+        if long_terms:
+            source = "scripts_fts JOIN scripts s ON s.id = scripts_fts.rowid"
+            columns = "snippet(scripts_fts, -1, char(2), char(3), '…', 24), bm25(scripts_fts)"
+            conditions.insert(0, "scripts_fts MATCH ?")
+            params.insert(0, " ".join('"' + term.replace('"', '""') + '"' for term in long_terms))
+            order = "ORDER BY bm25(scripts_fts)"
+        else:
+            source = "scripts s"
+            columns = "NULL, 0"
+            order = "ORDER BY s.id DESC"
+
+        try:
+            with self.connection('search_dialogue') as conn:
+                if long_terms and story_id is not None:
+                    # Confine the index walk to the span of the story's script IDs
+                    first_id, last_id = conn.execute("""
+                        SELECT MIN(s.id), MAX(s.id) FROM chapters c
+                        JOIN scripts s ON s.chapter_id = c.id
+                        WHERE c.story_id = ?
+                    """, (story_id,)).fetchone()
+                    if first_id is None:
+                        return []
+                    conditions.append("scripts_fts.rowid BETWEEN ? AND ?")
+                    params.extend([first_id, last_id])
+
+                if long_terms:
+                    # Oldest line inside the ranking window, walking matches newest first
+                    row = conn.execute(f"""
+                        SELECT scripts_fts.rowid FROM {source}
+                        JOIN chapters c ON c.id = s.chapter_id
+                        WHERE {' AND '.join(conditions)}
+                        ORDER BY scripts_fts.rowid DESC
+                        LIMIT 1 OFFSET ?
+                    """, params + [self.SEARCH_RANK_WINDOW - 1]).fetchone()
+                    if row is not None:
+                        conditions.append("scripts_fts.rowid >= ?")
+                        params.append(row[0])
+
+                rows = conn.execute(f"""
+                    SELECT s.id, s.chapter_id, c.story_id, s.role, s.emotion, s.script, s.order_index, {columns}
+                    FROM {source}
+                    JOIN chapters c ON c.id = s.chapter_id
+                    WHERE {' AND '.join(conditions)}
+                    {order}
+                    LIMIT ?
+                """, params + [limit]).fetchall()
+
+            results = []
+            for script_id, chapter_id, row_story_id, role, emotion, script, order_index, snippet, rank in rows:
+                if short_terms:
+                    snippet = self._mark_terms(snippet if snippet is not None else script, short_terms)
+                results.append({
+                    'script_id': script_id,
+                    'chapter_id': chapter_id,
+                    'story_id': row_story_id,
+                    'role': role,
+                    'emotion': emotion,
+                    'script': script,
+                    'order_index': order_index,
+                    'snippet': html.escape(snippet).replace('\x02', '<mark>').replace('\x03', '</mark>'),
+                    'rank': rank,
+                })
+            return results
+
+        except Exception as e:
+            log('database_manager', f'Error searching dialogue for {query!r}: {e}')
+            raise e
+
+    @staticmethod
+    def _mark_terms(text: str, terms: List[str]) -> str:
+        """Wrap case-insensitive occurrences of terms in \x02/\x03 markers"""
+        pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+        return pattern.sub(lambda match: '\x02' + match.group(0) + '\x03', text)
+
     def get_database_stats(self) -> Dict:
         """Get database statistics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection('get_database_stats') as conn:
                 cursor = conn.cursor()
 
                 cursor.execute("SELECT COUNT(*) FROM chapters")
@@ -185,10 +764,14 @@ class DatabaseManager:
                 cursor.execute("SELECT COUNT(*) FROM scripts")
                 script_count = cursor.fetchone()[0]
 
+                cursor.execute("SELECT COUNT(*) FROM stories")
+                story_count = cursor.fetchone()[0]
+
                 cursor.execute("SELECT MIN(created_at), MAX(created_at) FROM chapters")
                 date_range = cursor.fetchone()
 
                 return {
+                    'total_stories': story_count,
                     'total_chapters': chapter_count,
                     'total_scripts': script_count,
                     'earliest_chapter': date_range[0],
@@ -247,26 +830,37 @@ class DatabaseManager:
             log('database_manager', f'Error loading from log file {log_file_path}: {e}')
             raise e
 
-    def get_all_scripts_concatenated(self) -> str:
+    def get_all_scripts_concatenated(self, story_id: Optional[int] = None) -> str:
         """Retrieve all script content and concatenate into a single string.
 
-        Fetches script content for all chapters, filtering to include only
-        role and script data fields, then concatenates into a single string.
+        Fetches script content for all chapters (or only the chapters of
+        ``story_id`` when given), filtering to include only role and script
+        data fields, then concatenates into a single string.
 
         Returns:
             str: Concatenated script data with format 'Role: Script' per line
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection('get_all_scripts_concatenated') as conn:
                 cursor = conn.cursor()
 
-                # Query to get all scripts ordered by chapter creation time and script order
-                cursor.execute("""
-                    SELECT s.role, s.script
-                    FROM chapters c
-                    JOIN scripts s ON c.id = s.chapter_id
-                    ORDER BY c.created_at, s.order_index
-                """)
+                if story_id is None:
+                    # Query to get all scripts ordered by chapter creation time and script order
+                    cursor.execute("""
+                        SELECT s.role, s.script
+                        FROM chapters c
+                        JOIN scripts s ON c.id = s.chapter_id
+                        ORDER BY c.created_at, s.order_index
+                    """)
+                else:
+                    # Chapter IDs increase with insertion, so they order a story's chapters
+                    cursor.execute("""
+                        SELECT s.role, s.script
+                        FROM chapters c
+                        JOIN scripts s ON c.id = s.chapter_id
+                        WHERE c.story_id = ?
+                        ORDER BY c.id, s.order_index
+                    """, (story_id,))
 
                 script_rows = cursor.fetchall()
 
@@ -284,11 +878,392 @@ class DatabaseManager:
             log('database_manager', f'Error retrieving concatenated scripts: {e}')
             raise e
 
+    def get_story_context_state(self, story_id: int) -> Optional[tuple]:
+        """Return ``(context_version, context_chars)`` for a story without reading its text.
+
+        ``context_chars`` counts the whole history even past ``CONTEXT_TEXT_LIMIT``.
+        """
+        try:
+            with self.connection('get_story_context_state') as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT context_version, context_chars FROM story_contexts WHERE story_id = ?", (story_id,))
+                return cursor.fetchone()
+
+        except Exception as e:
+            log('database_manager', f'Error retrieving context state for story {story_id}: {e}')
+            raise e
+
+    def get_story_context(self, story_id: int) -> Optional[tuple]:
+        """Return ``(context_version, context_text)``, the materialized history of a story.
+
+        The text is only complete while ``context_chars <= CONTEXT_TEXT_LIMIT``.
+        """
+        try:
+            with self.connection('get_story_context') as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT context_version, context_text FROM story_contexts WHERE story_id = ?", (story_id,))
+                return cursor.fetchone()
+
+        except Exception as e:
+            log('database_manager', f'Error retrieving context for story {story_id}: {e}')
+            raise e
+
+    def get_story_chapter_ids(self, story_id: int) -> List[int]:
+        """Return the chapter IDs of a story in story order"""
+        try:
+            with self.connection('get_story_chapter_ids') as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id FROM chapters WHERE story_id = ? ORDER BY id", (story_id,))
+                return [row[0] for row in cursor.fetchall()]
+
+        except Exception as e:
+            log('database_manager', f'Error retrieving chapter ids for story {story_id}: {e}')
+            raise e
+
+    def get_chapter_texts(self, chapter_ids: List[int]) -> Dict[int, str]:
+        """Return the materialized 'Role: Script' text of the given chapters"""
+        try:
+            with self.connection('get_chapter_texts') as conn:
+                cursor = conn.cursor()
+                texts = {}
+                # Stay below SQLite's bound-parameter limit
+                for start in range(0, len(chapter_ids), 500):
+                    batch = chapter_ids[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    cursor.execute(
+                        f"SELECT id, script_text FROM chapters WHERE id IN ({placeholders})",
+                        batch
+                    )
+                    texts.update({row[0]: row[1] or "" for row in cursor.fetchall()})
+                return texts
+
+        except Exception as e:
+            log('database_manager', f'Error retrieving chapter texts: {e}')
+            raise e
+
+    def get_chapter_summaries(self, story_id: int) -> List[Dict]:
+        """Retrieve all cached summaries of a story ordered by level and position"""
+        try:
+            with self.connection('get_chapter_summaries') as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("""
+                    SELECT level, first_chapter_id, last_chapter_id, summary
+                    FROM chapter_summaries
+                    WHERE story_id = ?
+                    ORDER BY level, first_chapter_id
+                """, (story_id,))
+
+                return [
+                    {'level': row[0], 'first_chapter_id': row[1], 'last_chapter_id': row[2], 'summary': row[3]}
+                    for row in cursor.fetchall()
+                ]
+
+        except Exception as e:
+            log('database_manager', f'Error retrieving summaries for story {story_id}: {e}')
+            raise e
+
+    def get_chapter_summary_spans(self, story_id: int) -> List[tuple]:
+        """Return ``(level, first_chapter_id, last_chapter_id)`` of every cached summary, without text"""
+        try:
+            with self.connection('get_chapter_summary_spans') as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT level, first_chapter_id, last_chapter_id
+                    FROM chapter_summaries
+                    WHERE story_id = ?
+                    ORDER BY level, first_chapter_id
+                """, (story_id,))
+                return cursor.fetchall()
+
+        except Exception as e:
+            log('database_manager', f'Error retrieving summary spans for story {story_id}: {e}')
+            raise e
+
+    def get_summary_texts(self, story_id: int, spans: List[tuple]) -> Dict[tuple, str]:
+        """Return summary text keyed by ``(level, first_chapter_id)`` for the requested spans"""
+        try:
+            with self.connection('get_summary_texts') as conn:
+                cursor = conn.cursor()
+                texts = {}
+                for level, first_chapter_id in spans:
+                    cursor.execute(
+                        "SELECT summary FROM chapter_summaries WHERE story_id = ? AND level = ? AND first_chapter_id = ?",
+                        (story_id, level, first_chapter_id)
+                    )
+                    row = cursor.fetchone()
+                    if row is not None:
+                        texts[(level, first_chapter_id)] = row[0]
+                return texts
+
+        except Exception as e:
+            log('database_manager', f'Error retrieving summary texts for story {story_id}: {e}')
+            raise e
+
+    def save_chapter_summary(self, story_id: int, level: int, first_chapter_id: int,
+                             last_chapter_id: int, summary: str) -> None:
+        """Store a summary; an existing summary for the same span is kept"""
+        try:
+            with self.connection('save_chapter_summary') as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT OR IGNORE INTO chapter_summaries
+                        (story_id, level, first_chapter_id, last_chapter_id, summary)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (story_id, level, first_chapter_id, last_chapter_id, summary))
+                conn.commit()
+
+        except Exception as e:
+            log('database_manager', f'Error saving summary for story {story_id}: {e}')
+            raise e
+
+    def add_opening_chapter(self, prompt_hash: str, chapter_json: str, response_text: str) -> int:
+        """Store a pre-generated opening chapter and return its pool entry ID"""
+        try:
+            with self.connection('add_opening_chapter') as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO opening_pool (prompt_hash, chapter_json, response_text) VALUES (?, ?, ?)",
+                    (prompt_hash, chapter_json, response_text)
+                )
+                conn.commit()
+                return cursor.lastrowid
+
+        except Exception as e:
+            log('database_manager', f'Error adding opening chapter: {e}')
+            raise e
+
+    def pop_opening_chapter(self, prompt_hash: str) -> Optional[tuple]:
+        """Remove and return the oldest pooled opening chapter for a prompt hash.
+
+        Returns:
+            Optional[tuple]: ``(chapter_json, response_text)`` or None if the pool is empty
+        """
+        try:
+            with self.connection('pop_opening_chapter') as conn:
+                cursor = conn.cursor()
+                # Take the write lock first so two callers never pop the same row
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor.execute(
+                        "SELECT id, chapter_json, response_text FROM opening_pool WHERE prompt_hash = ? ORDER BY id LIMIT 1",
+                        (prompt_hash,)
+                    )
+                    row = cursor.fetchone()
+                    if row is not None:
+                        cursor.execute("DELETE FROM opening_pool WHERE id = ?", (row[0],))
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
+                return (row[1], row[2]) if row is not None else None
+
+        except Exception as e:
+            log('database_manager', f'Error popping opening chapter: {e}')
+            raise e
+
+    def count_opening_chapters(self, prompt_hash: str) -> int:
+        """Count pooled opening chapters for a prompt hash"""
+        try:
+            with self.connection('count_opening_chapters') as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM opening_pool WHERE prompt_hash = ?", (prompt_hash,))
+                return cursor.fetchone()[0]
+
+        except Exception as e:
+            log('database_manager', f'Error counting opening chapters: {e}')
+            raise e
+
+    def purge_opening_chapters(self, keep_hash: str) -> int:
+        """Delete pooled opening chapters generated from any other prompt"""
+        try:
+            with self.connection('purge_opening_chapters') as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM opening_pool WHERE prompt_hash != ?", (keep_hash,))
+                conn.commit()
+                return cursor.rowcount
+
+        except Exception as e:
+            log('database_manager', f'Error purging opening chapters: {e}')
+            raise e
+
+    def get_cached_response(self, cache_key: str, created_after: float, now: float) -> Optional[tuple]:
+        """Look up a cached response newer than ``created_after`` and mark it used.
+
+        Returns:
+            Optional[tuple]: ``(response_text, prompt_tokens, output_tokens)`` or None
+        """
+        try:
+            with self.connection('get_cached_response') as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT response_text, prompt_tokens, output_tokens FROM response_cache "
+                    "WHERE cache_key = ? AND created_at > ?",
+                    (cache_key, created_after)
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    cursor.execute("UPDATE response_cache SET last_used = ? WHERE cache_key = ?", (now, cache_key))
+                    conn.commit()
+                return row
+
+        except Exception as e:
+            log('database_manager', f'Error reading response cache: {e}')
+            raise e
+
+    def put_cached_response(self, cache_key: str, response_text: str, prompt_tokens: Optional[int],
+                            output_tokens: Optional[int], now: float, created_after: float, max_bytes: int) -> int:
+        """Store a response, then evict expired entries and least recently used ones over ``max_bytes``.
+
+        Returns:
+            int: Number of evicted entries
+        """
+        try:
+            with self.connection('put_cached_response') as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT OR REPLACE INTO response_cache "
+                    "(cache_key, response_text, prompt_tokens, output_tokens, size, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (cache_key, response_text, prompt_tokens, output_tokens,
+                     len(response_text.encode('utf-8')), now, now)
+                )
+                cursor.execute("DELETE FROM response_cache WHERE created_at <= ?", (created_after,))
+                evicted = cursor.rowcount
+                # Keep the most recently used entries whose sizes add up to max_bytes
+                cursor.execute("""
+                    DELETE FROM response_cache WHERE cache_key IN (
+                        SELECT cache_key FROM (
+                            SELECT cache_key, SUM(size) OVER (ORDER BY last_used DESC, cache_key) AS total
+                            FROM response_cache
+                        ) WHERE total > ?
+                    )
+                """, (max_bytes,))
+                evicted += cursor.rowcount
+                conn.commit()
+                return evicted
+
+        except Exception as e:
+            log('database_manager', f'Error writing response cache: {e}')
+            raise e
+
+    def get_response_cache_stats(self) -> Dict:
+        """Number of cached responses and their total size in bytes"""
+        try:
+            with self.connection('get_response_cache_stats') as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache")
+                entries, size = cursor.fetchone()
+                return {'entries': entries, 'bytes': size}
+
+        except Exception as e:
+            log('database_manager', f'Error reading response cache stats: {e}')
+            raise e
+
+    def create_job(self, story_id: int, chapter_index: int, priority: str, created_at: float,
+                   new_story: bool = False) -> int:
+        """Record a queued generation job and return its ID
+
+        ``new_story`` marks a job whose story was created at submission.
+        """
+        try:
+            with self.connection('create_job') as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO generation_jobs (story_id, chapter_index, priority, status, created_at, new_story) "
+                    "VALUES (?, ?, ?, 'queued', ?, ?)",
+                    (story_id, chapter_index, priority, created_at, int(new_story))
+                )
+                conn.commit()
+                return cursor.lastrowid
+
+        except Exception as e:
+            log('database_manager', f'Error creating job: {e}')
+            raise e
+
+    def update_job(self, job_id: int, status: str, now: float,
+                   result_json: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Move a job to ``running``, ``done`` or ``failed``"""
+        try:
+            with self.connection('update_job') as conn:
+                cursor = conn.cursor()
+                if status == 'running':
+                    cursor.execute(
+                        "UPDATE generation_jobs SET status = ?, started_at = ? WHERE id = ?",
+                        (status, now, job_id)
+                    )
+                else:
+                    cursor.execute(
+                        "UPDATE generation_jobs SET status = ?, finished_at = ?, result_json = ?, error = ? WHERE id = ?",
+                        (status, now, result_json, error, job_id)
+                    )
+                conn.commit()
+
+        except Exception as e:
+            log('database_manager', f'Error updating job {job_id}: {e}')
+            raise e
+
+    @staticmethod
+    def _job_from_row(row: tuple) -> Dict:
+        return {
+            'id': row[0], 'story_id': row[1], 'index': row[2], 'priority': row[3], 'status': row[4],
+            'result': json.loads(row[5]) if row[5] is not None else None, 'error': row[6], 'created_at': row[7],
+            'new_story': bool(row[8]),
+        }
+
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        """Retrieve a generation job by ID"""
+        try:
+            with self.connection('get_job') as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id, story_id, chapter_index, priority, status, result_json, error, created_at, new_story "
+                    "FROM generation_jobs WHERE id = ?",
+                    (job_id,)
+                )
+                row = cursor.fetchone()
+                return self._job_from_row(row) if row is not None else None
+
+        except Exception as e:
+            log('database_manager', f'Error retrieving job {job_id}: {e}')
+            raise e
+
+    def get_unfinished_jobs(self) -> List[Dict]:
+        """Queued and interrupted jobs, oldest first"""
+        try:
+            with self.connection('get_unfinished_jobs') as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id, story_id, chapter_index, priority, status, result_json, error, created_at, new_story "
+                    "FROM generation_jobs WHERE status IN ('queued', 'running') ORDER BY id"
+                )
+                return [self._job_from_row(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            log('database_manager', f'Error retrieving unfinished jobs: {e}')
+            raise e
+
+    def purge_finished_jobs(self, finished_before: float) -> int:
+        """Delete jobs that finished before the given time"""
+        try:
+            with self.connection('purge_finished_jobs') as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "DELETE FROM generation_jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                    (finished_before,)
+                )
+                conn.commit()
+                return cursor.rowcount
+
+        except Exception as e:
+            log('database_manager', f'Error purging jobs: {e}')
+            raise e
+
     def clear_database(self) -> bool:
         """Clear all data from the database and reset AUTOINCREMENT values.
 
         This function will:
-        1. Delete all data from both tables
+        1. Delete all data from every table (all stories)
         2. Reset AUTOINCREMENT counters to start from 1
         3. Vacuum the database to reclaim space
 
@@ -297,7 +1272,7 @@ class DatabaseManager:
         """
         try:
             # First phase: Delete data and reset sequences within transaction
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection('clear_database') as conn:
                 cursor = conn.cursor()
 
                 # Delete all data from scripts table first (due to foreign key constraints)
@@ -308,9 +1283,18 @@ class DatabaseManager:
                 cursor.execute("DELETE FROM chapters")
                 log('database_manager', 'Cleared all chapters from database')
 
+                # Delete all cached summaries
+                cursor.execute("DELETE FROM chapter_summaries")
+                cursor.execute("DELETE FROM generation_jobs")
+
+                # Delete all stories
+                cursor.execute("DELETE FROM story_contexts")
+                cursor.execute("DELETE FROM stories")
+                log('database_manager', 'Cleared all stories from database')
+
                 # Reset AUTOINCREMENT sequences by deleting from sqlite_sequence table
-                cursor.execute("DELETE FROM sqlite_sequence WHERE name IN ('chapters', 'scripts')")
-                log('database_manager', 'Reset AUTOINCREMENT sequences for chapters and scripts tables')
+                cursor.execute("DELETE FROM sqlite_sequence WHERE name IN ('stories', 'chapters', 'scripts', 'chapter_summaries')")
+                log('database_manager', 'Reset AUTOINCREMENT sequences for stories, chapters and scripts tables')
 
                 conn.commit()
 
@@ -326,7 +1310,7 @@ class DatabaseManager:
                     return False
 
             # Second phase: VACUUM database outside of transaction
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection('clear_database') as conn:
                 conn.execute("VACUUM")
                 log('database_manager', 'Database vacuumed and reorganized')
 
@@ -337,22 +1321,39 @@ class DatabaseManager:
             log('database_manager', f'Error clearing database: {e}')
             raise e
 
-    def export_to_json(self, output_file: str):
-        """Export all database contents to JSON file"""
-        try:
-            chapters = self.get_all_chapters()
+    @staticmethod
+    def _open_archive(path: Path, mode: str, compress: Optional[bool] = None):
+        """Open a text archive, gzip-compressed when it ends in .gz (or compress=True)"""
+        if compress is None:
+            if 'r' in mode:
+                with open(path, 'rb') as f:
+                    compress = f.read(2) == b'\x1f\x8b'
+            else:
+                compress = path.suffix == '.gz'
+        if compress:
+            return gzip.open(path, mode + 't', encoding='utf-8')
+        return open(path, mode, encoding='utf-8')
 
-            export_data = {
-                'export_timestamp': datetime.now().isoformat(),
-                'total_chapters': len(chapters),
-                'chapters': chapters
-            }
+    def export_to_json(self, output_file: str):
+        """Export all database contents to JSON file
 
+        Chapters are written one at a time from a cursor, so memory use does
+        not grow with the database.
+        """
+        try:
             output_path = Path(output_file)
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
+            total_chapters = self.get_database_stats()['total_chapters']
             with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2)
+                f.write('{\n')
+                f.write(f'  "export_timestamp": {json.dumps(datetime.now().isoformat())},\n')
+                f.write(f'  "total_chapters": {total_chapters},\n')
+                f.write('  "chapters": [')
+                for number, chapter in enumerate(self.iter_chapters()):
+                    body = json.dumps(chapter, ensure_ascii=False, indent=2).replace('\n', '\n    ')
+                    f.write(('' if number == 0 else ',') + '\n    ' + body)
+                f.write('\n  ]\n}\n')
 
             log('database_manager', f'Database exported to {output_file}')
 
@@ -360,6 +1361,136 @@ class DatabaseManager:
             log('database_manager', f'Error exporting database: {e}')
             raise e
 
+    def export_to_jsonl(self, output_file: str, story_id: Optional[int] = None,
+                        compress: Optional[bool] = None) -> int:
+        """Stream chapters to a JSON Lines archive, one chapter per line.
+
+        Args:
+            output_file: Destination path; gzip-compressed when it ends in .gz
+            story_id: Only export this story (all stories when None)
+            compress: Force gzip on or off regardless of the file name
+
+        Returns:
+            int: Number of chapters written
+        """
+        try:
+            output_path = Path(output_file)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+
+            exported = 0
+            with self._open_archive(output_path, 'w', compress) as f:
+                for chapter in self.iter_chapters(story_id):
+                    f.write(json.dumps(chapter, ensure_ascii=False) + '\n')
+                    exported += 1
+
+            log('database_manager', f'Exported {exported} chapters to {output_file}')
+            return exported
+
+        except Exception as e:
+            log('database_manager', f'Error exporting database: {e}')
+            raise e
+
+    def import_from_jsonl(self, input_file: str, batch_size: int = 2000) -> int:
+        """Bulk import chapters from a JSON Lines archive written by export_to_jsonl.
+
+        Lines are read one at a time and written ``batch_size`` chapters per
+        transaction with executemany, so archives of any size import in
+        bounded memory. Every exported story becomes a new story here;
+        chapters keep their order, timestamps and scripts. Gzip archives are
+        detected automatically.
+
+        Returns:
+            int: Number of chapters imported
+        """
+        try:
+            story_map = {}
+            batch = []
+            imported = 0
+            with self._open_archive(Path(input_file), 'r') as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    chapter = json.loads(line)
+                    if not isinstance(chapter, dict) or 'scripts' not in chapter:
+                        raise ValueError(f'{input_file}:{line_number}: not a chapter')
+                    batch.append(chapter)
+                    if len(batch) >= batch_size:
+                        imported += self._import_batch(batch, story_map)
+                        batch = []
+            if batch:
+                imported += self._import_batch(batch, story_map)
+
+            log('database_manager', f'Imported {imported} chapters ({len(story_map)} stories) from {input_file}')
+            return imported
+
+        except Exception as e:
+            log('database_manager', f'Error importing {input_file}: {e}')
+            raise e
+
+    def _import_batch(self, chapters: List[Dict], story_map: Dict[int, int]) -> int:
+        """Write one batch of imported chapters in a single transaction"""
+        with self.connection('import_from_jsonl') as conn:
+            cursor = conn.cursor()
+            # Take the write lock up front so the chapter IDs reserved below stay free
+            cursor.execute("BEGIN IMMEDIATE")
+
+            for chapter in chapters:
+                source_story = chapter.get('story_id')
+                if source_story is not None and source_story not in story_map:
+                    cursor.execute("INSERT INTO stories DEFAULT VALUES")
+                    story_map[source_story] = cursor.lastrowid
+                    cursor.execute("INSERT INTO story_contexts (story_id) VALUES (?)", (cursor.lastrowid,))
+
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM chapters")
+            first_id = max(cursor.fetchone()[0], self._sequence_value(cursor, 'chapters')) + 1
+
+            # Continue each story's chapter numbering (stories can span batches)
+            last_index: Dict[int, int] = {}
+            for story_id in {story_map[c['story_id']] for c in chapters if c.get('story_id') is not None}:
+                cursor.execute("SELECT COALESCE(MAX(chapter_index), 0) FROM chapters WHERE story_id = ?", (story_id,))
+                last_index[story_id] = cursor.fetchone()[0]
+
+            chapter_rows, script_rows = [], []
+            story_texts: Dict[int, List[str]] = {}
+            for offset, chapter in enumerate(chapters):
+                chapter_id = first_id + offset
+                story_id = story_map.get(chapter.get('story_id'))
+                chapter_index = None
+                if story_id is not None:
+                    chapter_index = last_index[story_id] = last_index[story_id] + 1
+                scripts = chapter['scripts']
+                script_text = self.render_scripts(scripts)
+                chapter_rows.append((chapter_id, chapter.get('scene_background', 'unknown'),
+                                     chapter.get('created_at'), story_id, script_text, chapter_index))
+                script_rows.extend(
+                    (chapter_id, script['role'], script['emotion'], script['script'], idx)
+                    for idx, script in enumerate(scripts)
+                )
+                if story_id is not None:
+                    story_texts.setdefault(story_id, []).append(script_text)
+
+            cursor.executemany(
+                "INSERT INTO chapters (id, scene_background, created_at, story_id, script_text, chapter_index) "
+                "VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?)",
+                chapter_rows
+            )
+            cursor.executemany(
+                "INSERT INTO scripts (chapter_id, role, emotion, script, order_index) VALUES (?, ?, ?, ?, ?)",
+                script_rows
+            )
+            cursor.executemany(self.APPEND_CONTEXT_SQL, [
+                {'text': text, 'chars': len(text), 'limit': self.CONTEXT_TEXT_LIMIT, 'story_id': story_id}
+                for story_id, text in ((story_id, "\n".join(texts)) for story_id, texts in story_texts.items())
+            ])
+            return len(chapter_rows)
+
+    @staticmethod
+    def _sequence_value(cursor: sqlite3.Cursor, table: str) -> int:
+        """Last AUTOINCREMENT value handed out for a table (0 if none yet)"""
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
 
 def main():
     """Main function for testing database manager"""
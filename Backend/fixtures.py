@@ -0,0 +1,82 @@
+"""
+Shared fixtures for the Backend unit tests
+"""
+
+import asyncio
+import os
+
+from database_manager import DatabaseManager
+from generate_script import GenerateScript
+from llm_backend import LLMBackend, LLMResult
+from story_models import Chapter
+
+
+SAMPLE_CHAPTER = {
+    "scene_background": "Classroom_Day",
+    "scripts": [
+        {"role": "narrator", "emotion": "neutral", "script": "아침 교실."},
+        {"role": "Ji-hoon", "emotion": "happy", "script": "안녕!"},
+    ],
+}
+
+
+def factory(cls, **defaults):
+    """Constructor of ``cls`` using test defaults that keyword arguments override."""
+    def make(*args, **overrides):
+        return cls(*args, **{**defaults, **overrides})
+    return make
+
+
+class ScriptedCalls:
+    """Coroutine function whose successive calls sleep and then return or raise as scripted.
+
+    Each step is ``(delay, outcome)``; the last step repeats once the script
+    runs out. ``calls`` counts started calls, ``cancelled`` those cancelled
+    while sleeping.
+    """
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        delay, outcome = self.steps[min(self.calls, len(self.steps) - 1)]
+        self.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+class RecordingBackend(LLMBackend):
+    """Backend that records prompts and sleeps instead of calling an API."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.prompts = []
+
+    async def generate_chapter(self, prompt):
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        chapter = Chapter.model_validate(SAMPLE_CHAPTER)
+        return LLMResult(text=chapter.model_dump_json(), parsed=chapter)
+
+    async def stream_chapter(self, prompt):
+        self.prompts.append(prompt)
+        text = Chapter.model_validate(SAMPLE_CHAPTER).model_dump_json()
+        for start in range(0, len(text), 7):
+            await asyncio.sleep(self.delay / 10)
+            yield text[start:start + 7]
+
+    async def generate_text(self, prompt, max_output_tokens=1024, temperature=0.3):
+        return "요약"
+
+
+def make_service(tmp_dir: str, delay: float = 0.0, backend: LLMBackend = None) -> GenerateScript:
+    """GenerateScript on a fresh database in ``tmp_dir``, by default with a RecordingBackend."""
+    return GenerateScript(DatabaseManager(os.path.join(tmp_dir, "scripts.db")), backend or RecordingBackend(delay))
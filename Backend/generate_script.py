@@ -1,53 +1,50 @@
-import enum
+import asyncio
+import contextvars
+import functools
 import os
 import sys
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from pydantic import BaseModel
+from typing import Optional
 from dotenv import load_dotenv
-from google import genai
-from google.genai import types
 
+# Import story data models (re-exported for existing imports)
+from story_models import Emotion, Script, Background, Chapter
+# Import pluggable LLM backends
+from llm_backend import LLMBackend, LLMResult, UnparsableResponseError, create_backend
 # Import logging module
 from tool.logmaker import log
+# Import generation metrics
+from tool.metrics import (STAGE_SECONDS, CHAPTER_SECONDS, LLM_TOKENS, LLM_TOKENS_TOTAL, GENERATIONS_IN_FLIGHT,
+                          COALESCED_REQUESTS, LLM_SALVAGE, index_bucket)
 # Import character name normalization module
-from tool.character_normalizer import normalize_character_name
+from tool.character_normalizer import normalize_character_name, normalize_many
+# Import incremental parser used for streamed chapters
+from tool.chapter_parser import ChapterStreamParser, salvage_chapter
 # Import database manager
 from database_manager import DatabaseManager
+# Import token-bounded story context builder
+from context_builder import StoryContextBuilder
+# Import background pre-generation of the next chapter
+from prefetch import SpeculativePrefetcher
+# Import warm pool of pre-generated opening chapters
+from opening_pool import OpeningPool
+# Import cache of LLM responses keyed by prompt
+from response_cache import ResponseCache
+# Import deadlines, retries and hedging for LLM requests
+from resilience import ResilientCaller
+# Import best-of-N candidate generation
+from candidates import CandidateSelector
 
 # Load environment variables from .env file
 load_dotenv()
 
-# --- Enum defining emotion states ---
-class Emotion(enum.Enum):
-    # Base Expressions
-    NEUTRAL = 'neutral'      # Calm/expressionless
-    HAPPY = 'happy'        # Happy/joyful
-    SAD = 'sad'            # Sadness
-    ANGRY = 'angry'          # Angry
-    SURPRISED = 'surprised'    # Surprised/shocked
-    SHY = 'shy'                  # Shy
-
-
-# --- Script model definition ---
-class Script(BaseModel):
-    role: str
-    emotion: Emotion
-    script: str
-
-class Background(enum.Enum):
-    Classroom_Day = 'Classroom_Day'
-    Classroom_Sunset = 'Classroom_Sunset'
-    School_Hallway_Day = 'School_Hallway_Day'
-    School_Rooftop = 'School_Rooftop'
-    Protagonist_Room = 'Protagonist_Room'
-    Cafe_Interior = 'Cafe_Interior'
-    Park = 'Park'
-    Schoolyard = 'Schoolyard'
-
-class Chapter(BaseModel):
-    """Add background information"""
-    scene_background: Background
-    scripts: list[Script]
+SUMMARY_PROMPT = (
+    "Summarize the following part of a visual novel story in Korean. Keep every character's name, "
+    "how their relationships changed, key events, and unresolved plot threads. "
+    "Write at most 200 words.\n\n"
+)
 
 def get_prompts_path():
     """Get the correct path to prompts directory, whether running as script or executable."""
@@ -58,86 +55,533 @@ def get_prompts_path():
         # Running as script
         return Path(__file__).parent / "prompts"
 
+class StoryNotFoundError(LookupError):
+    """Raised when a chapter is requested for a story that does not exist"""
+
+
 class GenerateScript:
-    """Service class for handling Gemini API interactions"""
+    """Service class for handling story generation through an LLM backend"""
     
-    def __init__(self):
-        """Initialize Gemini client with API key and database manager"""
+    def __init__(self, db_manager: DatabaseManager = None, backend: LLMBackend = None):
+        """Initialize LLM backend and database manager
+
+        The backend defaults to the one selected by AGVN_LLM_BACKEND
+        (Gemini unless configured otherwise).
+        """
         try:
-            api_key = os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                raise ValueError("GOOGLE_API_KEY not found in environment variables.")
-            # Create Google AI client instance
-            self.client = genai.Client(api_key=api_key)
+            self.backend = backend or create_backend()
+            # Deadlines, retries and optional hedging around chapter requests
+            self.resilience = ResilientCaller(self.backend.is_retryable)
+            # Salvaged chapters shorter than this are completed with a follow-up request
+            self.salvage_min_lines = int(os.getenv("AGVN_SALVAGE_MIN_LINES", "12"))
+            # Optionally generates several candidates per chapter and keeps the first valid one
+            self.candidates = CandidateSelector()
             # Initialize database manager
-            self.db_manager = DatabaseManager()
+            self.db_manager = db_manager or DatabaseManager()
+            # Bounded pool for blocking work (prompt file, SQLite) so the event loop stays free
+            self.io_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("AGVN_IO_WORKERS", "4")),
+                thread_name_prefix="agvn-io",
+            )
+            # One lock per active story; different stories never wait on each other
+            self.story_locks = weakref.WeakValueDictionary()
+            # Running generate_script calls by (story_id, index); duplicates await the same task
+            self.in_flight = {}
+            # Queues of connected story sockets by story id; they receive events
+            # not tied to their own request, such as finished speculative chapters
+            self.story_listeners = {}
+            # Keeps prompts within budget by summarizing older chapters
+            self.context_builder = StoryContextBuilder(self.db_manager, self.summarize_text, self.run_blocking)
+            # Optionally pre-generates chapter N+1 while chapter N is being read
+            self.prefetcher = SpeculativePrefetcher()
+            # Ready-made first chapters for instant new games; they bypass the
+            # response cache, which would fill the pool with copies of one chapter
+            self.opening_pool = OpeningPool(
+                self.db_manager, self.opening_prompt,
+                functools.partial(self.request_chapter, use_cache=False), self.run_blocking
+            )
+            # Optionally serves repeated prompts from stored responses
+            self.response_cache = ResponseCache(self.db_manager, self.run_blocking)
         except ValueError as e:
             print(f"Error: {e}")
             raise e
-    
-    def generate_script(self,index: int = 0):
 
+    async def start_background_tasks(self):
+        """Start long-running helpers; call once the event loop is running."""
+        self.opening_pool.start()
+
+    async def stop_background_tasks(self):
+        """Stop long-running helpers and cancel speculative work."""
+        await self.opening_pool.stop()
+        for story_id in list(self.prefetcher.slots):
+            self.prefetcher.cancel(story_id)
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking callable on the I/O executor and await its result."""
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context (e.g. the request id used by the logger) into the worker
+        call = functools.partial(contextvars.copy_context().run, func, *args)
+        return await loop.run_in_executor(self.io_executor, call)
+
+    def story_lock(self, story_id: int) -> asyncio.Lock:
+        """Return the lock serializing generation within one story."""
+        lock = self.story_locks.get(story_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.story_locks[story_id] = lock
+        return lock
+
+    def open_story(self, index: int, story_id: int = None) -> tuple:
+        """Resolve the story a request belongs to (blocking).
+
+        Starting a game (``index <= 1``) without a story creates one; any
+        other request must name an existing story.
+
+        Returns:
+            tuple: ``(story_id, created)``
+        """
+        if story_id is not None and self.db_manager.story_exists(story_id):
+            return story_id, False
+        if index <= 1:
+            return self.db_manager.create_story(), True
+        raise StoryNotFoundError(f"Story {story_id} not found; start a new game with index=1")
+
+    def read_base_world_prompt(self) -> str:
+        """Read base world prompt from file, returning an empty string on failure"""
+        base_world_prompt_path = get_prompts_path() / "base_world.prompt"
         try:
+            with STAGE_SECONDS.time(stage='prompt_read'), open(base_world_prompt_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            log('story_generation_workflow', f'Warning: base_world.prompt file not found at {base_world_prompt_path}')
+            return ""
+        except Exception as e:
+            log('story_generation_workflow', f'Error reading base_world.prompt: {e}')
+            return ""
 
-            # Read base world prompt from file
-            base_world_prompt_path = get_prompts_path() / "base_world.prompt"
-            try:
-                with open(base_world_prompt_path, 'r', encoding='utf-8') as f:
-                    base_world_prompt = f.read()
-            except FileNotFoundError:
-                log('story_generation_workflow', f'Warning: base_world.prompt file not found at {base_world_prompt_path}')
-                base_world_prompt = ""
-            except Exception as e:
-                log('story_generation_workflow', f'Error reading base_world.prompt: {e}')
-                base_world_prompt = ""
-
-            if index > 1:
-                all_scripts_concatenated = self.db_manager.get_all_scripts_concatenated()
-            else:
-                all_scripts_concatenated = ""
-                self.db_manager.clear_database()  # Clear database for new story
-
-            prompt = f"{base_world_prompt}\n{all_scripts_concatenated}\n---\nBased on the characters and world-building provided above, please write a script for a visual novel dating simulation. The script should be one chapter long and consist of the narrator's descriptions and the characters' dialogue. 한국어로 작성되어야 합니다."
-
-            log('chat_context', prompt)
-            
-            response = self.client.models.generate_content(
-                model="gemini-2.5-pro",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=Chapter,
-                    max_output_tokens=35500,
-                    temperature=1,
-                ),
-            )
+    async def summarize_text(self, text: str) -> str:
+        """Summarize part of a story with the backend's lighter text model."""
+        summary = await self.backend.generate_text(SUMMARY_PROMPT + text, max_output_tokens=1024, temperature=0.3)
+        return summary.strip()
+
+    @staticmethod
+    def compose_prompt(base_world_prompt: str, story_context: str) -> str:
+        """Combine the world prompt, story history and writing instructions."""
+        return f"{base_world_prompt}\n{story_context}\n---\nBased on the characters and world-building provided above, please write a script for a visual novel dating simulation. The script should be one chapter long and consist of the narrator's descriptions and the characters' dialogue. 한국어로 작성되어야 합니다."
+
+    async def opening_prompt(self) -> str:
+        """The prompt for the first chapter of any story."""
+        base_world_prompt = await self.run_blocking(self.read_base_world_prompt)
+        return self.compose_prompt(base_world_prompt, "")
+
+    async def build_prompt(self, index: int, story_id: int = None) -> str:
+        """Build the full generation prompt for a chapter of one story."""
+        base_world_prompt = await self.run_blocking(self.read_base_world_prompt)
+
+        if index > 1:
+            with STAGE_SECONDS.time(stage='history'):
+                story_context = await self.context_builder.build(story_id)
+        else:
+            story_context = ""
+
+        prompt = self.compose_prompt(base_world_prompt, story_context)
 
-            chapter: Chapter = response.parsed
+        log('chat_context', prompt, story_id=story_id, index=index)
+        return prompt
 
-            # Normalize character names in all scripts
-            for script in chapter.scripts:
-                script.role = normalize_character_name(script.role)
+    def save_generated_chapter(self, chapter: Chapter, response_text: str, story_id: int = None,
+                               index: int = None) -> dict:
+        """Normalize, log and persist a generated chapter; return it as a dictionary (blocking).
 
-            cutted_script = [f"{line.role}: {line.script}" for line in chapter.scripts]
-            cutted_script_str = "\n".join(cutted_script)
-            log('cutted_script_str', cutted_script_str)
-            log('response_text', response.text)
+        ``index`` is the chapter's position in the story; a chapter already
+        saved at that position is kept as is.
+        """
+        # Normalize character names in all scripts
+        with STAGE_SECONDS.time(stage='normalize'):
+            roles = normalize_many([script.role for script in chapter.scripts])
+            for script, role in zip(chapter.scripts, roles):
+                script.role = role
 
-            # Convert chapter to dictionary for database storage
-            chapter_data = chapter.model_dump()
+        cutted_script = [f"{line.role}: {line.script}" for line in chapter.scripts]
+        cutted_script_str = "\n".join(cutted_script)
+        log('cutted_script_str', cutted_script_str, story_id=story_id)
+        log('response_text', response_text, story_id=story_id)
 
-            # Save to database
+        # Convert chapter to dictionary for database storage
+        chapter_data = chapter.model_dump()
+
+        # Save to database
+        try:
+            with STAGE_SECONDS.time(stage='save_chapter'):
+                chapter_id = self.db_manager.save_chapter(
+                    chapter_data, story_id, max(index, 1) if index is not None else None
+                )
+            log('story_generation_workflow', f'Chapter saved to database with ID: {chapter_id}')
+        except Exception as db_error:
+            log('story_generation_workflow', f'Warning: Failed to save chapter to database: {db_error}')
+            # Continue execution even if database save fails
+
+        chapter_data['story_id'] = story_id
+        return chapter_data
+
+    def cache_key(self, prompt: str) -> Optional[str]:
+        """Response cache key of a chapter prompt, or None when caching is off."""
+        if not self.response_cache.enabled:
+            return None
+        return self.response_cache.key(self.backend.cache_identity(), prompt)
+
+    async def request_chapter(self, prompt: str, index: int = 1, use_cache: bool = True) -> tuple:
+        """Ask the backend for one chapter; return ``(chapter, response_text)``.
+
+        ``index`` is the chapter being generated and only labels the token
+        metrics. With the response cache enabled, a stored response for the
+        same prompt and backend settings is returned instead of a new request.
+        Transient failures are retried by ``self.resilience``. A response
+        that does not parse is salvaged: its complete lines are kept, and if
+        there are fewer than ``salvage_min_lines`` the rest of the chapter is
+        requested with a follow-up prompt. Only responses with nothing to
+        salvage are regenerated from scratch. With best-of-N enabled
+        (``self.candidates``), several chapters are generated this way at once
+        and the first valid one is used.
+        """
+        cache_key = self.cache_key(prompt) if use_cache else None
+        if cache_key is not None:
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached.parsed, cached.text
+
+        with STAGE_SECONDS.time(stage='llm'):
+            if self.candidates.enabled:
+                result = await self.candidates.select(functools.partial(self.generate_result, prompt))
+            else:
+                result = await self.generate_result(prompt)
+        self.record_usage(result, index)
+        if cache_key is not None and not result.truncated:
+            await self.response_cache.put(cache_key, result)
+        return result.parsed, result.text
+
+    async def generate_result(self, prompt: str) -> LLMResult:
+        """One chapter with retries, salvage and continuation (see ``request_chapter``)."""
+        result = await self.resilience.call(functools.partial(self.request_parsed, prompt))
+        if result.truncated:
+            if len(result.parsed.scripts) < self.salvage_min_lines:
+                result = await self.continue_chapter(prompt, result)
+            else:
+                LLM_SALVAGE.inc(result='recovered')
+        return result
+
+    async def request_parsed(self, prompt: str) -> LLMResult:
+        """One chapter request; a response that does not parse is salvaged."""
+        result = await self.backend.generate_chapter(prompt)
+        if result.parsed is None:
+            result = self.salvage_response(result)
+        return result
+
+    def salvage_response(self, result: LLMResult) -> LLMResult:
+        """Recover the background and every complete, valid line of a malformed response.
+
+        Raises:
+            UnparsableResponseError: if no background or no line can be recovered
+        """
+        raw_text = result.text or ''
+        scene_background, values = salvage_chapter(raw_text)
+        scripts = []
+        for value in values:
             try:
-                chapter_id = self.db_manager.save_chapter(chapter_data)
-                log('story_generation_workflow', f'Chapter saved to database with ID: {chapter_id}')
-            except Exception as db_error:
-                log('story_generation_workflow', f'Warning: Failed to save chapter to database: {db_error}')
-                # Continue execution even if database save fails
+                scripts.append(Script.model_validate(value))
+            except ValueError as e:
+                log('story_generation_workflow', f'Warning: skipping invalid salvaged script: {e}')
+        try:
+            scene_background = Background(scene_background)
+        except ValueError:
+            scene_background = None
+        if scene_background is None or not scripts:
+            LLM_SALVAGE.inc(result='failed')
+            raise UnparsableResponseError(f"Response does not match the chapter schema: {raw_text[:200]!r}")
+
+        chapter = Chapter(scene_background=scene_background, scripts=scripts)
+        log('story_generation_workflow', f'Salvaged {len(scripts)} lines from a malformed response of {len(raw_text)} chars')
+        log('response_text', raw_text, salvaged=True)
+        return LLMResult(text=chapter.model_dump_json(), parsed=chapter, prompt_tokens=result.prompt_tokens,
+                         output_tokens=result.output_tokens, truncated=True)
+
+    @staticmethod
+    def continuation_prompt(prompt: str, chapter: Chapter) -> str:
+        """Prompt asking for the rest of a chapter that was cut off."""
+        lines = "\n".join(f"{script.role}: {script.script}" for script in chapter.scripts)
+        count = len(chapter.scripts)
+        return (
+            f"{prompt}\n---\nThe chapter was cut off after line {count}. The lines so far:\n{lines}\n---\n"
+            f"Continue the same scene from line {count + 1} to the end of the chapter. "
+            f"Return only the new lines in scripts, with the same scene_background."
+        )
+
+    async def continue_chapter(self, prompt: str, partial: LLMResult) -> LLMResult:
+        """Complete a short salvaged chapter with a follow-up request.
+
+        Falls back to the salvaged lines alone if the follow-up fails.
+        """
+        follow_up = self.continuation_prompt(prompt, partial.parsed)
+        try:
+            more = await self.resilience.call(functools.partial(self.request_parsed, follow_up))
+        except Exception as e:
+            log('story_generation_workflow', f'Warning: continuation request failed, using {len(partial.parsed.scripts)} salvaged lines: {e}')
+            LLM_SALVAGE.inc(result='short')
+            return partial
+
+        LLM_SALVAGE.inc(result='continued')
+        chapter = Chapter(scene_background=partial.parsed.scene_background,
+                          scripts=partial.parsed.scripts + more.parsed.scripts)
 
-            # Return chapter as JSON object
+        def total(first, second):
+            return None if first is None and second is None else (first or 0) + (second or 0)
+
+        return LLMResult(text=chapter.model_dump_json(), parsed=chapter,
+                         prompt_tokens=total(partial.prompt_tokens, more.prompt_tokens),
+                         output_tokens=total(partial.output_tokens, more.output_tokens),
+                         truncated=more.truncated)
+
+    @staticmethod
+    def record_usage(result: LLMResult, index: int) -> None:
+        """Add a response's token counts (when the backend reports them) to the metrics."""
+        for kind, tokens in (('prompt', result.prompt_tokens), ('output', result.output_tokens)):
+            if tokens is not None:
+                LLM_TOKENS.observe(tokens, kind=kind, chapter_index=index_bucket(index))
+                LLM_TOKENS_TOTAL.inc(tokens, kind=kind)
+
+    async def context_version(self, story_id: int) -> int:
+        """Current version of a story's history, used to validate speculative results."""
+        state = await self.run_blocking(self.db_manager.get_story_context_state, story_id)
+        return state[0] if state else 0
+
+    async def start_chapter(self, story_id: int, index: int, created: bool) -> tuple:
+        """Prepare a chapter request; return a ready ``(chapter, response_text)`` or None.
+
+        Restarts an existing story for ``index <= 1`` unless it was
+        ``created`` for this request. Otherwise a chapter already saved at
+        ``index`` (a retried request) is returned unchanged. Then looks for a
+        chapter generated ahead of time (opening pool or speculative prefetch).
+        Must be called while holding the story lock.
+        """
+        if index > 1 or created:
+            saved = await self.run_blocking(self.db_manager.get_story_chapter, story_id, index)
+            if saved is not None:
+                chapter = Chapter.model_validate(saved)
+                return chapter, chapter.model_dump_json()
+        if index > 1:
+            return await self.take_speculative(story_id, index)
+
+        if not created:
+            await self.run_blocking(self.db_manager.reset_story, story_id)  # Restart this story only
+        pooled = await self.opening_pool.pop()
+        if pooled is None:
+            return None
+        chapter_json, response_text = pooled
+        return Chapter.model_validate_json(chapter_json), response_text
+
+    async def take_speculative(self, story_id: int, index: int) -> tuple:
+        """Return a pre-generated ``(chapter, response_text)`` for this request, or None.
+
+        Must be called while holding the story lock.
+        """
+        task = self.prefetcher.claim(story_id, index, await self.context_version(story_id))
+        if task is None:
+            return None
+        try:
+            return await task
+        except Exception as e:
+            log('story_generation_workflow', f'Speculative chapter {index} for story {story_id} unusable: {e}')
+            return None
+
+    def subscribe_story(self, story_id: int, listener: asyncio.Queue = None) -> asyncio.Queue:
+        """Queue receiving the events published for a story (see ``publish_story``)."""
+        listener = listener or asyncio.Queue()
+        self.story_listeners.setdefault(story_id, set()).add(listener)
+        return listener
+
+    def unsubscribe_story(self, story_id: int, listener: asyncio.Queue) -> None:
+        listeners = self.story_listeners.get(story_id)
+        if listeners is not None:
+            listeners.discard(listener)
+            if not listeners:
+                del self.story_listeners[story_id]
+
+    def publish_story(self, story_id: int, event: dict) -> None:
+        """Hand an event to every listener of a story."""
+        for listener in self.story_listeners.get(story_id, ()):
+            listener.put_nowait(event)
+
+    async def speculate_next(self, story_id: int, index: int) -> None:
+        """Start generating chapter ``index`` in the background, if enabled.
+
+        Listeners of the story get a ``prefetched`` event once it is ready,
+        unless the story changed meanwhile so the result will be discarded.
+        """
+        if not self.prefetcher.enabled:
+            return
+        version = await self.context_version(story_id)
+
+        async def job():
+            prompt = await self.build_prompt(index, story_id)
+            prepared = await self.request_chapter(prompt, index)
+            # Same check as claim(): a result built on outdated history is never used
+            if await self.context_version(story_id) == version:
+                self.publish_story(story_id, {"type": "prefetched", "prefetched": {"index": index}})
+            return prepared
+
+        self.prefetcher.schedule(story_id, index, version, job)
+
+    async def generate_script(self, index: int = 0, story_id: int = None, new_story: bool = False):
+        """Generate one chapter of a story without blocking the event loop.
+
+        Prompt building and persistence run on the I/O executor and the
+        LLM request goes through the async backend. Requests for the same
+        story are serialized; different stories proceed independently. A
+        chapter prepared in the background (opening pool or speculative
+        prefetch) is used when available.
+
+        Concurrent calls for the same ``(story_id, index)`` (double clicks,
+        client retries) share one generation and all receive its chapter.
+        The shared task keeps running if one caller is cancelled.
+
+        ``new_story`` says ``story_id`` was created for this request (a queued
+        new game): chapter 1 then starts that story, or returns its saved
+        chapter 1, instead of restarting it.
+        """
+        if story_id is None:
+            return await self._generate_script(index, story_id)
+
+        key = (story_id, index)
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate_script(index, story_id, new_story))
+            self.in_flight[key] = task
+            task.add_done_callback(functools.partial(self._forget_in_flight, key))
+        else:
+            COALESCED_REQUESTS.inc()
+            log('story_generation_workflow', f'Joining in-flight generation of chapter {index} for story {story_id}')
+        return await asyncio.shield(task)
+
+    def _forget_in_flight(self, key: tuple, task: asyncio.Task) -> None:
+        """Drop a finished generation from ``in_flight``."""
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here so a failure nobody awaits is not reported as unhandled
+
+    async def _generate_script(self, index: int, story_id: int = None, new_story: bool = False):
+        """Run one chapter generation (see ``generate_script``)."""
+        try:
+            with GENERATIONS_IN_FLIGHT.track(mode='blocking'), CHAPTER_SECONDS.time(chapter_index=index_bucket(index)):
+                story_id, created = await self.run_blocking(self.open_story, index, story_id)
+                created = created or new_story
+                if index <= 1:
+                    self.prefetcher.cancel(story_id)
+
+                async with self.story_lock(story_id):
+                    prepared = await self.start_chapter(story_id, index, created)
+                    if prepared is not None:
+                        chapter, response_text = prepared
+                    else:
+                        prompt = await self.build_prompt(index, story_id)
+                        chapter, response_text = await self.request_chapter(prompt, index)
+
+                    # Return chapter as JSON object
+                    chapter_data = await self.run_blocking(
+                        self.save_generated_chapter, chapter, response_text, story_id, index
+                    )
+
+            await self.speculate_next(story_id, index + 1)
             return chapter_data
 
         except Exception as e:
             # Handle errors that may occur during API calls
             print(f"An error occurred during story generation: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    async def stream_script(self, index: int = 0, story_id: int = None):
+        """Generate one chapter and yield it piece by piece as it streams in.
+
+        Yields ``("story_id", int)`` first, ``("scene_background", str)`` once
+        the background is known, ``("script", dict)`` for every completed line
+        (role already normalized) and finally ``("chapter", dict)`` with the
+        saved chapter.
+        """
+        GENERATIONS_IN_FLIGHT.inc(mode='stream')
+        try:
+            story_id, created = await self.run_blocking(self.open_story, index, story_id)
+            if index <= 1:
+                self.prefetcher.cancel(story_id)
+            yield "story_id", story_id
+
+            async with self.story_lock(story_id):
+                prepared = await self.start_chapter(story_id, index, created)
+                cache_key = None
+                if prepared is None:
+                    prompt = await self.build_prompt(index, story_id)
+                    cache_key = self.cache_key(prompt)
+                    cached = await self.response_cache.get(cache_key) if cache_key is not None else None
+                    if cached is not None:
+                        prepared = cached.parsed, cached.text
+
+                if prepared is not None:
+                    # Already generated (in the background or cached): replay it at once
+                    chapter, response_text = prepared
+                    yield "scene_background", chapter.scene_background.value
+                    roles = normalize_many([script.role for script in chapter.scripts])
+                    for script, role in zip(chapter.scripts, roles):
+                        script.role = role
+                        yield "script", script.model_dump(mode="json")
+                else:
+                    parser = ChapterStreamParser()
+                    scene_background = None
+                    scripts = []
+
+                    async for chunk in self.backend.stream_chapter(prompt):
+                        for event, value in parser.feed(chunk):
+                            if event == "scene_background":
+                                try:
+                                    scene_background = Background(value)
+                                except ValueError:
+                                    log('story_generation_workflow', f'Warning: unknown scene_background in stream: {value}')
+                                    continue
+                                yield "scene_background", scene_background.value
+                            elif event == "script":
+                                try:
+                                    script = Script.model_validate(value)
+                                except ValueError as e:
+                                    log('story_generation_workflow', f'Warning: skipping invalid streamed script: {e}')
+                                    continue
+                                script.role = normalize_character_name(script.role)
+                                scripts.append(script)
+                                yield "script", script.model_dump(mode="json")
+
+                    try:
+                        # Prefer the complete document when the stream finished cleanly
+                        with STAGE_SECONDS.time(stage='parse'):
+                            chapter = Chapter.model_validate_json(parser.text)
+                        complete = True
+                    except ValueError:
+                        if scene_background is None or not scripts:
+                            raise
+                        chapter = Chapter(scene_background=scene_background, scripts=scripts)
+                        complete = False
+                    response_text = parser.text
+                    if cache_key is not None and complete:
+                        await self.response_cache.put(cache_key, LLMResult(text=response_text, parsed=chapter))
+
+                chapter_data = await self.run_blocking(
+                    self.save_generated_chapter, chapter, response_text, story_id, index
+                )
+                chapter_json = Chapter.model_validate(chapter_data).model_dump(mode="json")
+                chapter_json['story_id'] = story_id
+                yield "chapter", chapter_json
+
+            await self.speculate_next(story_id, index + 1)
+
+        except Exception as e:
+            # Handle errors that may occur during API calls
+            print(f"An error occurred during streamed story generation: {e}")
+            raise e
+        finally:
+            GENERATIONS_IN_FLIGHT.dec(mode='stream')
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import math
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from database_manager import DatabaseManager
+from story_models import Chapter
+from tool.logmaker import log
+from tool.metrics import JOBS, JOB_QUEUE_DEPTH
+
+# Priority classes, most urgent first
+PRIORITIES = {'interactive': 0, 'speculative': 1, 'batch': 2}
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is refused because its priority class is at its depth limit"""
+
+    def __init__(self, priority: str, retry_after: int):
+        super().__init__(f"Too many queued {priority} jobs; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class UnknownStoryError(LookupError):
+    """Raised when a continuation job names a story that does not exist"""
+
+
+class JobQueue:
+    """Persistent queue of chapter generation jobs run by a bounded worker pool.
+
+    ``submit`` records a job in SQLite and returns at once; ``workers``
+    coroutines take jobs in priority order (interactive before speculative
+    before batch, oldest first within a class) and run them through the
+    generation service. Unfinished jobs are re-queued on start, so a restart
+    does not lose them. Re-running one is safe: saving a chapter is
+    idempotent on (story, index), and a new-game job remembers that it
+    created its story, so chapter 1 continues that story instead of
+    restarting it (which would delete chapters saved since).
+
+    Admission control: at most ``max_depth`` interactive jobs may wait, and
+    half as many of each lower class, so background work never crowds out
+    players. A refused job carries a Retry-After estimate from the recent
+    average job duration.
+
+    The server's own next-chapter prefetch (``SpeculativePrefetcher``) does
+    not go through this queue; it is bounded by its own ``max_jobs``.
+    """
+
+    def __init__(self, db_manager: DatabaseManager,
+                 generate: Callable[[int, int, bool], Awaitable[dict]],
+                 run_blocking: Callable[..., Awaitable],
+                 workers: int = None, max_depth: int = None, retention_seconds: float = None):
+        """Initialize the queue.
+
+        Args:
+            db_manager: Database persisting the jobs
+            generate: Coroutine generating chapter ``index`` of a story and returning it;
+                the third argument says the story was created for this job
+            run_blocking: Coroutine running a blocking callable off the event loop
+            workers: Jobs running at once
+            max_depth: Waiting interactive jobs admitted (lower classes get half)
+            retention_seconds: Age after which finished jobs are deleted on start
+        """
+        self.db_manager = db_manager
+        self.generate = generate
+        self.run_blocking = run_blocking
+        self.workers = workers or int(os.getenv("AGVN_JOB_WORKERS", "4"))
+        self.max_depth = max_depth or int(os.getenv("AGVN_JOB_QUEUE_MAX", "100"))
+        self.retention_seconds = retention_seconds if retention_seconds is not None else float(os.getenv("AGVN_JOB_RETENTION_S", "86400"))
+        self.queue = asyncio.PriorityQueue()
+        self.waiting: Dict[int, dict] = {}      # queued jobs by id
+        self.running: Dict[int, dict] = {}      # jobs being generated by id
+        self.active_keys: Dict[tuple, int] = {}  # (story_id, index) of unfinished jobs
+        self.unrecorded: Dict[int, dict] = {}   # finished jobs whose final status the database refused
+        self.subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        # Makes the duplicate and depth checks and the enqueue of one submission atomic
+        self.submit_lock = asyncio.Lock()
+        self.worker_tasks: List[asyncio.Task] = []
+        self.average_seconds = 30.0
+        self.stats = {'submitted': 0, 'deduplicated': 0, 'rejected': 0, 'done': 0, 'failed': 0, 'recovered': 0}
+
+    async def start(self) -> None:
+        """Re-queue unfinished jobs from the database and start the workers."""
+        if self.worker_tasks:
+            return
+        purged = await self.run_blocking(self.db_manager.purge_finished_jobs, time.time() - self.retention_seconds)
+        if purged:
+            log('job_queue', f'Deleted {purged} finished jobs')
+        for job in await self.run_blocking(self.db_manager.get_unfinished_jobs):
+            if job['id'] in self.waiting or job['id'] in self.running:
+                continue  # submitted to this instance before start()
+            job['status'] = 'queued'
+            self.enqueue(job)
+            self.stats['recovered'] += 1
+        if self.stats['recovered']:
+            log('job_queue', f'Re-queued {self.stats["recovered"]} unfinished jobs')
+        self.worker_tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; interrupted jobs stay unfinished in the database."""
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        self.worker_tasks = []
+
+    def depth(self, priority: str = None) -> int:
+        """Number of waiting jobs, optionally of one priority class."""
+        if priority is None:
+            return len(self.waiting)
+        return sum(1 for job in self.waiting.values() if job['priority'] == priority)
+
+    def limit(self, priority: str) -> int:
+        return self.max_depth if PRIORITIES[priority] == 0 else max(1, self.max_depth // 2)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely drained enough to admit a job."""
+        return max(1, math.ceil((len(self.waiting) + len(self.running)) * self.average_seconds / self.workers))
+
+    async def submit(self, index: int, story_id: int = None, priority: str = 'interactive') -> dict:
+        """Record a generation job and queue it; return the job.
+
+        Starting a game without a story creates the story now, so the job
+        reports its story id from the start. A job for a chapter that is
+        already queued or running is returned instead of a duplicate.
+
+        Raises:
+            ValueError: for an unknown priority class
+            UnknownStoryError: if a continuation names a missing story
+            QueueFullError: if the priority class is at its depth limit
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; use one of {list(PRIORITIES)}")
+
+        async with self.submit_lock:
+            return await self._submit(index, story_id, priority)
+
+    async def _submit(self, index: int, story_id: Optional[int], priority: str) -> dict:
+        """Admit one job (see ``submit``); must be called while holding ``submit_lock``."""
+        if story_id is not None:
+            existing = self.active_keys.get((story_id, index))
+            if existing is not None:
+                self.stats['deduplicated'] += 1
+                return self.snapshot(self.waiting.get(existing) or self.running[existing])
+
+        if self.depth(priority) >= self.limit(priority):
+            self.stats['rejected'] += 1
+            JOBS.inc(status='rejected')
+            raise QueueFullError(priority, self.retry_after())
+
+        new_story = False
+        if story_id is None or not await self.run_blocking(self.db_manager.story_exists, story_id):
+            if index > 1:
+                raise UnknownStoryError(f"Story {story_id} not found; start a new game with index=1")
+            story_id = await self.run_blocking(self.db_manager.create_story)
+            new_story = True
+
+        job = {'id': None, 'story_id': story_id, 'index': index, 'priority': priority,
+               'status': 'queued', 'created_at': time.time(), 'new_story': new_story}
+        job['id'] = await self.run_blocking(
+            self.db_manager.create_job, story_id, index, priority, job['created_at'], new_story
+        )
+        self.stats['submitted'] += 1
+        self.enqueue(job)
+        return self.snapshot(job)
+
+    def enqueue(self, job: dict) -> None:
+        self.waiting[job['id']] = job
+        self.active_keys[(job['story_id'], job['index'])] = job['id']
+        self.queue.put_nowait((PRIORITIES[job['priority']], job['id']))
+        JOB_QUEUE_DEPTH.inc(priority=job['priority'])
+
+    def position(self, job: dict) -> Optional[int]:
+        """1-based place of a waiting job in the run order, None once it started."""
+        if job['id'] not in self.waiting:
+            return None
+        key = (PRIORITIES[job['priority']], job['id'])
+        return 1 + sum(1 for other in self.waiting.values() if (PRIORITIES[other['priority']], other['id']) < key)
+
+    def snapshot(self, job: dict) -> dict:
+        """Public view of a job."""
+        view = {key: job.get(key) for key in ('id', 'story_id', 'index', 'priority', 'status', 'result', 'error')}
+        view['position'] = self.position(job)
+        return view
+
+    async def get(self, job_id: int) -> Optional[dict]:
+        """Current state of a job, from memory while unfinished and from the database after."""
+        job = self.waiting.get(job_id) or self.running.get(job_id) or self.unrecorded.get(job_id)
+        if job is not None:
+            return self.snapshot(job)
+        job = await self.run_blocking(self.db_manager.get_job, job_id)
+        return self.snapshot(job) if job is not None else None
+
+    def subscribe(self, job_id: int) -> asyncio.Queue:
+        """Queue receiving a snapshot of the job every time its status changes."""
+        updates = asyncio.Queue()
+        self.subscribers.setdefault(job_id, set()).add(updates)
+        return updates
+
+    def unsubscribe(self, job_id: int, updates: asyncio.Queue) -> None:
+        listeners = self.subscribers.get(job_id)
+        if listeners is not None:
+            listeners.discard(updates)
+            if not listeners:
+                del self.subscribers[job_id]
+
+    def publish(self, job: dict) -> None:
+        snapshot = self.snapshot(job)
+        for updates in self.subscribers.get(job['id'], ()):
+            updates.put_nowait(snapshot)
+
+    async def work(self) -> None:
+        """Worker loop: run queued jobs one at a time, most urgent first."""
+        while True:
+            _, job_id = await self.queue.get()
+            job = self.waiting.pop(job_id)
+            JOB_QUEUE_DEPTH.dec(priority=job['priority'])
+            self.running[job_id] = job
+            try:
+                await self.run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Never let one job end the worker
+                log('job_queue', f'Worker error on job {job_id}: {e}')
+            finally:
+                del self.running[job_id]
+                if self.active_keys.get((job['story_id'], job['index'])) == job_id:
+                    del self.active_keys[(job['story_id'], job['index'])]
+
+    async def run(self, job: dict) -> None:
+        """Generate one job's chapter and record the outcome."""
+        start = time.perf_counter()
+        try:
+            await self.run_blocking(self.db_manager.update_job, job['id'], 'running', time.time())
+            job['status'] = 'running'
+            self.publish(job)
+            chapter_data = await self.generate(job['index'], job['story_id'], job['new_story'])
+            result = Chapter.model_validate(chapter_data).model_dump(mode="json")
+            result['story_id'] = chapter_data['story_id']
+            job.update(status='done', result=result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log('job_queue', f'Job {job["id"]} failed: {e}')
+            job.update(status='failed', error=str(e))
+
+        elapsed = time.perf_counter() - start
+        self.average_seconds = 0.8 * self.average_seconds + 0.2 * elapsed
+        self.stats[job['status']] += 1
+        JOBS.inc(status=job['status'])
+        await self.record(job)
+        self.publish(job)
+
+    async def record(self, job: dict) -> None:
+        """Store a finished job's outcome; on failure keep it in memory so ``get`` stays right."""
+        try:
+            await self.run_blocking(
+                self.db_manager.update_job, job['id'], job['status'], time.time(),
+                json.dumps(job.get('result'), ensure_ascii=False) if job.get('result') is not None else None,
+                job.get('error')
+            )
+        except Exception as e:
+            log('job_queue', f'Could not record job {job["id"]} as {job["status"]}: {e}')
+            self.unrecorded[job['id']] = job
+        else:
+            self.unrecorded.pop(job['id'], None)
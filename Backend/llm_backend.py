@@ -0,0 +1,272 @@
+import asyncio
+import os
+import random
+from typing import AsyncIterator, Optional
+
+import httpx
+from google import genai
+from google.genai import errors, types
+
+from story_models import Background, Chapter, Emotion
+
+GEMINI_MODEL = "gemini-2.5-pro"
+SUMMARY_MODEL = "gemini-2.5-flash"
+
+
+class UnparsableResponseError(ValueError):
+    """Raised when a chapter response does not match the Chapter schema"""
+
+
+class LLMResult:
+    """Outcome of one chapter generation request
+
+    ``truncated`` marks a chapter salvaged from a response that did not parse
+    as a whole; ``parsed`` then holds only the lines that were complete.
+    """
+
+    def __init__(self, text: str, parsed: Optional[Chapter],
+                 prompt_tokens: Optional[int] = None, output_tokens: Optional[int] = None,
+                 truncated: bool = False):
+        self.text = text
+        self.parsed = parsed
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+        self.truncated = truncated
+
+
+class LLMBackend:
+    """Interface every chapter-generating backend implements"""
+
+    name = "base"
+
+    async def generate_chapter(self, prompt: str) -> LLMResult:
+        """Generate one chapter as ``Chapter`` JSON."""
+        raise NotImplementedError
+
+    async def stream_chapter(self, prompt: str) -> AsyncIterator[str]:
+        """Generate one chapter, yielding the JSON text in chunks as it is produced."""
+        raise NotImplementedError
+        yield  # pragma: no cover - marks this as an async generator
+
+    async def generate_text(self, prompt: str, max_output_tokens: int = 1024,
+                            temperature: float = 0.3) -> str:
+        """Generate free-form text (used for story summaries)."""
+        raise NotImplementedError
+
+    def cache_identity(self) -> dict:
+        """Everything besides the prompt that shapes a chapter response (response cache key)."""
+        return {'backend': self.name}
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Whether a failed request may succeed when sent again."""
+        # asyncio.TimeoutError (raised by wait_for) is only an alias of TimeoutError from Python 3.11
+        return isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError, UnparsableResponseError))
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through the async google-genai client"""
+
+    name = "gemini"
+
+    CHAPTER_MAX_OUTPUT_TOKENS = 35500
+    CHAPTER_TEMPERATURE = 1
+
+    def __init__(self, api_key: str = None, model: str = GEMINI_MODEL, summary_model: str = SUMMARY_MODEL):
+        api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment variables.")
+        # Create Google AI client instance
+        self.client = genai.Client(api_key=api_key)
+        self.model = model
+        self.summary_model = summary_model
+
+    @staticmethod
+    def chapter_config() -> types.GenerateContentConfig:
+        """Generation config shared by the blocking and streaming chapter requests"""
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=Chapter,
+            max_output_tokens=GeminiBackend.CHAPTER_MAX_OUTPUT_TOKENS,
+            temperature=GeminiBackend.CHAPTER_TEMPERATURE,
+        )
+
+    def cache_identity(self) -> dict:
+        return {
+            'backend': self.name,
+            'model': self.model,
+            'response_mime_type': "application/json",
+            'response_schema': Chapter.model_json_schema(),
+            'max_output_tokens': self.CHAPTER_MAX_OUTPUT_TOKENS,
+            'temperature': self.CHAPTER_TEMPERATURE,
+        }
+
+    def is_retryable(self, error: BaseException) -> bool:
+        # Rate limits, request timeouts and server errors are transient; other
+        # client errors (bad key, invalid request) fail the same way every time
+        if isinstance(error, errors.APIError):
+            return error.code in (408, 429) or error.code >= 500
+        return isinstance(error, httpx.TransportError) or super().is_retryable(error)
+
+    async def generate_chapter(self, prompt: str) -> LLMResult:
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self.chapter_config(),
+        )
+        usage = response.usage_metadata
+        return LLMResult(
+            text=response.text,
+            parsed=response.parsed,
+            prompt_tokens=usage.prompt_token_count if usage else None,
+            output_tokens=usage.candidates_token_count if usage else None,
+        )
+
+    async def stream_chapter(self, prompt: str) -> AsyncIterator[str]:
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config=self.chapter_config(),
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
+    async def generate_text(self, prompt: str, max_output_tokens: int = 1024,
+                            temperature: float = 0.3) -> str:
+        response = await self.client.aio.models.generate_content(
+            model=self.summary_model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        )
+        return response.text or ""
+
+
+class FakeBackendError(RuntimeError):
+    """Injected failure raised by FakeBackend"""
+
+
+class FakeBackend(LLMBackend):
+    """Offline backend producing schema-valid chapters for load tests and profiling.
+
+    Output is deterministic for a given seed and call order. Each request waits
+    for a sampled time-to-first-token, then "emits" its tokens at
+    ``tokens_per_second`` (0 means instantly); streaming yields the text in
+    chunks at that pace. A ``failure_rate`` fraction of requests raise
+    FakeBackendError (streams fail halfway through).
+
+    Latency distributions (``latency_dist``):
+    - ``fixed``: always ``latency_ms``
+    - ``uniform``: uniform in ``latency_ms * (1 ± latency_spread)``
+    - ``lognormal``: median ``latency_ms``, shape ``latency_spread`` (long tail)
+    """
+
+    name = "fake"
+
+    ROLES = ["Narrator", "강지훈", "윤서아", "박민지", "김태성", "정미연"]
+    PHRASES = [
+        "오늘따라 교실이 유난히 조용하다.",
+        "너, 또 도시락 싸 왔어?",
+        "별일 아니야. 신경 쓰지 마.",
+        "이번 시험 범위가 어디까지였지?",
+        "창밖으로 벚꽃잎이 흩날린다.",
+        "같이 가자! 늦겠어!",
+        "...고마워. 진심으로.",
+        "그런 눈으로 보지 마. 부끄럽잖아.",
+    ]
+
+    def __init__(self, latency_ms: float = None, latency_dist: str = None, latency_spread: float = None,
+                 tokens_per_second: float = None, failure_rate: float = None,
+                 lines: int = None, seed: int = None):
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv("AGVN_FAKE_LATENCY_MS", "2000"))
+        self.latency_dist = latency_dist or os.getenv("AGVN_FAKE_LATENCY_DIST", "lognormal")
+        self.latency_spread = latency_spread if latency_spread is not None else float(os.getenv("AGVN_FAKE_LATENCY_SPREAD", "0.5"))
+        self.tokens_per_second = tokens_per_second if tokens_per_second is not None else float(os.getenv("AGVN_FAKE_TOKENS_PER_SECOND", "0"))
+        self.failure_rate = failure_rate if failure_rate is not None else float(os.getenv("AGVN_FAKE_FAILURE_RATE", "0"))
+        self.lines = lines or int(os.getenv("AGVN_FAKE_LINES", "20"))
+        self.rng = random.Random(seed if seed is not None else int(os.getenv("AGVN_FAKE_SEED", "0")))
+        if self.latency_dist not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown fake latency distribution: {self.latency_dist}")
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """Approximate token count of a text"""
+        return len(text) // 3 + 1
+
+    def sample_latency(self) -> float:
+        """Time to first token in seconds"""
+        if self.latency_dist == "fixed":
+            latency = self.latency_ms
+        elif self.latency_dist == "uniform":
+            latency = self.rng.uniform(self.latency_ms * (1 - self.latency_spread),
+                                       self.latency_ms * (1 + self.latency_spread))
+        else:
+            latency = self.rng.lognormvariate(0, self.latency_spread) * self.latency_ms
+        return max(latency, 0) / 1000
+
+    def emission_time(self, text: str) -> float:
+        """Seconds needed to emit ``text`` at the configured token rate"""
+        if self.tokens_per_second <= 0:
+            return 0
+        return self.count_tokens(text) / self.tokens_per_second
+
+    def make_chapter(self) -> Chapter:
+        """Build a random but schema-valid chapter"""
+        return Chapter(
+            scene_background=self.rng.choice(list(Background)),
+            scripts=[
+                {
+                    'role': self.rng.choice(self.ROLES),
+                    'emotion': self.rng.choice(list(Emotion)),
+                    'script': self.rng.choice(self.PHRASES),
+                }
+                for _ in range(self.lines)
+            ],
+        )
+
+    async def generate_chapter(self, prompt: str) -> LLMResult:
+        latency = self.sample_latency()
+        chapter = self.make_chapter()
+        failing = self.rng.random() < self.failure_rate
+        text = chapter.model_dump_json()
+        await asyncio.sleep(latency + self.emission_time(text))
+        if failing:
+            raise FakeBackendError("Injected fake backend failure")
+        return LLMResult(text=text, parsed=chapter,
+                         prompt_tokens=self.count_tokens(prompt), output_tokens=self.count_tokens(text))
+
+    async def stream_chapter(self, prompt: str) -> AsyncIterator[str]:
+        latency = self.sample_latency()
+        text = self.make_chapter().model_dump_json()
+        failing = self.rng.random() < self.failure_rate
+        await asyncio.sleep(latency)
+        chunk_size = 64
+        for start in range(0, len(text), chunk_size):
+            chunk = text[start:start + chunk_size]
+            await asyncio.sleep(self.emission_time(chunk))
+            if failing and start >= len(text) // 2:
+                raise FakeBackendError("Injected fake backend failure")
+            yield chunk
+
+    async def generate_text(self, prompt: str, max_output_tokens: int = 1024,
+                            temperature: float = 0.3) -> str:
+        await asyncio.sleep(self.sample_latency() / 4)
+        return "요약: " + " ".join(self.rng.sample(self.PHRASES, 3))
+
+    def cache_identity(self) -> dict:
+        return {'backend': self.name, 'lines': self.lines}
+
+    def is_retryable(self, error: BaseException) -> bool:
+        return isinstance(error, FakeBackendError) or super().is_retryable(error)
+
+
+def create_backend(name: str = None) -> LLMBackend:
+    """Create the backend selected by ``name`` or the AGVN_LLM_BACKEND setting."""
+    name = (name or os.getenv("AGVN_LLM_BACKEND", "gemini")).lower()
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import os
+from typing import Awaitable, Callable, Optional
+
+from database_manager import DatabaseManager
+from tool.logmaker import log
+
+
+def prompt_hash(prompt: str) -> str:
+    """Stable identifier of the prompt an opening chapter was generated from"""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+class OpeningPool:
+    """Keeps a number of unused opening chapters ready in SQLite.
+
+    The opening prompt only depends on ``base_world.prompt``, so first chapters
+    can be generated ahead of time. A background filler tops the pool up to
+    ``size`` entries, one generation at a time. Entries are tagged with the
+    hash of the prompt they came from; when the prompt changes, older entries
+    are purged and never served.
+    """
+
+    def __init__(self, db_manager: DatabaseManager,
+                 opening_prompt: Callable[[], Awaitable[str]],
+                 generate: Callable[[str], Awaitable[tuple]],
+                 run_blocking: Callable[..., Awaitable],
+                 size: int = None, recheck_seconds: float = 300):
+        """Initialize the pool.
+
+        Args:
+            db_manager: Database holding the pooled chapters
+            opening_prompt: Coroutine returning the current index=1 prompt
+            generate: Coroutine turning a prompt into ``(chapter, response_text)``
+            run_blocking: Coroutine running a blocking callable off the event loop
+            size: Number of opening chapters to keep ready (0 disables the pool)
+            recheck_seconds: How often the filler checks for prompt changes while idle
+        """
+        self.db_manager = db_manager
+        self.opening_prompt = opening_prompt
+        self.generate = generate
+        self.run_blocking = run_blocking
+        self.size = size if size is not None else int(os.getenv("AGVN_OPENING_POOL_SIZE", "0"))
+        self.recheck_seconds = recheck_seconds
+        self.refill_needed = asyncio.Event()
+        self.filler_task: Optional[asyncio.Task] = None
+        self.stats = {'hits': 0, 'misses': 0, 'generated': 0, 'purged': 0, 'failed': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def start(self) -> None:
+        """Start the background filler (no-op when the pool is disabled)."""
+        if self.enabled and self.filler_task is None:
+            self.filler_task = asyncio.create_task(self.fill_forever())
+
+    async def stop(self) -> None:
+        """Cancel the background filler and wait for it to exit."""
+        if self.filler_task is not None:
+            self.filler_task.cancel()
+            try:
+                await self.filler_task
+            except asyncio.CancelledError:
+                pass
+            self.filler_task = None
+
+    async def pop(self) -> Optional[tuple]:
+        """Take one pooled opening chapter for the current prompt.
+
+        Returns:
+            Optional[tuple]: ``(chapter_json, response_text)`` or None when empty
+        """
+        if not self.enabled:
+            return None
+        current_hash = prompt_hash(await self.opening_prompt())
+        entry = await self.run_blocking(self.db_manager.pop_opening_chapter, current_hash)
+        self.stats['hits' if entry is not None else 'misses'] += 1
+        self.refill_needed.set()
+        return entry
+
+    async def fill_once(self) -> int:
+        """Purge stale entries and generate until the pool is full.
+
+        Returns:
+            int: Number of chapters generated
+        """
+        prompt = await self.opening_prompt()
+        current_hash = prompt_hash(prompt)
+
+        purged = await self.run_blocking(self.db_manager.purge_opening_chapters, current_hash)
+        if purged:
+            self.stats['purged'] += purged
+            log('opening_pool', f'Purged {purged} opening chapters from an older prompt')
+
+        generated = 0
+        while await self.run_blocking(self.db_manager.count_opening_chapters, current_hash) < self.size:
+            chapter, response_text = await self.generate(prompt)
+            await self.run_blocking(
+                self.db_manager.add_opening_chapter, current_hash, chapter.model_dump_json(), response_text
+            )
+            generated += 1
+            self.stats['generated'] += 1
+        return generated
+
+    async def fill_forever(self) -> None:
+        """Filler loop: refill after every pop, and periodically re-check the prompt."""
+        backoff = 1
+        while True:
+            self.refill_needed.clear()
+            try:
+                generated = await self.fill_once()
+                if generated:
+                    log('opening_pool', f'Generated {generated} opening chapters')
+                backoff = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['failed'] += 1
+                log('opening_pool', f'Error filling opening pool: {e}')
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 300)
+                continue
+
+            try:
+                await asyncio.wait_for(self.refill_needed.wait(), timeout=self.recheck_seconds)
+            except asyncio.TimeoutError:
+                pass
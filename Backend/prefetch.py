@@ -0,0 +1,100 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+from tool.logmaker import log
+
+
+class SpeculativePrefetcher:
+    """Generates chapter N+1 in the background while the player reads chapter N.
+
+    Each story has at most one slot holding ``(index, context_version, task)``.
+    The context version recorded when the job starts is checked again when the
+    result is claimed, so a chapter built on outdated history is never used.
+    Results are not persisted until claimed.
+    """
+
+    def __init__(self, enabled: bool = None, max_jobs: int = None):
+        """Initialize the prefetcher.
+
+        Args:
+            enabled: Whether speculative jobs are started at all
+            max_jobs: Maximum number of speculative jobs running at once
+        """
+        if enabled is None:
+            enabled = os.getenv("AGVN_SPECULATIVE", "0").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.max_jobs = max_jobs or int(os.getenv("AGVN_SPECULATIVE_MAX_JOBS", "2"))
+        self.slots: Dict[int, tuple] = {}
+        self.running = 0
+        self.stats = {
+            'started': 0,     # jobs launched
+            'skipped': 0,     # not launched because max_jobs were already running
+            'hits': 0,        # claimed with the result ready
+            'joins': 0,       # claimed while still generating
+            'misses': 0,      # requests with no usable speculative result
+            'stale': 0,       # discarded because the story changed underneath
+            'cancelled': 0,   # cancelled by a reset or replaced by a newer job
+            'failed': 0,      # job raised an error
+        }
+
+    def schedule(self, story_id: int, index: int, context_version: int,
+                 job: Callable[[], Awaitable]) -> bool:
+        """Start ``job`` as the speculative generation of chapter ``index``.
+
+        Returns:
+            bool: True if a job was started
+        """
+        if not self.enabled:
+            return False
+        if self.running >= self.max_jobs:
+            self.stats['skipped'] += 1
+            return False
+
+        self.cancel(story_id)
+        task = asyncio.create_task(job())
+        self.running += 1
+        self.stats['started'] += 1
+        task.add_done_callback(self._job_done)
+        self.slots[story_id] = (index, context_version, task)
+        log('speculative_prefetch', f'Story {story_id}: started speculative generation of chapter {index}')
+        return True
+
+    def claim(self, story_id: int, index: int, context_version: int) -> Optional[asyncio.Task]:
+        """Take the speculative task for chapter ``index`` if it is still valid.
+
+        The returned task may still be running; awaiting it attaches to the
+        in-flight generation.
+        """
+        slot = self.slots.pop(story_id, None)
+        if slot is None:
+            if self.enabled:
+                self.stats['misses'] += 1
+            return None
+
+        slot_index, slot_version, task = slot
+        if slot_index != index or slot_version != context_version:
+            task.cancel()
+            self.stats['stale'] += 1
+            self.stats['misses'] += 1
+            return None
+        if task.done() and (task.cancelled() or task.exception() is not None):
+            self.stats['misses'] += 1
+            return None
+
+        self.stats['hits' if task.done() else 'joins'] += 1
+        return task
+
+    def cancel(self, story_id: int) -> None:
+        """Cancel and drop the speculative job of a story, if any."""
+        slot = self.slots.pop(story_id, None)
+        if slot is not None and not slot[2].done():
+            slot[2].cancel()
+            self.stats['cancelled'] += 1
+
+    def _job_done(self, task: asyncio.Task) -> None:
+        """Bookkeeping once a speculative job finishes, fails or is cancelled."""
+        self.running -= 1
+        if not task.cancelled() and task.exception() is not None:
+            self.stats['failed'] += 1
+            log('speculative_prefetch', f'Speculative generation failed: {task.exception()}')
@@ -11,6 +11,7 @@ def show_stats(db: DatabaseManager):
     """Display database statistics"""
     stats = db.get_database_stats()
     print("=== Database Statistics ===")
+    print(f"Total stories: {stats['total_stories']}")
     print(f"Total chapters: {stats['total_chapters']}")
     print(f"Total scripts: {stats['total_scripts']}")
     print(f"Date range: {stats['earliest_chapter']} to {stats['latest_chapter']}")
@@ -67,10 +68,19 @@ def search_character(db: DatabaseManager, character: str):
         print(f"  {result['script']}")
         print()
 
-def export_data(db: DatabaseManager, output_file: str):
-    """Export database to JSON"""
-    db.export_to_json(output_file)
-    print(f"Database exported to {output_file}")
+def export_data(db: DatabaseManager, output_file: str, story_id: int = None):
+    """Export database to JSON, or to JSON Lines for .jsonl / .jsonl.gz files"""
+    if output_file.endswith(('.jsonl', '.jsonl.gz')):
+        count = db.export_to_jsonl(output_file, story_id)
+        print(f"Exported {count} chapters to {output_file}")
+    else:
+        db.export_to_json(output_file)
+        print(f"Database exported to {output_file}")
+
+def import_data(db: DatabaseManager, input_file: str, batch_size: int = 2000):
+    """Import chapters from a JSON Lines archive (plain or gzip)"""
+    count = db.import_from_jsonl(input_file, batch_size)
+    print(f"Imported {count} chapters from {input_file}")
 
 def show_concatenated_scripts(db: DatabaseManager, limit_chars: int = None):
     """Display concatenated scripts from all chapters"""
@@ -118,12 +128,16 @@ def clear_database(db: DatabaseManager):
 
 def main():
     parser = argparse.ArgumentParser(description="Query SYSE cutted_script database")
-    parser.add_argument('command', choices=['stats', 'list', 'show', 'search', 'export', 'concat', 'clear'],
+    parser.add_argument('command', choices=['stats', 'list', 'show', 'search', 'export', 'import', 'concat', 'clear'],
                        help='Command to execute')
     parser.add_argument('--chapter-id', type=int, help='Chapter ID for show command')
     parser.add_argument('--character', type=str, help='Character name for search command')
     parser.add_argument('--limit', type=int, help='Limit number of results')
-    parser.add_argument('--output', type=str, help='Output file for export command')
+    parser.add_argument('--output', type=str,
+                       help='Output file for export command (.jsonl or .jsonl.gz for streaming JSON Lines)')
+    parser.add_argument('--input', type=str, help='JSON Lines archive (plain or gzip) for import command')
+    parser.add_argument('--story-id', type=int, help='Only export this story (JSON Lines export)')
+    parser.add_argument('--batch-size', type=int, default=2000, help='Chapters per transaction for import command')
 
     if len(sys.argv) == 1:
         # Interactive mode if no arguments
@@ -195,7 +209,12 @@ def main():
             search_character(db, args.character)
         elif args.command == 'export':
             output_file = args.output or 'database_export.json'
-            export_data(db, output_file)
+            export_data(db, output_file, args.story_id)
+        elif args.command == 'import':
+            if not args.input:
+                print("Error: --input required for import command")
+                return
+            import_data(db, args.input, args.batch_size)
         elif args.command == 'concat':
             limit = args.limit
             show_concatenated_scripts(db, limit)
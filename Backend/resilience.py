@@ -0,0 +1,136 @@
+import asyncio
+import collections
+import math
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+from llm_backend import UnparsableResponseError
+from tool.logmaker import log
+from tool.metrics import LLM_ATTEMPTS
+
+
+class ResilientCaller:
+    """Deadlines, retries and optional hedging around one LLM request.
+
+    Every attempt is bounded by ``attempt_timeout`` seconds. Failures the
+    backend classifies as transient (timeouts, rate limits, server errors,
+    responses that do not parse) are retried up to ``attempts`` times in total
+    with exponential backoff and jitter; anything else is raised at once.
+
+    With hedging on, an attempt still running after the ``hedge_quantile``
+    latency of recent successful requests gets a second, identical request;
+    whichever succeeds first is used and the other is cancelled. Hedging
+    waits until ``HEDGE_MIN_SAMPLES`` latencies have been observed. It is off
+    by default since every hedge is a paid request.
+    """
+
+    # Successful request latencies kept for the hedging threshold
+    LATENCY_WINDOW = 200
+    HEDGE_MIN_SAMPLES = 20
+
+    def __init__(self, is_retryable: Callable[[BaseException], bool],
+                 attempts: int = None, attempt_timeout: float = None,
+                 backoff: float = None, backoff_max: float = None,
+                 hedge: bool = None, hedge_quantile: float = None):
+        """Initialize the caller.
+
+        Args:
+            is_retryable: Whether an error is worth another attempt (the backend's classification)
+            attempts: Total attempts per request, including the first
+            attempt_timeout: Deadline of each attempt in seconds (0 disables it)
+            backoff: Initial wait between attempts in seconds
+            backoff_max: Longest wait between attempts in seconds
+            hedge: Whether slow attempts get a second, hedged request
+            hedge_quantile: Latency quantile after which the hedge is sent
+        """
+        if hedge is None:
+            hedge = os.getenv("AGVN_LLM_HEDGE", "0").lower() in ("1", "true", "yes")
+        self.is_retryable = is_retryable
+        self.attempts = attempts or int(os.getenv("AGVN_LLM_ATTEMPTS", "3"))
+        self.attempt_timeout = attempt_timeout if attempt_timeout is not None else float(os.getenv("AGVN_LLM_ATTEMPT_TIMEOUT_S", "180"))
+        self.backoff = backoff if backoff is not None else float(os.getenv("AGVN_LLM_BACKOFF_S", "1"))
+        self.backoff_max = backoff_max if backoff_max is not None else float(os.getenv("AGVN_LLM_BACKOFF_MAX_S", "20"))
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile or float(os.getenv("AGVN_LLM_HEDGE_QUANTILE", "0.9"))
+        self.latencies = collections.deque(maxlen=self.LATENCY_WINDOW)
+        self.stats = {'retries': 0, 'hedges': 0, 'hedge_wins': 0}
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which an attempt is hedged, or None when hedging is off or uncalibrated."""
+        if not self.hedge or len(self.latencies) < self.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(self.hedge_quantile * len(ordered)) - 1)]
+
+    async def call(self, request: Callable[[], Awaitable]):
+        """Run ``request`` with deadlines, retries and hedging; return its result.
+
+        The last error is raised once every attempt has failed.
+        """
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.attempts),
+            wait=wait_exponential_jitter(initial=self.backoff, max=self.backoff_max),
+            retry=retry_if_exception(self.is_retryable),
+            before_sleep=self.before_retry,
+            reraise=True,
+        )
+        async for attempt in retrying:
+            with attempt:
+                return await self.hedged(request)
+
+    def before_retry(self, retry_state) -> None:
+        self.stats['retries'] += 1
+        log('llm_resilience', f'Attempt {retry_state.attempt_number} failed, retrying in '
+                              f'{retry_state.next_action.sleep:.1f}s: {retry_state.outcome.exception()!r}')
+
+    async def hedged(self, request: Callable[[], Awaitable]):
+        """One attempt: the primary request plus, if it is slow, a hedge."""
+        primary = asyncio.create_task(self.timed(request, 'primary'))
+        pending = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is None:
+                return await primary
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.stats['hedges'] += 1
+                pending.add(asyncio.create_task(self.timed(request, 'hedge')))
+
+            error = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.stats['hedge_wins'] += 1
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def timed(self, request: Callable[[], Awaitable], kind: str):
+        """One request under the attempt deadline, counted by outcome."""
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(request(), self.attempt_timeout or None)
+        except asyncio.CancelledError:
+            LLM_ATTEMPTS.inc(kind=kind, outcome='cancelled')
+            raise
+        except asyncio.TimeoutError:
+            LLM_ATTEMPTS.inc(kind=kind, outcome='timeout')
+            raise
+        except UnparsableResponseError:
+            LLM_ATTEMPTS.inc(kind=kind, outcome='unparsable')
+            raise
+        except Exception as e:
+            LLM_ATTEMPTS.inc(kind=kind, outcome='retryable_error' if self.is_retryable(e) else 'error')
+            raise
+        self.latencies.append(time.perf_counter() - start)
+        LLM_ATTEMPTS.inc(kind=kind, outcome='ok')
+        return result
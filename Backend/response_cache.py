@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from database_manager import DatabaseManager
+from llm_backend import LLMResult
+from story_models import Chapter
+from tool.logmaker import log
+from tool.metrics import LLM_CACHE_REQUESTS, STAGE_SECONDS
+
+
+class ResponseCache:
+    """Content-addressed cache of chapter responses in SQLite.
+
+    Entries are keyed by a SHA-256 of the backend's cache identity (model,
+    schema, temperature, output limit) and the fully built prompt, so any
+    change to either is a miss. Entries expire after ``ttl_seconds``; after
+    each insert the least recently used ones are evicted until the cache fits
+    in ``max_mb``.
+
+    Off by default: chapters are sampled at temperature 1, so serving a stored
+    chapter for a repeated prompt (replays, reloads, retries, tests) is a
+    deliberate choice.
+    """
+
+    def __init__(self, db_manager: DatabaseManager,
+                 run_blocking: Callable[..., Awaitable],
+                 enabled: bool = None, ttl_seconds: float = None, max_mb: float = None):
+        """Initialize the cache.
+
+        Args:
+            db_manager: Database holding the cached responses
+            run_blocking: Coroutine running a blocking callable off the event loop
+            enabled: Whether responses are cached at all
+            ttl_seconds: Age after which an entry is no longer served
+            max_mb: Total size of cached responses kept
+        """
+        if enabled is None:
+            enabled = os.getenv("AGVN_LLM_CACHE", "0").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.db_manager = db_manager
+        self.run_blocking = run_blocking
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("AGVN_LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+        self.max_mb = max_mb if max_mb is not None else float(os.getenv("AGVN_LLM_CACHE_MAX_MB", "100"))
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+
+    @staticmethod
+    def key(identity: dict, prompt: str) -> str:
+        """Cache key of a prompt sent with the given backend settings"""
+        digest = hashlib.sha256(json.dumps(identity, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(prompt.encode('utf-8'))
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[LLMResult]:
+        """Return the cached response for ``key``, or None on a miss."""
+        with STAGE_SECONDS.time(stage='cache_lookup'):
+            now = time.time()
+            try:
+                row = await self.run_blocking(self.db_manager.get_cached_response, key, now - self.ttl_seconds, now)
+            except Exception as e:
+                # The cache is an optimization; never fail a generation because of it
+                log('response_cache', f'Cache lookup failed: {e}')
+                row = None
+            result = None
+            if row is not None:
+                response_text, prompt_tokens, output_tokens = row
+                try:
+                    result = LLMResult(text=response_text, parsed=Chapter.model_validate_json(response_text),
+                                       prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+                except ValueError as e:
+                    # Written by an older schema; it will be overwritten by the fresh response
+                    log('response_cache', f'Ignoring unparsable cache entry {key[:12]}: {e}')
+
+        self.stats['hits' if result is not None else 'misses'] += 1
+        LLM_CACHE_REQUESTS.inc(result='hit' if result is not None else 'miss')
+        return result
+
+    async def put(self, key: str, result: LLMResult) -> None:
+        """Store a response and evict expired or least recently used entries."""
+        now = time.time()
+        try:
+            evicted = await self.run_blocking(
+                self.db_manager.put_cached_response, key, result.text, result.prompt_tokens, result.output_tokens,
+                now, now - self.ttl_seconds, int(self.max_mb * 1024 * 1024)
+            )
+        except Exception as e:
+            log('response_cache', f'Cache write failed: {e}')
+            return
+        self.stats['stored'] += 1
+        self.stats['evicted'] += evicted
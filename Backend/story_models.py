@@ -0,0 +1,34 @@
+import enum
+from pydantic import BaseModel
+
+# --- Enum defining emotion states ---
+class Emotion(enum.Enum):
+    # Base Expressions
+    NEUTRAL = 'neutral'      # Calm/expressionless
+    HAPPY = 'happy'        # Happy/joyful
+    SAD = 'sad'            # Sadness
+    ANGRY = 'angry'          # Angry
+    SURPRISED = 'surprised'    # Surprised/shocked
+    SHY = 'shy'                  # Shy
+
+
+# --- Script model definition ---
+class Script(BaseModel):
+    role: str
+    emotion: Emotion
+    script: str
+
+class Background(enum.Enum):
+    Classroom_Day = 'Classroom_Day'
+    Classroom_Sunset = 'Classroom_Sunset'
+    School_Hallway_Day = 'School_Hallway_Day'
+    School_Rooftop = 'School_Rooftop'
+    Protagonist_Room = 'Protagonist_Room'
+    Cafe_Interior = 'Cafe_Interior'
+    Park = 'Park'
+    Schoolyard = 'Schoolyard'
+
+class Chapter(BaseModel):
+    """Add background information"""
+    scene_background: Background
+    scripts: list[Script]
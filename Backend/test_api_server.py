@@ -0,0 +1,150 @@
+"""
+Unit Tests for the WebSocket endpoints of the API server
+
+The server module is imported with the offline fake backend and a temporary
+database; the tests then swap in a recording backend for predictable timing.
+
+Run with: python -m pytest test_api_server.py -v
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from fixtures import RecordingBackend
+from tool.metrics import GENERATIONS_IN_FLIGHT
+
+TMP = tempfile.TemporaryDirectory()
+with mock.patch.dict(os.environ, {"AGVN_LLM_BACKEND": "fake", "AGVN_DB_PATH": os.path.join(TMP.name, "scripts.db")}):
+    import api_server
+
+service = api_server.generate_script_service
+
+
+def receive_until(websocket, *types) -> list:
+    """Messages up to and including the first one of the given types."""
+    messages = []
+    while not messages or messages[-1]["type"] not in types:
+        messages.append(websocket.receive_json())
+    return messages
+
+
+class WebSocketTestCase(unittest.TestCase):
+    """Runs the app (and its lifespan) once per test class."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(api_server.app)
+        cls.client.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def setUp(self):
+        service.backend = RecordingBackend(delay=0.05)
+
+    def wait_until(self, condition, message: str):
+        for _ in range(200):
+            if self.client.portal.call(condition):
+                return
+            time.sleep(0.01)
+        self.fail(message)
+
+
+class TestStorySocket(WebSocketTestCase):
+    """Test cases for /ws/story/{id}."""
+
+    def test_new_story_is_generated_and_followed(self):
+        """Id 0 starts a story; the socket then receives that story's events."""
+        with self.client.websocket_connect("/ws/story/0") as websocket:
+            websocket.send_json({"type": "generate", "index": 1})
+            messages = receive_until(websocket, "chapter")
+            saved = websocket.receive_json()
+
+            story_id = messages[0]["story_id"]
+            self.assertNotEqual(story_id, 0)
+            self.assertEqual([message["type"] for message in messages],
+                             ["story_id", "progress", "scene_background", "progress", "script", "script", "chapter"])
+            self.assertEqual(messages[1]["progress"], {"index": 1, "stage": "started", "lines": 0})
+            self.assertEqual(messages[4]["script"]["script"], "아침 교실.")
+            self.assertEqual(messages[-1]["chapter"]["story_id"], story_id)
+            self.assertEqual(saved["progress"], {"index": 1, "stage": "saved", "lines": 2})
+
+            event = {"type": "prefetched", "prefetched": {"index": 2}}
+            self.client.portal.call(service.publish_story, story_id, event)
+            self.assertEqual(websocket.receive_json(), event)
+        self.wait_until(lambda: story_id not in service.story_listeners, "the socket stayed subscribed")
+
+    def test_invalid_messages_are_answered_with_errors(self):
+        """Malformed messages and bad indices get an error and the socket stays open."""
+        with self.client.websocket_connect("/ws/story/0") as websocket:
+            websocket.send_text("nonsense")
+            self.assertIn("Expected", websocket.receive_json()["detail"])
+            for index in (0, "2", True, None):
+                websocket.send_json({"type": "generate", "index": index})
+                self.assertEqual(websocket.receive_json(),
+                                 {"type": "error", "detail": "index must be a positive integer"})
+
+    def test_second_generate_is_rejected_while_running(self):
+        """Only one chapter is generated at a time per connection."""
+        with self.client.websocket_connect("/ws/story/0") as websocket:
+            websocket.send_json({"type": "generate", "index": 1})
+            websocket.send_json({"type": "generate", "index": 2})
+            messages = receive_until(websocket, "chapter")
+
+        errors = [message["detail"] for message in messages if message["type"] == "error"]
+        self.assertEqual(errors, ["A chapter is already being generated"])
+        self.assertEqual(sum(message["type"] == "story_id" for message in messages), 1)
+
+    def test_closing_cancels_the_generation(self):
+        """A chapter still being written when the socket closes is abandoned."""
+        service.backend = RecordingBackend(delay=2)
+        with self.client.websocket_connect("/ws/story/0") as websocket:
+            websocket.send_json({"type": "generate", "index": 1})
+            story_id = websocket.receive_json()["story_id"]
+
+        self.wait_until(lambda: GENERATIONS_IN_FLIGHT.get(mode="stream") == 0, "the generation kept running")
+        self.assertIsNone(service.db_manager.get_story_chapter(story_id, 1))
+        self.assertNotIn(story_id, service.story_listeners)
+
+    def test_unknown_story(self):
+        """Continuing a story that does not exist reports it."""
+        with self.client.websocket_connect("/ws/story/999999") as websocket:
+            websocket.send_json({"type": "generate", "index": 2})
+            self.assertEqual(websocket.receive_json()["detail"],
+                             "Story 999999 not found; start a new game with index=1")
+
+
+class TestJobSocket(WebSocketTestCase):
+    """Test cases for /ws/jobs/{id}."""
+
+    def test_disconnect_is_noticed_while_waiting(self):
+        """A client leaving before the job changes is unsubscribed at once."""
+        queue = api_server.job_queue
+        self.client.portal.call(queue.stop)  # the job stays queued
+        try:
+            job = self.client.post("/api/jobs", params={"index": 1}).json()
+            with self.client.websocket_connect(f"/ws/jobs/{job['id']}") as websocket:
+                self.assertEqual(websocket.receive_json()["status"], "queued")
+                self.assertIn(job["id"], queue.subscribers)
+                websocket.close()
+                self.wait_until(lambda: job["id"] not in queue.subscribers, "the socket stayed subscribed")
+        finally:
+            self.client.portal.call(queue.start)
+
+    def test_unknown_job(self):
+        """Watching a job that does not exist closes with code 4404."""
+        with self.client.websocket_connect("/ws/jobs/999999") as websocket:
+            with self.assertRaises(WebSocketDisconnect) as closed:
+                websocket.receive_json()
+        self.assertEqual(closed.exception.code, 4404)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,107 @@
+"""
+Unit Tests for best-of-N chapter candidate selection
+
+Run with: python -m pytest test_candidates.py -v
+"""
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from candidates import CandidateSelector
+from llm_backend import LLMResult
+from story_models import Chapter
+from tool.metrics import CANDIDATES
+from fixtures import ScriptedCalls, factory
+
+
+def make_result(*lines) -> LLMResult:
+    chapter = Chapter(scene_background="Park", scripts=[
+        {"role": role, "emotion": emotion, "script": "..."} for role, emotion in lines
+    ])
+    return LLMResult(text=chapter.model_dump_json(), parsed=chapter)
+
+
+VALID = make_result(("narrator", "neutral"), ("Ji-hoon", "happy"), ("윤서아", "shy"))
+UNKNOWN_ROLE = make_result(("narrator", "neutral"), ("Student 3", "happy"), ("윤서아", "shy"))
+
+
+# Sprite checks only run in TestValidation, against its own sprite folder
+make_selector = factory(CandidateSelector, candidates=2, min_lines=3, checks=["roles", "lines"])
+ALL_CHECKS = ["roles", "sprites", "lines"]
+
+
+class TestValidation(unittest.TestCase):
+    """Test cases for the candidate checks."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name, emotions in (("narrator", ["neutral"]), ("강지훈", ["happy"]), ("윤서아", ["shy"])):
+            folder = Path(self.tmp.name) / name
+            folder.mkdir()
+            for emotion in emotions:
+                (folder / f"{emotion}.png").touch()
+
+        self.sprite_dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_valid_chapter(self):
+        """Known roles with sprites for every emotion pass."""
+        self.assertEqual(make_selector(checks=ALL_CHECKS, sprite_dir=self.sprite_dir).problems(VALID.parsed), [])
+
+    def test_each_check(self):
+        """Unknown roles, missing sprites and short chapters are reported."""
+        selector = make_selector(checks=ALL_CHECKS, sprite_dir=self.sprite_dir)
+        self.assertIn("unknown roles ['Student 3']", selector.problems(UNKNOWN_ROLE.parsed)[0])
+        sad = make_result(("narrator", "neutral"), ("지훈", "sad"), ("윤서아", "shy"))
+        self.assertEqual(selector.problems(sad.parsed), ["missing sprites ['강지훈/sad']"])
+        self.assertEqual(make_selector(min_lines=4, checks=ALL_CHECKS, sprite_dir=self.sprite_dir).problems(VALID.parsed), ["3 lines, need 4"])
+
+    def test_checks_are_configurable(self):
+        """Disabled checks are skipped; unknown names are rejected."""
+        self.assertEqual(make_selector(checks=["lines"], sprite_dir=self.sprite_dir).problems(UNKNOWN_ROLE.parsed), [])
+        with self.assertRaises(ValueError):
+            make_selector(checks=["grammar"])
+        with self.assertRaises(ValueError):
+            make_selector(policy="random")
+
+
+class TestSelection(unittest.IsolatedAsyncioTestCase):
+    """Test cases for running and choosing candidates."""
+
+    async def test_first_valid_wins_and_rest_are_cancelled(self):
+        """An invalid early candidate is skipped; pending ones are cancelled."""
+        generate = ScriptedCalls((0, UNKNOWN_ROLE), (0.01, VALID), (1, VALID))
+        before = CANDIDATES.get(outcome="cancelled")
+
+        result = await make_selector(candidates=3).select(generate)
+
+        self.assertIs(result, VALID)
+        self.assertEqual(generate.calls, 3)
+        await asyncio.sleep(0)
+        self.assertEqual(generate.cancelled, 1)
+        self.assertEqual(CANDIDATES.get(outcome="cancelled"), before + 1)
+
+    async def test_best_policy_waits_for_all(self):
+        """The best policy returns the valid candidate with the most lines."""
+        longer = make_result(*([("narrator", "neutral")] * 5))
+        generate = ScriptedCalls((0, VALID), (0.01, longer))
+        self.assertIs(await make_selector(candidates=2, policy="best").select(generate), longer)
+
+    async def test_invalid_candidate_is_the_fallback(self):
+        """Without a valid candidate, the first one that parsed is used."""
+        generate = ScriptedCalls((0, RuntimeError("down")), (0.01, UNKNOWN_ROLE))
+        self.assertIs(await make_selector(candidates=2).select(generate), UNKNOWN_ROLE)
+
+    async def test_all_failures_raise(self):
+        """The last error is raised when no candidate produced a chapter."""
+        generate = ScriptedCalls((0, RuntimeError("first")), (0.01, RuntimeError("second")))
+        with self.assertRaisesRegex(RuntimeError, "second"):
+            await make_selector(candidates=2).select(generate)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
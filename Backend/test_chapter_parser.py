@@ -0,0 +1,87 @@
+"""
+Unit Tests for the incremental Chapter JSON parser
+
+Run with: python -m pytest test_chapter_parser.py -v
+"""
+
+import json
+import unittest
+from tool.chapter_parser import ChapterStreamParser, salvage_chapter
+
+
+CHAPTER = {
+    "scene_background": "Park",
+    "scripts": [
+        {"role": "narrator", "emotion": "neutral", "script": "공원 \"벤치\" {괄호} [배열]"},
+        {"role": "윤서아", "emotion": "shy", "script": "백슬래시 \\ 도 괜찮아."},
+    ],
+}
+
+
+def feed_in_chunks(text: str, size: int):
+    parser = ChapterStreamParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return parser, events
+
+
+class TestChapterStreamParser(unittest.TestCase):
+    """Test cases for ChapterStreamParser."""
+
+    def test_events_for_every_chunk_size(self):
+        """Events are identical no matter where chunk boundaries fall."""
+        text = json.dumps(CHAPTER, ensure_ascii=False, indent=2)
+        expected = [("scene_background", "Park")] + [("script", s) for s in CHAPTER["scripts"]]
+
+        for size in (1, 2, 3, 5, 16, len(text)):
+            with self.subTest(size=size):
+                parser, events = feed_in_chunks(text, size)
+                self.assertEqual(events, expected)
+                self.assertEqual(parser.text, text)
+
+    def test_background_emitted_before_scripts_close(self):
+        """scene_background is reported as soon as its value is complete."""
+        parser = ChapterStreamParser()
+        events = parser.feed('{"scene_background": "Park", "scripts": [{"role": "나')
+        self.assertEqual(events, [("scene_background", "Park")])
+
+    def test_truncated_object_is_not_emitted(self):
+        """A script object cut off mid-stream produces no event."""
+        text = json.dumps(CHAPTER, ensure_ascii=False)
+        cut = text.index('"윤서아"')
+        parser, events = feed_in_chunks(text[:cut], 4)
+        self.assertEqual([kind for kind, _ in events], ["scene_background", "script"])
+        self.assertEqual(parser.scripts, CHAPTER["scripts"][:1])
+
+    def test_nested_scripts_key_is_ignored(self):
+        """Only the top-level scripts array produces script events."""
+        text = '{"meta": {"scripts": [{"role": "x"}]}, "scripts": [{"role": "y"}]}'
+        _, events = feed_in_chunks(text, 3)
+        self.assertEqual(events, [("script", {"role": "y"})])
+
+
+class TestSalvageChapter(unittest.TestCase):
+    """Test cases for recovering malformed Chapter documents."""
+
+    def test_truncated_document(self):
+        """Every closed script of a cut-off response is recovered."""
+        text = json.dumps(CHAPTER, ensure_ascii=False)
+        background, scripts = salvage_chapter(text[:text.index('"윤서아"')])
+        self.assertEqual(background, "Park")
+        self.assertEqual(scripts, CHAPTER["scripts"][:1])
+
+    def test_common_slips_are_repaired(self):
+        """Code fences, raw newlines in strings and trailing commas are tolerated."""
+        text = '```json\n{"scene_background": "Park", "scripts": [{"role": "나", "emotion": "sad", "script": "첫 줄\n둘째 줄",}, ]}\n```'
+        background, scripts = salvage_chapter(text)
+        self.assertEqual(background, "Park")
+        self.assertEqual(scripts, [{"role": "나", "emotion": "sad", "script": "첫 줄\n둘째 줄"}])
+
+    def test_nothing_to_salvage(self):
+        """Text without a chapter yields no background and no scripts."""
+        self.assertEqual(salvage_chapter("I cannot help with that."), (None, []))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
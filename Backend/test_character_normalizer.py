@@ -12,7 +12,10 @@ import unittest
 from tool.character_normalizer import (
     normalize_character_name,
     get_all_standardized_characters,
-    get_character_variations
+    get_character_variations,
+    normalize_many,
+    CharacterNameMatcher,
+    edit_distance,
 )
 
 
@@ -239,6 +242,101 @@ class TestCharacterNormalization(unittest.TestCase):
         self.assertEqual(unknown_variations, [])
 
 
+class TestCharacterNameMatcher(unittest.TestCase):
+    """Test cases for the precompiled matcher and the batch API."""
+
+    MAPPINGS = {
+        "지훈": "강지훈",
+        "kang ji-hoon": "강지훈",
+        "서아": "윤서아",
+        "yoon seo-ah": "윤서아",
+        "park min-ji": "박민지",
+        "ji": "Ji",
+    }
+
+    def test_longest_variation_wins(self):
+        """A longer contained variation beats a shorter one regardless of mapping order."""
+        for mappings in (self.MAPPINGS, dict(reversed(list(self.MAPPINGS.items())))):
+            matcher = CharacterNameMatcher(mappings)
+            with self.subTest(first=next(iter(mappings))):
+                self.assertEqual(matcher.normalize("Captain Kang Ji-hoon"), "강지훈")
+                self.assertEqual(matcher.normalize("Park Min-ji (angry)"), "박민지")
+
+    def test_earliest_match_breaks_ties(self):
+        """Equal-length variations resolve to the one that appears first."""
+        matcher = CharacterNameMatcher(self.MAPPINGS)
+        self.assertEqual(matcher.normalize("서아와 지훈"), "윤서아")
+        self.assertEqual(matcher.normalize("지훈과 서아"), "강지훈")
+
+    def test_fragment_of_one_character(self):
+        """A fragment inside variations of a single character maps to it."""
+        matcher = CharacterNameMatcher(self.MAPPINGS)
+        self.assertEqual(matcher.normalize("hoon"), "강지훈")
+
+    def test_ambiguous_fragment_is_preserved(self):
+        """A fragment shared by several characters is left unchanged."""
+        matcher = CharacterNameMatcher(self.MAPPINGS)
+        self.assertEqual(matcher.normalize("n"), "n")
+        self.assertEqual(matcher.normalize("-"), "-")
+
+    def test_normalize_many(self):
+        """The batch API keeps order and matches the single-name function."""
+        names = ["지훈", "Yoon Seo-ah", "Kim Tae-seong", "새로운캐릭터", None, "지훈"]
+        self.assertEqual(normalize_many(names), [normalize_character_name(name) for name in names])
+        self.assertEqual(normalize_many(names)[:3], ["강지훈", "윤서아", "김태성"])
+
+
+class TestFuzzyMatching(unittest.TestCase):
+    """Test cases for romanization variants missing from the mappings."""
+
+    def test_romanization_variants(self):
+        """Unseen spellings of known characters are matched."""
+        test_cases = [
+            ("Kim Taeseong", "김태성"),
+            ("Yun Seo-a", "윤서아"),
+            ("Park Minji", "박민지"),
+            ("Kang Jihun", "강지훈"),
+            ("Jeong Miyeon", "정미연"),
+            ("Narator", "Narrator"),
+            ("윤서하", "윤서아"),  # One wrong consonant
+        ]
+        for input_name, expected in test_cases:
+            with self.subTest(input_name=input_name):
+                self.assertEqual(normalize_character_name(input_name), expected)
+
+    def test_different_names_are_preserved(self):
+        """Names that are only somewhat similar stay unchanged."""
+        for name in ["Park Minsu", "김태호", "Student 3", "Yoon Sea", "Minju", "Park Minja", "윤서우"]:
+            with self.subTest(name=name):
+                self.assertEqual(normalize_character_name(name), name)
+
+    def test_ambiguous_fuzzy_match_is_preserved(self):
+        """A name equally close to two characters matches neither."""
+        matcher = CharacterNameMatcher({"park minji": "박민지", "park minja": "박민자"})
+        self.assertEqual(matcher.normalize("Park Minjo"), "Park Minjo")
+        self.assertEqual(matcher.normalize("Park Minjii"), "박민지")
+
+    def test_threshold_one_disables_fuzzy_matching(self):
+        """fuzzy_threshold=1 keeps only exact and substring matches."""
+        matcher = CharacterNameMatcher({"yoon seo-ah": "윤서아"}, fuzzy_threshold=1)
+        self.assertEqual(matcher.normalize("Yun Seo-a"), "Yun Seo-a")
+
+    def test_edit_distance(self):
+        """The bit-parallel distance agrees with known Levenshtein distances."""
+        test_cases = [
+            ("", "", 0),
+            ("abc", "", 3),
+            ("kitten", "sitting", 3),
+            ("flaw", "lawn", 2),
+            ("윤서아", "윤서하", 1),
+            ("kimtaesung", "kimtaesung", 0),
+        ]
+        for a, b, expected in test_cases:
+            with self.subTest(a=a, b=b):
+                self.assertEqual(edit_distance(a, b), expected)
+                self.assertEqual(edit_distance(b, a), expected)
+
+
 def run_basic_tests():
     """Run basic functionality tests for manual verification."""
     print("=== Character Normalizer Basic Tests ===")
@@ -0,0 +1,99 @@
+"""
+Unit Tests for the bounded story context builder
+
+Run with: python -m pytest test_context_builder.py -v
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from context_builder import StoryContextBuilder, estimate_tokens
+from database_manager import DatabaseManager
+
+
+def make_chapter(number: int) -> dict:
+    return {
+        "scene_background": "Park",
+        "scripts": [
+            {"role": "Narrator", "emotion": "neutral", "script": f"챕터 {number} " + "가" * 300},
+        ],
+    }
+
+
+async def run_inline(func, *args):
+    return func(*args)
+
+
+class TestStoryContextBuilder(unittest.IsolatedAsyncioTestCase):
+    """Test cases for StoryContextBuilder."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "scripts.db"))
+        self.story_id = self.db.create_story()
+        self.summary_calls = []
+
+        async def summarize(text):
+            self.summary_calls.append(text)
+            return f"summary#{len(self.summary_calls)}"
+
+        self.builder = StoryContextBuilder(
+            self.db, summarize, run_inline, token_budget=500, recent_chapters=2, fanout=2
+        )
+
+    async def asyncTearDown(self):
+        self.tmp.cleanup()
+
+    def add_chapters(self, count: int):
+        start = len(self.db.get_all_chapters(self.story_id))
+        for number in range(start, start + count):
+            self.db.save_chapter(make_chapter(number), self.story_id)
+
+    async def test_small_story_is_verbatim(self):
+        """A story within budget is passed through without summaries."""
+        self.add_chapters(1)
+        context = await self.builder.build(self.story_id)
+        self.assertIn("챕터 0", context)
+        self.assertEqual(self.summary_calls, [])
+
+    async def test_older_chapters_are_summarized_once(self):
+        """Summaries are cached in SQLite and reused on the next request."""
+        self.add_chapters(5)
+        first = await self.builder.build(self.story_id)
+        calls_after_first = len(self.summary_calls)
+        second = await self.builder.build(self.story_id)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.summary_calls), calls_after_first)
+        self.assertIn("챕터 4", first)
+        self.assertIn("챕터 3", first)
+        self.assertNotIn("챕터 0", first)
+
+    async def test_summaries_of_summaries(self):
+        """Complete groups of summaries are merged into a higher level."""
+        self.add_chapters(6)
+        await self.builder.build(self.story_id)
+        levels = {row["level"] for row in self.db.get_chapter_summaries(self.story_id)}
+        self.assertEqual(levels, {0, 1, 2})
+
+    async def test_context_size_stays_bounded(self):
+        """Prompt context stays under budget as the story keeps growing."""
+        sizes = []
+        for _ in range(6):
+            self.add_chapters(5)
+            context = await self.builder.build(self.story_id)
+            sizes.append(estimate_tokens(context))
+        self.assertLessEqual(max(sizes), 500 + 10)
+
+    async def test_reset_story_drops_summaries(self):
+        """Resetting a story removes its cached summaries."""
+        self.add_chapters(5)
+        await self.builder.build(self.story_id)
+        self.db.reset_story(self.story_id)
+        self.assertEqual(self.db.get_chapter_summaries(self.story_id), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
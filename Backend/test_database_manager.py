@@ -0,0 +1,454 @@
+"""
+Unit Tests for DatabaseManager
+
+Every test works on a temporary database file.
+
+Run with: python -m pytest test_database_manager.py -v
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from database_manager import DatabaseManager
+from tool.metrics import DB_OPERATIONS
+
+
+def make_chapter(*lines) -> dict:
+    return {
+        "scene_background": "Park",
+        "scripts": [{"role": role, "emotion": "neutral", "script": script} for role, script in lines],
+    }
+
+
+class TestMaterializedContext(unittest.TestCase):
+    """Test cases for the per-story materialized context."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "scripts.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_save_chapter_appends_context(self):
+        """Each saved chapter is appended and bumps the version."""
+        story_id = self.db.create_story()
+        self.db.save_chapter(make_chapter(("Narrator", "하나"), ("강지훈", "둘")), story_id)
+        self.db.save_chapter(make_chapter(("윤서아", "셋")), story_id)
+
+        version, text = self.db.get_story_context(story_id)
+        self.assertEqual(text, "Narrator: 하나\n강지훈: 둘\n윤서아: 셋")
+        self.assertEqual(version, 2)
+        self.assertEqual(self.db.get_story_context_state(story_id), (2, len(text)))
+        self.assertEqual(text, self.db.get_all_scripts_concatenated(story_id)[len("Previous story:\n"):])
+
+    def test_reset_story_clears_context(self):
+        """Resetting a story empties its context and bumps the version."""
+        story_id = self.db.create_story()
+        self.db.save_chapter(make_chapter(("Narrator", "하나")), story_id)
+        self.db.reset_story(story_id)
+        self.assertEqual(self.db.get_story_context(story_id), (2, ""))
+
+    def test_legacy_rows_are_backfilled(self):
+        """Chapters written before script_text existed are materialized on startup."""
+        story_id = self.db.create_story()
+        chapter_id = self.db.save_chapter(make_chapter(("Narrator", "하나")), story_id)
+        with sqlite3.connect(self.db.db_path) as conn:
+            conn.execute("UPDATE chapters SET script_text = NULL")
+            conn.execute("UPDATE story_contexts SET context_text = '', context_chars = 0")
+            # As written by a version from before schema migrations
+            conn.execute("PRAGMA user_version = 0")
+
+        reopened = DatabaseManager(self.db.db_path)
+        self.assertEqual(reopened.get_chapter_texts([chapter_id]), {chapter_id: "Narrator: 하나"})
+        self.assertEqual(reopened.get_story_context(story_id)[1], "Narrator: 하나")
+
+        reopened.close()
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test cases for the per-thread pooled connections."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "scripts.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_connection_is_reused_per_thread(self):
+        """A thread gets the same connection back; other threads get their own."""
+        self.assertIs(self.db.connection(), self.db.connection())
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.db.connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], self.db.connection())
+
+    def test_operations_are_counted_by_public_method(self):
+        """Each checkout is counted under the public method, not the helper doing the query."""
+        before = {name: DB_OPERATIONS.get(operation=name) for name in ("get_all_chapters", "iter_chapters")}
+        self.db.get_all_chapters()
+        self.assertEqual(DB_OPERATIONS.get(operation="get_all_chapters"), before["get_all_chapters"] + 1)
+        self.assertEqual(DB_OPERATIONS.get(operation="iter_chapters"), before["iter_chapters"])
+
+    def test_wal_mode_is_enabled(self):
+        """The database runs in WAL mode with relaxed syncing."""
+        conn = self.db.connection()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+
+    def test_reads_do_not_wait_for_open_write(self):
+        """Readers see the last committed state while a write transaction is open."""
+        story_id = self.db.create_story()
+        self.db.save_chapter(make_chapter(("Narrator", "하나")), story_id)
+
+        writer = sqlite3.connect(self.db.db_path, isolation_level=None)
+        # EXCLUSIVE locks out readers in rollback-journal mode, but not in WAL
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.execute("UPDATE chapters SET script_text = 'uncommitted'")
+        try:
+            start = time.perf_counter()
+            chapters = self.db.get_all_chapters(story_id)
+            elapsed = time.perf_counter() - start
+        finally:
+            writer.execute("ROLLBACK")
+            writer.close()
+
+        self.assertEqual(len(chapters), 1)
+        self.assertLess(elapsed, 1.0)
+
+    def test_close_reopens_on_next_use(self):
+        """Closing the pool does not break later calls."""
+        story_id = self.db.create_story()
+        self.db.close()
+        self.assertTrue(self.db.story_exists(story_id))
+
+
+class TestIterChapters(unittest.TestCase):
+    """Test cases for streaming and paging chapters."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "scripts.db"))
+        self.story_id = self.db.create_story()
+        self.other_id = self.db.create_story()
+        self.chapter_ids = []
+        for number in range(5):
+            self.chapter_ids.append(self.db.save_chapter(
+                make_chapter(("Narrator", f"{number}-a"), ("강지훈", f"{number}-b")), self.story_id
+            ))
+            self.db.save_chapter(make_chapter(("윤서아", "다른 이야기")), self.other_id)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_matches_get_chapter(self):
+        """Streamed chapters have the same content as get_chapter."""
+        chapters = list(self.db.iter_chapters(self.story_id))
+        self.assertEqual(chapters, [self.db.get_chapter(chapter_id) for chapter_id in self.chapter_ids])
+
+    def test_single_query(self):
+        """All chapters are read with one statement instead of one per chapter."""
+        statements = []
+        conn = self.db.connection()
+        conn.set_trace_callback(statements.append)
+        try:
+            chapters = self.db.get_all_chapters(self.story_id)
+        finally:
+            conn.set_trace_callback(None)
+        self.assertEqual(len(chapters), 5)
+        self.assertEqual(len([sql for sql in statements if "SELECT" in sql]), 1)
+
+    def test_pages_with_cursor(self):
+        """after_id and limit walk the story one page at a time."""
+        pages, after_id = [], None
+        while True:
+            page = list(self.db.iter_chapters(self.story_id, after_id, 2))
+            if not page:
+                break
+            pages.append([chapter['id'] for chapter in page])
+            after_id = page[-1]['id']
+        self.assertEqual(pages, [self.chapter_ids[0:2], self.chapter_ids[2:4], self.chapter_ids[4:]])
+
+    def test_chapter_without_scripts(self):
+        """A chapter with no script rows is still returned."""
+        chapter_id = self.db.save_chapter({"scene_background": "Park", "scripts": []}, self.story_id)
+        last = list(self.db.iter_chapters(self.story_id, after_id=self.chapter_ids[-1]))
+        self.assertEqual([(chapter['id'], chapter['scripts']) for chapter in last], [(chapter_id, [])])
+
+
+class TestArchiveExportImport(unittest.TestCase):
+    """Test cases for streaming JSON/JSONL export and bulk import."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "scripts.db"))
+        self.target = DatabaseManager(os.path.join(self.tmp.name, "target.db"))
+        self.story_ids = [self.db.create_story(), self.db.create_story()]
+        for number in range(5):
+            for story_id in self.story_ids:
+                self.db.save_chapter(make_chapter(("Narrator", f"{story_id}-{number}"), ("강지훈", "응")), story_id)
+
+    def tearDown(self):
+        self.db.close()
+        self.target.close()
+        self.tmp.cleanup()
+
+    def assert_round_trip(self, file_name):
+        path = os.path.join(self.tmp.name, file_name)
+        self.assertEqual(self.db.export_to_jsonl(path), 10)
+        self.assertEqual(self.target.import_from_jsonl(path, batch_size=3), 10)
+
+        for story_id, new_id in zip(self.story_ids, (1, 2)):
+            source = self.db.get_all_chapters(story_id)
+            imported = self.target.get_all_chapters(new_id)
+            strip = lambda chapters: [(c['scene_background'], c['created_at'], c['scripts']) for c in chapters]
+            self.assertEqual(strip(imported), strip(source))
+            self.assertEqual(self.target.get_story_context(new_id)[1], self.db.get_story_context(story_id)[1])
+
+    def test_round_trip_plain(self):
+        """A JSONL archive re-imports into the same stories and chapters."""
+        self.assert_round_trip("export.jsonl")
+
+    def test_round_trip_gzip(self):
+        """.gz archives are compressed on export and detected on import."""
+        self.assert_round_trip("export.jsonl.gz")
+        with open(os.path.join(self.tmp.name, "export.jsonl.gz"), "rb") as f:
+            self.assertEqual(f.read(2), b"\x1f\x8b")
+
+    def test_import_appends_after_existing_chapters(self):
+        """Imported chapters get fresh IDs and stories after existing data."""
+        existing_story = self.target.create_story()
+        existing_id = self.target.save_chapter(make_chapter(("Narrator", "기존")), existing_story)
+        path = os.path.join(self.tmp.name, "export.jsonl")
+        self.db.export_to_jsonl(path, story_id=self.story_ids[0])
+        self.target.import_from_jsonl(path)
+
+        chapters = self.target.get_all_chapters()
+        self.assertEqual(len(chapters), 6)
+        self.assertEqual(chapters[0]['id'], existing_id)
+        self.assertEqual({c['story_id'] for c in chapters[1:]}, {existing_story + 1})
+
+    def test_json_export_is_one_document(self):
+        """The indented JSON export still parses as a single document."""
+        path = os.path.join(self.tmp.name, "export.json")
+        self.db.export_to_json(path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(data['total_chapters'], 10)
+        self.assertEqual(data['chapters'], self.db.get_all_chapters())
+
+
+class TestDialogueSearch(unittest.TestCase):
+    """Test cases for the FTS5 dialogue index."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "scripts.db"))
+        self.story_id = self.db.create_story()
+        self.other_id = self.db.create_story()
+        self.db.save_chapter(make_chapter(
+            ("강지훈", "오늘도 <도시락> 싸 왔어?"),
+            ("윤서아", "벚꽃이 정말 예쁘다."),
+        ), self.story_id)
+        self.db.save_chapter(make_chapter(("강지훈", "도시락은 내가 쏠게.")), self.other_id)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_finds_korean_substrings(self):
+        """Substrings of Korean words match without word segmentation."""
+        results = self.db.search_dialogue("도시락")
+        self.assertEqual(len(results), 2)
+        self.assertEqual({r['story_id'] for r in results}, {self.story_id, self.other_id})
+
+    def test_snippet_is_escaped_and_marked(self):
+        """Snippets escape HTML and wrap the match in <mark>."""
+        result = self.db.search_dialogue("도시락", story_id=self.story_id)[0]
+        self.assertEqual(result['snippet'], "오늘도 &lt;<mark>도시락</mark>&gt; 싸 왔어?")
+
+    def test_all_terms_must_match(self):
+        """Terms combine with AND across role and line, including short terms."""
+        self.assertEqual(len(self.db.search_dialogue("강지훈 도시락")), 2)
+        self.assertEqual(len(self.db.search_dialogue("윤서아 도시락")), 0)
+        results = self.db.search_dialogue("벚꽃")
+        self.assertEqual([r['role'] for r in results], ["윤서아"])
+        self.assertIn("<mark>벚꽃</mark>", results[0]['snippet'])
+
+    def test_index_follows_deletes(self):
+        """Resetting a story removes its lines from the index."""
+        self.db.reset_story(self.story_id)
+        results = self.db.search_dialogue("도시락")
+        self.assertEqual([r['story_id'] for r in results], [self.other_id])
+
+    def test_common_terms_rank_newest_window(self):
+        """Only the newest SEARCH_RANK_WINDOW matches are ranked."""
+        self.db.SEARCH_RANK_WINDOW = 1
+        results = self.db.search_dialogue("도시락")
+        self.assertEqual([r['story_id'] for r in results], [self.other_id])
+        self.assertEqual(len(self.db.search_dialogue("도시락", story_id=self.story_id)), 1)
+
+    def test_role_search_short_and_long(self):
+        """Role search keeps substring semantics for any pattern length."""
+        self.assertEqual(len(self.db.search_scripts_by_role("강지훈")), 2)
+        self.assertEqual(len(self.db.search_scripts_by_role("지훈")), 2)
+        self.assertEqual(len(self.db.search_scripts_by_role("서아")), 1)
+
+
+class TestResponseCacheStorage(unittest.TestCase):
+    """Test cases for cached LLM responses: TTL and size-based LRU eviction."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "scripts.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def put(self, key, now, max_bytes=1000, ttl=100):
+        return self.db.put_cached_response(key, "x" * 100, 10, 20, now, now - ttl, max_bytes)
+
+    def test_round_trip(self):
+        """A stored response is returned with its token counts."""
+        self.put("a", now=1000)
+        self.assertEqual(self.db.get_cached_response("a", 950, 1001), ("x" * 100, 10, 20))
+        self.assertIsNone(self.db.get_cached_response("missing", 950, 1001))
+
+    def test_expired_entries_are_not_served_and_evicted(self):
+        """Entries older than the TTL are skipped on read and deleted on the next write."""
+        self.put("old", now=1000)
+        self.assertIsNone(self.db.get_cached_response("old", 1000, 1200))
+        self.assertEqual(self.put("new", now=1200), 1)
+        self.assertEqual(self.db.get_response_cache_stats(), {'entries': 1, 'bytes': 100})
+
+    def test_least_recently_used_are_evicted_over_size(self):
+        """Writes over the size limit evict the least recently used entries."""
+        self.put("a", now=1000, max_bytes=250)
+        self.put("b", now=1001, max_bytes=250)
+        self.db.get_cached_response("a", 900, 1002)  # "a" is now more recent than "b"
+        self.assertEqual(self.put("c", now=1003, max_bytes=250), 1)
+
+        self.assertIsNone(self.db.get_cached_response("b", 900, 1004))
+        self.assertIsNotNone(self.db.get_cached_response("a", 900, 1004))
+        self.assertIsNotNone(self.db.get_cached_response("c", 900, 1004))
+
+
+class TestSchemaMigrations(unittest.TestCase):
+    """Test cases for user_version based schema migrations."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "scripts.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_original_schema_is_upgraded_in_place(self):
+        """A database from the first release is migrated to the current version."""
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE chapters (id INTEGER PRIMARY KEY AUTOINCREMENT, scene_background TEXT NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+            conn.execute("CREATE TABLE scripts (id INTEGER PRIMARY KEY AUTOINCREMENT, chapter_id INTEGER NOT NULL, role TEXT NOT NULL, emotion TEXT NOT NULL, script TEXT NOT NULL, order_index INTEGER NOT NULL)")
+            conn.execute("INSERT INTO chapters (scene_background) VALUES ('Park')")
+            conn.execute("INSERT INTO scripts (chapter_id, role, emotion, script, order_index) VALUES (1, 'Narrator', 'neutral', '하나', 0)")
+
+        db = DatabaseManager(self.path)
+        try:
+            conn = db.connection()
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], DatabaseManager.SCHEMA_VERSION)
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            self.assertTrue({"idx_chapters_story", "idx_scripts_chapter"} <= indexes)
+            self.assertEqual(db.get_chapter_texts([1]), {1: "Narrator: 하나"})
+            self.assertEqual(db.get_chapter(1)["scripts"][0]["script"], "하나")
+            self.assertEqual(len(db.search_dialogue("Narrator")), 1)
+        finally:
+            db.close()
+
+    def test_chapter_lookup_uses_covering_index(self):
+        """Reading a chapter's scripts is answered from the index alone."""
+        db = DatabaseManager(self.path)
+        try:
+            plan = db.connection().execute(
+                "EXPLAIN QUERY PLAN SELECT role, emotion, script FROM scripts WHERE chapter_id = ? ORDER BY order_index",
+                (1,)
+            ).fetchall()
+            self.assertIn("COVERING INDEX idx_scripts_chapter", " ".join(row[-1] for row in plan))
+        finally:
+            db.close()
+
+    def test_save_chapter_keeps_script_order(self):
+        """Batched script inserts keep their order and enum values."""
+        db = DatabaseManager(self.path)
+        try:
+            chapter = make_chapter(("Narrator", "하나"), ("강지훈", "둘"), ("윤서아", "셋"))
+            chapter["scripts"][1]["emotion"] = type("Emotion", (), {"value": "happy"})()
+            chapter_id = db.save_chapter(chapter, db.create_story())
+            scripts = db.get_chapter(chapter_id)["scripts"]
+            self.assertEqual([s["script"] for s in scripts], ["하나", "둘", "셋"])
+            self.assertEqual(scripts[1]["emotion"], "happy")
+        finally:
+            db.close()
+
+    def test_save_chapter_is_idempotent_per_index(self):
+        """Saving a story's chapter index twice keeps the first chapter."""
+        db = DatabaseManager(self.path)
+        try:
+            story_id = db.create_story()
+            first = db.save_chapter(make_chapter(("Narrator", "하나")), story_id)
+            second = db.save_chapter(make_chapter(("Narrator", "둘")), story_id, chapter_index=2)
+            retry = db.save_chapter(make_chapter(("Narrator", "다시")), story_id, chapter_index=2)
+
+            self.assertEqual(retry, second)
+            self.assertEqual(len(db.get_all_chapters(story_id)), 2)
+            self.assertEqual(db.get_story_chapter(story_id, 1)["id"], first)
+            self.assertEqual(db.get_story_chapter(story_id, 2)["scripts"][0]["script"], "둘")
+            self.assertIsNone(db.get_story_chapter(story_id, 3))
+            self.assertEqual(db.get_story_context(story_id)[1], "Narrator: 하나\nNarrator: 둘")
+        finally:
+            db.close()
+
+    def test_save_chapter_reports_other_constraint_errors(self):
+        """Only the duplicate chapter index is ignored; other violations still raise."""
+        db = DatabaseManager(self.path)
+        try:
+            story_id = db.create_story()
+            with self.assertRaises(sqlite3.IntegrityError):
+                db.save_chapter({"scene_background": None, "scripts": []}, story_id, chapter_index=1)
+            self.assertIsNone(db.get_story_chapter(story_id, 1))
+        finally:
+            db.close()
+
+    def test_chapter_index_is_backfilled(self):
+        """Chapters saved before v5 are numbered per story in saving order."""
+        db = DatabaseManager(self.path)
+        stories = [db.create_story(), db.create_story()]
+        for story_id in (stories[0], stories[1], stories[0]):
+            db.save_chapter(make_chapter(("Narrator", "하나")), story_id)
+        conn = db.connection()
+        conn.execute("DROP INDEX idx_chapters_story_index")
+        conn.execute("UPDATE chapters SET chapter_index = NULL")
+        conn.execute("PRAGMA user_version = 4")
+        conn.commit()
+        db.close()
+
+        db = DatabaseManager(self.path)
+        try:
+            rows = db.connection().execute("SELECT story_id, chapter_index FROM chapters ORDER BY id").fetchall()
+            self.assertEqual(rows, [(stories[0], 1), (stories[1], 1), (stories[0], 2)])
+            self.assertEqual(db.save_chapter(make_chapter(("Narrator", "셋")), stories[0], chapter_index=2), 3)
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,467 @@
+"""
+Unit Tests for the GenerateScript service
+
+These tests plug in an in-process recording backend so no network access or
+API key is needed.
+
+Run with: python -m pytest test_generate_script.py -v
+"""
+
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+
+from generate_script import GenerateScript, Chapter, StoryNotFoundError
+from llm_backend import LLMResult
+from prefetch import SpeculativePrefetcher
+from candidates import CandidateSelector
+from tool.metrics import STAGE_SECONDS, LLM_TOKENS_TOTAL, GENERATIONS_IN_FLIGHT
+from fixtures import SAMPLE_CHAPTER, RecordingBackend, make_service
+
+
+class TestAsyncGeneration(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the non-blocking generation path."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.service = make_service(self.tmp.name, delay=0.2)
+
+    async def asyncTearDown(self):
+        self.service.io_executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    async def test_generate_normalizes_and_saves(self):
+        """Generated chapters are normalized and persisted."""
+        result = await self.service.generate_script(1)
+        self.assertEqual(result["scripts"][1]["role"], "강지훈")
+        stats = self.service.db_manager.get_database_stats()
+        self.assertEqual(stats["total_chapters"], 1)
+
+    async def test_event_loop_stays_responsive(self):
+        """Other coroutines keep running while a chapter is generated."""
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker_task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        await self.service.generate_script(1)
+        elapsed = time.perf_counter() - start
+        ticker_task.cancel()
+
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertGreater(ticks, 10)
+
+    async def test_records_stage_metrics(self):
+        """Each stage is timed and reported token usage is counted."""
+        async def generate_chapter(prompt):
+            chapter = Chapter.model_validate(SAMPLE_CHAPTER)
+            return LLMResult(text=chapter.model_dump_json(), parsed=chapter, prompt_tokens=100, output_tokens=40)
+
+        self.service.backend.generate_chapter = generate_chapter
+        stages = ('prompt_read', 'llm', 'normalize', 'save_chapter')
+        before = {stage: STAGE_SECONDS.count(stage=stage) for stage in stages}
+        output_tokens = LLM_TOKENS_TOTAL.get(kind='output')
+
+        await self.service.generate_script(1)
+
+        for stage in stages:
+            self.assertEqual(STAGE_SECONDS.count(stage=stage), before[stage] + 1, stage)
+        self.assertEqual(LLM_TOKENS_TOTAL.get(kind='output'), output_tokens + 40)
+        self.assertEqual(GENERATIONS_IN_FLIGHT.get(mode='blocking'), 0)
+
+
+class TestStoryIsolation(unittest.IsolatedAsyncioTestCase):
+    """Test cases for per-story namespacing."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.service = make_service(self.tmp.name)
+
+    async def asyncTearDown(self):
+        self.service.io_executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    async def test_new_game_does_not_touch_other_stories(self):
+        """Starting a second story keeps the first story's chapters."""
+        first = await self.service.generate_script(1)
+        await self.service.generate_script(2, first["story_id"])
+        second = await self.service.generate_script(1)
+
+        self.assertNotEqual(first["story_id"], second["story_id"])
+        db = self.service.db_manager
+        self.assertEqual(len(db.get_all_chapters(first["story_id"])), 2)
+        self.assertEqual(len(db.get_all_chapters(second["story_id"])), 1)
+
+    async def test_context_is_scoped_to_story(self):
+        """Prompts only include history from the requested story."""
+        first = await self.service.generate_script(1)
+        other = await self.service.generate_script(1)
+        await self.service.generate_script(2, first["story_id"])
+
+        prompt = self.service.backend.prompts[-1]
+        self.assertEqual(prompt.count("아침 교실."), 1)
+        self.assertIsNotNone(other["story_id"])
+
+    async def test_restart_resets_only_that_story(self):
+        """index=1 with an existing story_id clears just that story."""
+        first = await self.service.generate_script(1)
+        await self.service.generate_script(2, first["story_id"])
+        other = await self.service.generate_script(1)
+        restarted = await self.service.generate_script(1, first["story_id"])
+
+        db = self.service.db_manager
+        self.assertEqual(restarted["story_id"], first["story_id"])
+        self.assertEqual(len(db.get_all_chapters(first["story_id"])), 1)
+        self.assertEqual(len(db.get_all_chapters(other["story_id"])), 1)
+
+    async def test_continue_unknown_story_fails(self):
+        """Continuing a story that does not exist raises StoryNotFoundError."""
+        with self.assertRaises(StoryNotFoundError):
+            await self.service.generate_script(2, 999)
+
+
+class TestSpeculativePrefetch(unittest.IsolatedAsyncioTestCase):
+    """Test cases for background pre-generation of the next chapter."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.service = make_service(self.tmp.name, delay=0.05)
+        self.service.prefetcher = SpeculativePrefetcher(enabled=True, max_jobs=2)
+        self.backend = self.service.backend
+
+    async def asyncTearDown(self):
+        for story_id in list(self.service.prefetcher.slots):
+            self.service.prefetcher.cancel(story_id)
+        self.service.io_executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    async def wait_for_slot(self, story_id):
+        _, _, task = self.service.prefetcher.slots[story_id]
+        await asyncio.wait([task])
+
+    async def test_next_chapter_served_from_prefetch(self):
+        """A ready speculative chapter is returned without another LLM call."""
+        first = await self.service.generate_script(1)
+        await self.wait_for_slot(first["story_id"])
+        calls = len(self.backend.prompts)
+
+        second = await self.service.generate_script(2, first["story_id"])
+
+        self.assertEqual(len(self.backend.prompts), calls)
+        self.assertEqual(self.service.prefetcher.stats["hits"], 1)
+        self.assertEqual(second["scripts"][1]["role"], "강지훈")
+        self.assertEqual(len(self.service.db_manager.get_all_chapters(first["story_id"])), 2)
+
+    async def test_listeners_hear_of_ready_prefetch(self):
+        """Story listeners are told when the next chapter has been generated ahead."""
+        first = await self.service.generate_script(1)
+        story_id = first["story_id"]
+        listener = self.service.subscribe_story(story_id)
+        await self.wait_for_slot(story_id)
+
+        self.assertEqual(listener.get_nowait(), {"type": "prefetched", "prefetched": {"index": 2}})
+        self.service.unsubscribe_story(story_id, listener)
+        self.assertEqual(self.service.story_listeners, {})
+
+    async def test_stale_prefetch_is_not_announced(self):
+        """No prefetched event is sent for a result the story has already outdated."""
+        first = await self.service.generate_script(1)
+        story_id = first["story_id"]
+        listener = self.service.subscribe_story(story_id)
+        self.service.db_manager.save_chapter(SAMPLE_CHAPTER, story_id, chapter_index=3)
+        await self.wait_for_slot(story_id)
+
+        self.assertTrue(listener.empty())
+
+    async def test_request_attaches_to_in_flight_job(self):
+        """A request arriving mid-generation awaits the running job."""
+        first = await self.service.generate_script(1)
+        await self.service.generate_script(2, first["story_id"])
+        self.assertEqual(self.service.prefetcher.stats["joins"], 1)
+
+    async def test_reset_cancels_prefetch(self):
+        """Restarting a story cancels its speculative job."""
+        first = await self.service.generate_script(1)
+        _, _, task = self.service.prefetcher.slots[first["story_id"]]
+        await self.service.generate_script(1, first["story_id"])
+        self.assertTrue(task.cancelled())
+        self.assertEqual(self.service.prefetcher.stats["cancelled"], 1)
+
+    async def test_stale_prefetch_is_discarded(self):
+        """A speculative chapter built on older history is not used."""
+        first = await self.service.generate_script(1)
+        await self.wait_for_slot(first["story_id"])
+        # Changes the story's history without taking chapter 2's place
+        self.service.db_manager.save_chapter(SAMPLE_CHAPTER, first["story_id"], chapter_index=3)
+
+        await self.service.generate_script(2, first["story_id"])
+        self.assertEqual(self.service.prefetcher.stats["stale"], 1)
+        self.assertEqual(self.service.prefetcher.stats["hits"], 0)
+
+
+class TestRequestCoalescing(unittest.IsolatedAsyncioTestCase):
+    """Test cases for duplicate chapter requests."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.service = make_service(self.tmp.name, delay=0.1)
+        self.backend = self.service.backend
+
+    async def asyncTearDown(self):
+        self.service.io_executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    async def test_concurrent_duplicates_share_one_generation(self):
+        """Identical concurrent requests make one LLM call and get the same chapter."""
+        first = await self.service.generate_script(1)
+        calls = len(self.backend.prompts)
+
+        results = await asyncio.gather(*(self.service.generate_script(2, first["story_id"]) for _ in range(5)))
+
+        self.assertEqual(len(self.backend.prompts), calls + 1)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(len(self.service.db_manager.get_all_chapters(first["story_id"])), 2)
+        self.assertEqual(self.service.in_flight, {})
+
+    async def test_retry_returns_saved_chapter(self):
+        """Requesting a chapter that was already generated replays it."""
+        first = await self.service.generate_script(1)
+        second = await self.service.generate_script(2, first["story_id"])
+        calls = len(self.backend.prompts)
+
+        retry = await self.service.generate_script(2, first["story_id"])
+        events = [event async for event in self.service.stream_script(2, first["story_id"])]
+
+        self.assertEqual(len(self.backend.prompts), calls)
+        self.assertEqual(retry["scripts"], second["scripts"])
+        self.assertEqual([line["script"] for line in events[-1][1]["scripts"]],
+                         [line["script"] for line in second["scripts"]])
+        self.assertEqual(len(self.service.db_manager.get_all_chapters(first["story_id"])), 2)
+
+    async def test_cancelled_caller_does_not_cancel_shared_generation(self):
+        """The generation finishes for the remaining callers if one gives up."""
+        first = await self.service.generate_script(1)
+        impatient = asyncio.create_task(self.service.generate_script(2, first["story_id"]))
+        patient = asyncio.create_task(self.service.generate_script(2, first["story_id"]))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+
+        result = await patient
+        self.assertEqual(result["story_id"], first["story_id"])
+        self.assertEqual(len(self.service.db_manager.get_all_chapters(first["story_id"])), 2)
+
+
+class TruncatingBackend(RecordingBackend):
+    """Backend whose first response stops after ``kept`` complete lines."""
+
+    def __init__(self, kept: int):
+        super().__init__()
+        self.kept = kept
+
+    async def generate_chapter(self, prompt):
+        self.prompts.append(prompt)
+        chapter = Chapter.model_validate(SAMPLE_CHAPTER)
+        if len(self.prompts) > 1:
+            return LLMResult(text=chapter.model_dump_json(), parsed=chapter)
+        lines = SAMPLE_CHAPTER["scripts"] * self.kept
+        text = json.dumps({"scene_background": "Park", "scripts": lines + [{"role": "x"}]}, ensure_ascii=False)
+        return LLMResult(text=text[:text.index('{"role": "x"') + 5], parsed=None)
+
+
+class TestSalvage(unittest.IsolatedAsyncioTestCase):
+    """Test cases for salvaging responses that do not parse."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    async def asyncTearDown(self):
+        self.service.io_executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    def make(self, kept: int, min_lines: int) -> GenerateScript:
+        self.service = make_service(self.tmp.name, backend=TruncatingBackend(kept))
+        self.service.salvage_min_lines = min_lines
+        return self.service
+
+    async def test_long_salvage_is_used_as_is(self):
+        """Enough recovered lines make a chapter without another request."""
+        service = self.make(kept=3, min_lines=6)
+        result = await service.generate_script(1)
+        self.assertEqual(len(service.backend.prompts), 1)
+        self.assertEqual(result["scene_background"].value, "Park")
+        self.assertEqual(len(result["scripts"]), 6)
+
+    async def test_short_salvage_is_continued(self):
+        """Too few recovered lines are completed by a follow-up request."""
+        service = self.make(kept=1, min_lines=6)
+        result = await service.generate_script(1)
+        self.assertEqual(len(service.backend.prompts), 2)
+        self.assertIn("cut off after line 2", service.backend.prompts[1])
+        self.assertIn("아침 교실.", service.backend.prompts[1])
+        self.assertEqual(result["scene_background"].value, "Park")
+        self.assertEqual(len(result["scripts"]), 4)
+
+
+class TestBestOfN(unittest.IsolatedAsyncioTestCase):
+    """Test cases for concurrent candidate generation."""
+
+    async def test_candidates_run_concurrently(self):
+        """N candidates cost one chapter's latency and save one chapter."""
+        with tempfile.TemporaryDirectory() as tmp:
+            service = make_service(tmp, delay=0.2)
+            service.candidates = CandidateSelector(candidates=3, checks=["roles", "lines"], min_lines=1)
+            try:
+                start = time.perf_counter()
+                result = await service.generate_script(1)
+                elapsed = time.perf_counter() - start
+                chapters = service.db_manager.get_database_stats()["total_chapters"]
+            finally:
+                service.io_executor.shutdown(wait=True)
+
+        self.assertEqual(len(service.backend.prompts), 3)
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(chapters, 1)
+        self.assertEqual(result["scripts"][1]["role"], "강지훈")
+
+
+class TestOpeningPool(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the warm pool of opening chapters."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.service = make_service(self.tmp.name)
+        self.pool = self.service.opening_pool
+        self.pool.size = 2
+        self.backend = self.service.backend
+
+    async def asyncTearDown(self):
+        await self.service.stop_background_tasks()
+        self.service.io_executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    async def test_new_game_pops_pooled_chapter(self):
+        """index=1 is served from the pool without an LLM call."""
+        await self.pool.fill_once()
+        calls = len(self.backend.prompts)
+
+        result = await self.service.generate_script(1)
+
+        self.assertEqual(len(self.backend.prompts), calls)
+        self.assertEqual(result["scripts"][1]["role"], "강지훈")
+        self.assertEqual(self.pool.stats["hits"], 1)
+        self.assertEqual(len(self.service.db_manager.get_all_chapters(result["story_id"])), 1)
+
+    async def test_pop_triggers_refill(self):
+        """The background filler tops the pool up after a pop."""
+        await self.service.start_background_tasks()
+        for _ in range(50):
+            if self.pool.stats["generated"] >= 2:
+                break
+            await asyncio.sleep(0.01)
+        await self.service.generate_script(1)
+        for _ in range(50):
+            if self.pool.stats["generated"] >= 3:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.pool.stats["generated"], 3)
+
+    async def test_prompt_change_invalidates_pool(self):
+        """Chapters generated from an older prompt are purged and not served."""
+        await self.pool.fill_once()
+        original = self.service.read_base_world_prompt
+        self.service.read_base_world_prompt = lambda: original() + "\n추가 설정"
+
+        self.assertIsNone(await self.pool.pop())
+        await self.pool.fill_once()
+        self.assertEqual(self.pool.stats["purged"], 2)
+
+
+class TestResponseCache(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the opt-in LLM response cache."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.service = make_service(self.tmp.name)
+        self.cache = self.service.response_cache
+        self.cache.enabled = True
+        self.backend = self.service.backend
+
+    async def asyncTearDown(self):
+        self.service.io_executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    async def test_repeated_prompt_is_served_from_cache(self):
+        """The same prompt reaches the backend once."""
+        first = await self.service.generate_script(1)
+        second = await self.service.generate_script(1)
+
+        self.assertEqual(len(self.backend.prompts), 1)
+        self.assertEqual(second["scripts"], first["scripts"])
+        self.assertNotEqual(second["story_id"], first["story_id"])
+        self.assertEqual((self.cache.stats["hits"], self.cache.stats["misses"]), (1, 1))
+
+    async def test_stream_uses_cache(self):
+        """A streamed chapter is stored and replayed from the cache."""
+        [event async for event in self.service.stream_script(1)]
+        events = [event async for event in self.service.stream_script(1)]
+
+        self.assertEqual(len(self.backend.prompts), 1)
+        self.assertEqual([name for name, _ in events], ["story_id", "scene_background", "script", "script", "chapter"])
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    async def test_backend_settings_are_part_of_the_key(self):
+        """A different model or configuration never reuses a response."""
+        await self.service.generate_script(1)
+        self.backend.cache_identity = lambda: {"backend": "recording", "temperature": 0.5}
+        await self.service.generate_script(1)
+        self.assertEqual(len(self.backend.prompts), 2)
+
+    async def test_disabled_by_default(self):
+        """Without opting in, every request reaches the backend."""
+        self.cache.enabled = False
+        await self.service.generate_script(1)
+        await self.service.generate_script(1)
+        self.assertEqual(len(self.backend.prompts), 2)
+        self.assertEqual(self.service.db_manager.get_response_cache_stats()["entries"], 0)
+
+    async def test_opening_pool_bypasses_cache(self):
+        """Pooled openings are all generated, not copies of one cached response."""
+        self.service.opening_pool.size = 2
+        await self.service.opening_pool.fill_once()
+        self.assertEqual(len(self.backend.prompts), 2)
+        self.assertEqual(self.cache.stats["hits"], 0)
+
+
+class TestStreamingGeneration(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the streamed generation path."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.service = make_service(self.tmp.name)
+
+    async def asyncTearDown(self):
+        self.service.io_executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    async def test_stream_events_in_order(self):
+        """Background comes first, then normalized lines, then the saved chapter."""
+        events = [event async for event in self.service.stream_script(1)]
+        kinds = [kind for kind, _ in events]
+        self.assertEqual(kinds, ["story_id", "scene_background", "script", "script", "chapter"])
+        self.assertEqual(events[1][1], "Classroom_Day")
+        self.assertEqual(events[3][1]["role"], "강지훈")
+        self.assertEqual(events[4][1]["scripts"][1]["emotion"], "happy")
+        self.assertEqual(events[4][1]["story_id"], events[0][1])
+        stats = self.service.db_manager.get_database_stats()
+        self.assertEqual(stats["total_chapters"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
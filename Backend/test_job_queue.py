@@ -0,0 +1,236 @@
+"""
+Unit Tests for the persistent generation job queue
+
+Run with: python -m pytest test_job_queue.py -v
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from database_manager import DatabaseManager
+from job_queue import JobQueue, QueueFullError, UnknownStoryError
+from fixtures import SAMPLE_CHAPTER, factory, make_service
+
+make_job_queue = factory(JobQueue, workers=1, max_depth=4)
+
+
+class GatedGenerator:
+    """Generation stand-in that records the order of calls and waits for a gate."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.calls = []
+
+    async def __call__(self, index, story_id, new_story=False):
+        self.calls.append((story_id, index))
+        await self.gate.wait()
+        if index == 13:
+            raise RuntimeError("unlucky chapter")
+        return dict(SAMPLE_CHAPTER, story_id=story_id)
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+    """Test cases for JobQueue."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "scripts.db"))
+        self.generate = GatedGenerator()
+        self.queues = []
+
+    async def asyncTearDown(self):
+        for queue in self.queues:
+            await queue.stop()
+        self.db.close()
+        self.tmp.cleanup()
+
+    async def run_blocking(self, func, *args):
+        return func(*args)
+
+    def make_queue(self, **kwargs) -> JobQueue:
+        queue = make_job_queue(self.db, self.generate, self.run_blocking, **kwargs)
+        self.queues.append(queue)
+        return queue
+
+    async def wait_finished(self, queue: JobQueue, job_id: int) -> dict:
+        for _ in range(200):
+            job = await queue.get(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            await asyncio.sleep(0.01)
+        self.fail(f"job {job_id} did not finish")
+
+    async def test_job_runs_and_result_is_kept(self):
+        """A new game creates its story at once; the chapter is available afterwards."""
+        queue = self.make_queue()
+        await queue.start()
+        job = await queue.submit(1)
+        self.assertIsNotNone(job["story_id"])
+        self.assertEqual(job["status"], "queued")
+
+        self.generate.gate.set()
+        finished = await self.wait_finished(queue, job["id"])
+        self.assertEqual(finished["result"]["scripts"][0]["script"], "아침 교실.")
+        self.assertEqual(finished["result"]["story_id"], job["story_id"])
+        self.assertEqual(self.db.get_job(job["id"])["status"], "done")
+
+    async def test_interactive_jobs_run_first(self):
+        """Waiting jobs run by priority class, oldest first within a class."""
+        queue = self.make_queue()
+        await queue.start()
+        story = self.db.create_story()
+        await queue.submit(1, story)
+        await asyncio.sleep(0.01)  # the worker is now busy with the blocker
+        batch = await queue.submit(2, story, "batch")
+        speculative = await queue.submit(3, story, "speculative")
+        interactive = await queue.submit(4, story)
+
+        self.assertEqual((await queue.get(interactive["id"]))["position"], 1)
+        self.generate.gate.set()
+        await self.wait_finished(queue, batch["id"])
+        self.assertEqual([index for _, index in self.generate.calls], [1, 4, 3, 2])
+        self.assertEqual(speculative["priority"], "speculative")
+
+    async def test_depth_limits(self):
+        """Lower classes are refused at half the depth; the error carries Retry-After."""
+        queue = self.make_queue(max_depth=2)  # not started: every job stays queued
+        story = self.db.create_story()
+        await queue.submit(2, story, "batch")
+        with self.assertRaises(QueueFullError) as refused:
+            await queue.submit(3, story, "batch")
+        self.assertGreaterEqual(refused.exception.retry_after, 1)
+        await queue.submit(4, story)
+        await queue.submit(5, story)
+        with self.assertRaises(QueueFullError):
+            await queue.submit(6, story)
+        self.assertEqual(queue.stats["rejected"], 2)
+
+    async def test_duplicate_submission_returns_existing_job(self):
+        """Submitting a chapter that is already queued does not add a job."""
+        queue = self.make_queue()
+        story = self.db.create_story()
+        first = await queue.submit(2, story)
+        second = await queue.submit(2, story)
+        self.assertEqual(first["id"], second["id"])
+        self.assertEqual(queue.depth(), 1)
+
+    async def test_concurrent_duplicate_submissions(self):
+        """Simultaneous submissions of one chapter create a single job."""
+        queue = self.make_queue()
+        story = self.db.create_story()
+        first, second = await asyncio.gather(queue.submit(2, story), queue.submit(2, story))
+        self.assertEqual(first["id"], second["id"])
+        self.assertEqual(queue.depth(), 1)
+        self.assertEqual(queue.stats["deduplicated"], 1)
+
+    async def test_database_error_does_not_stop_the_worker(self):
+        """A job whose status update fails is marked failed and the next job still runs."""
+        queue = self.make_queue()
+        story = self.db.create_story()
+        broken = await queue.submit(2, story)
+        following = await queue.submit(3, story)
+        update_job = self.db.update_job
+        failures = []
+
+        def flaky_update_job(job_id, status, *args):
+            if job_id == broken["id"] and not failures:
+                failures.append(status)
+                raise RuntimeError("database is locked")
+            return update_job(job_id, status, *args)
+
+        self.db.update_job = flaky_update_job
+        self.generate.gate.set()
+        await queue.start()
+
+        self.assertEqual((await self.wait_finished(queue, following["id"]))["status"], "done")
+        failed = await queue.get(broken["id"])
+        self.assertEqual((failed["status"], failed["error"]), ("failed", "database is locked"))
+        self.assertEqual(self.db.get_job(broken["id"])["status"], "failed")
+
+    async def test_invalid_submissions(self):
+        """Unknown priorities and missing stories are refused."""
+        queue = self.make_queue()
+        with self.assertRaises(ValueError):
+            await queue.submit(1, priority="urgent")
+        with self.assertRaises(UnknownStoryError):
+            await queue.submit(2, 999)
+
+    async def test_unfinished_jobs_survive_restart(self):
+        """Jobs queued or running when the server stopped run after the next start."""
+        queue = self.make_queue()
+        await queue.start()
+        story = self.db.create_story()
+        running = await queue.submit(2, story)
+        queued = await queue.submit(3, story)
+        await asyncio.sleep(0.01)
+        await queue.stop()
+        self.assertEqual(self.db.get_job(running["id"])["status"], "running")
+
+        restarted = self.make_queue()
+        await restarted.start()
+        self.generate.gate.set()
+        self.assertEqual((await self.wait_finished(restarted, queued["id"]))["status"], "done")
+        self.assertEqual((await restarted.get(running["id"]))["status"], "done")
+        self.assertEqual(restarted.stats["recovered"], 2)
+
+    async def test_failure_and_updates(self):
+        """Subscribers see every status change; failures keep their error."""
+        queue = self.make_queue()
+        story = self.db.create_story()
+        job = await queue.submit(13, story)
+        updates = queue.subscribe(job["id"])
+        await queue.start()
+        self.generate.gate.set()
+
+        statuses = [(await updates.get())["status"] for _ in range(2)]
+        self.assertEqual(statuses, ["running", "failed"])
+        self.assertEqual((await queue.get(job["id"]))["error"], "unlucky chapter")
+        queue.unsubscribe(job["id"], updates)
+        self.assertEqual(queue.subscribers, {})
+
+
+class TestNewGameJobs(unittest.IsolatedAsyncioTestCase):
+    """Test cases for index-1 jobs run through the real generation service."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.service = make_service(self.tmp.name)
+        self.db = self.service.db_manager
+
+    async def asyncTearDown(self):
+        await self.queue.stop()
+        self.service.io_executor.shutdown(wait=True)
+        self.db.close()
+        self.tmp.cleanup()
+
+    def make_queue(self) -> JobQueue:
+        self.queue = make_job_queue(self.db, self.service.generate_script, self.service.run_blocking)
+        return self.queue
+
+    async def test_recovered_new_game_job_keeps_later_chapters(self):
+        """Re-running an interrupted index-1 job does not restart the story it created."""
+        interrupted = await self.make_queue().submit(1)  # never started: left queued
+        story = interrupted["story_id"]
+        self.db.save_chapter(SAMPLE_CHAPTER, story, chapter_index=1)
+        later = dict(SAMPLE_CHAPTER, scene_background="Park")
+        self.db.save_chapter(later, story, chapter_index=2)
+
+        restarted = self.make_queue()
+        await restarted.start()
+        for _ in range(200):
+            job = await restarted.get(interrupted["id"])
+            if job["status"] in ("done", "failed"):
+                break
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"]["story_id"], story)
+        self.assertEqual([chapter["scene_background"] for chapter in self.db.get_all_chapters(story)],
+                         ["Classroom_Day", "Park"])
+        self.assertEqual(self.service.backend.prompts, [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,59 @@
+"""
+Unit Tests for the offline fake LLM backend
+
+Run with: python -m pytest test_llm_backend.py -v
+"""
+
+import json
+import unittest
+
+from llm_backend import FakeBackend, FakeBackendError, create_backend
+from story_models import Chapter
+from fixtures import factory
+
+make_backend = factory(FakeBackend, latency_ms=0, latency_dist="fixed", seed=7)
+
+
+class TestFakeBackend(unittest.IsolatedAsyncioTestCase):
+    """Test cases for FakeBackend output, determinism and failure injection."""
+
+    async def test_chapter_matches_schema(self):
+        """Generated text validates against the Chapter schema."""
+        result = await make_backend(lines=5).generate_chapter("prompt")
+        chapter = Chapter.model_validate_json(result.text)
+        self.assertEqual(len(chapter.scripts), 5)
+        self.assertEqual(result.parsed, chapter)
+        self.assertGreater(result.output_tokens, 0)
+
+    async def test_same_seed_same_output(self):
+        """Two backends with the same seed produce the same chapters."""
+        first = (await make_backend().generate_chapter("p")).text
+        second = (await make_backend().generate_chapter("p")).text
+        other = (await make_backend(seed=8).generate_chapter("p")).text
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    async def test_stream_joins_to_valid_chapter(self):
+        """Streamed chunks concatenate to one valid chapter document."""
+        chunks = [chunk async for chunk in make_backend().stream_chapter("prompt")]
+        self.assertGreater(len(chunks), 1)
+        Chapter.model_validate(json.loads("".join(chunks)))
+
+    async def test_failure_injection(self):
+        """failure_rate=1 makes every request fail."""
+        backend = make_backend(failure_rate=1.0)
+        with self.assertRaises(FakeBackendError):
+            await backend.generate_chapter("prompt")
+        with self.assertRaises(FakeBackendError):
+            async for _ in backend.stream_chapter("prompt"):
+                pass
+
+    def test_create_backend_by_name(self):
+        """The fake backend can be selected by name; unknown names are rejected."""
+        self.assertIsInstance(create_backend("fake"), FakeBackend)
+        with self.assertRaises(ValueError):
+            create_backend("nope")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Unit Tests for the background structured logger
+
+Run with: python -m pytest test_logmaker.py -v
+"""
+
+import contextvars
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from tool.logmaker import LogWriter, request_id_var
+
+
+class TestLogWriter(unittest.TestCase):
+    """Records are appended as JSON lines off the calling thread."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_lines(self, path):
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_appends_json_lines(self):
+        writer = LogWriter(log_dir=self.log_dir, max_bytes=0, backups=0, ring_size=0)
+        writer.submit('test', '첫 번째', {})
+        writer.submit('test', 'second', {'chapter_id': 7})
+        writer.flush(timeout=5)
+
+        records = self.read_lines(os.path.join(self.log_dir, 'test.log'))
+        self.assertEqual([r['message'] for r in records], ['첫 번째', 'second'])
+        self.assertEqual(records[1]['chapter_id'], 7)
+        self.assertIn('ts', records[0])
+
+    def test_records_request_id_of_caller_context(self):
+        writer = LogWriter(log_dir=self.log_dir, max_bytes=0, backups=0, ring_size=0)
+
+        def handle_request():
+            request_id_var.set('req-1')
+            writer.submit('test', 'inside', {})
+
+        contextvars.copy_context().run(handle_request)
+        writer.submit('test', 'outside', {})
+        writer.flush(timeout=5)
+
+        records = self.read_lines(os.path.join(self.log_dir, 'test.log'))
+        self.assertEqual(records[0]['request_id'], 'req-1')
+        self.assertIsNone(records[1]['request_id'])
+
+    def test_rotates_and_compresses(self):
+        writer = LogWriter(log_dir=self.log_dir, max_bytes=200, backups=2, ring_size=0)
+        for i in range(12):
+            writer.submit('test', f"message {i} " + "x" * 100, {})
+            writer.flush(timeout=5)
+
+        path = os.path.join(self.log_dir, 'test.log')
+        self.assertTrue(os.path.exists(path + '.1.gz'))
+        self.assertTrue(os.path.exists(path + '.2.gz'))
+        self.assertFalse(os.path.exists(path + '.3.gz'))
+        with gzip.open(path + '.1.gz', 'rt', encoding='utf-8') as f:
+            rotated = [json.loads(line) for line in f]
+        self.assertTrue(rotated)
+        self.assertTrue(rotated[0]['message'].startswith('message'))
+
+    def test_ring_buffer_keeps_last_records(self):
+        writer = LogWriter(log_dir=self.log_dir, max_bytes=0, backups=0, ring_size=3)
+        for i in range(5):
+            writer.submit('chat_context', f"prompt {i}", {})
+        writer.flush(timeout=5)
+
+        self.assertEqual([r['message'] for r in writer.recent('chat_context')], ['prompt 2', 'prompt 3', 'prompt 4'])
+        self.assertEqual(writer.recent('response_text'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Unit Tests for the in-process metrics registry
+
+Run with: python -m pytest test_metrics.py -v
+"""
+
+import unittest
+from tool.metrics import MetricsRegistry, index_bucket
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Metrics render in the Prometheus text exposition format."""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge(self):
+        counter = self.registry.counter("jobs_total", "Jobs run", ["kind"])
+        gauge = self.registry.gauge("jobs_running", "Jobs running")
+        counter.inc(kind="a")
+        counter.inc(2, kind="a")
+        with gauge.track():
+            self.assertEqual(gauge.get(), 1)
+
+        text = self.registry.render()
+        self.assertIn("# TYPE jobs_total counter", text)
+        self.assertIn('jobs_total{kind="a"} 3', text)
+        self.assertIn("jobs_running 0", text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, stage="llm")
+
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{stage="llm",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{stage="llm",le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{stage="llm",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_sum{stage="llm"} 5.55', text)
+        self.assertIn('latency_seconds_count{stage="llm"} 3', text)
+
+    def test_label_values_are_escaped(self):
+        counter = self.registry.counter("errors_total", "Errors", ["message"])
+        counter.inc(message='say "hi"\n')
+        self.assertIn('errors_total{message="say \\"hi\\"\\n"} 1', self.registry.render())
+
+    def test_wrong_labels_raise(self):
+        counter = self.registry.counter("jobs_total", "Jobs run", ["kind"])
+        with self.assertRaises(ValueError):
+            counter.inc(other="x")
+        with self.assertRaises(ValueError):
+            self.registry.counter("jobs_total", "Duplicate")
+
+    def test_index_bucket(self):
+        self.assertEqual([index_bucket(i) for i in (1, 3, 10, 11, 60, 500)],
+                         ["1", "2-5", "6-10", "11-20", "51-100", "101+"])
+
+
+if __name__ == '__main__':
+    unittest.main()
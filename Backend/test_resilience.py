@@ -0,0 +1,151 @@
+"""
+Unit Tests for deadlines, retries and hedging around LLM requests
+
+Run with: python -m pytest test_resilience.py -v
+"""
+
+import asyncio
+import tempfile
+import unittest
+
+from google.genai import errors
+
+from generate_script import Chapter
+from llm_backend import GeminiBackend, LLMBackend, LLMResult, FakeBackendError, UnparsableResponseError
+from resilience import ResilientCaller
+from tool.metrics import LLM_ATTEMPTS
+from fixtures import SAMPLE_CHAPTER, ScriptedCalls, factory, make_service
+
+
+make_caller = factory(
+    ResilientCaller, is_retryable=LLMBackend().is_retryable,
+    attempts=3, attempt_timeout=1, backoff=0.001, backoff_max=0.001, hedge=False
+)
+
+
+class TestRetries(unittest.IsolatedAsyncioTestCase):
+    """Test cases for per-attempt deadlines and retries."""
+
+    async def test_transient_error_is_retried(self):
+        """A retryable failure is followed by another attempt."""
+        request = ScriptedCalls((0, ConnectionError("reset")), (0, "chapter"))
+        caller = make_caller()
+        self.assertEqual(await caller.call(request), "chapter")
+        self.assertEqual(request.calls, 2)
+        self.assertEqual(caller.stats["retries"], 1)
+
+    async def test_permanent_error_is_not_retried(self):
+        """Errors the backend does not classify as transient fail at once."""
+        request = ScriptedCalls((0, KeyError("bug")))
+        with self.assertRaises(KeyError):
+            await make_caller().call(request)
+        self.assertEqual(request.calls, 1)
+
+    async def test_unparsable_response_is_retried(self):
+        """A response that does not match the schema counts as transient."""
+        request = ScriptedCalls((0, UnparsableResponseError("truncated")), (0, "chapter"))
+        before = LLM_ATTEMPTS.get(kind="primary", outcome="unparsable")
+        self.assertEqual(await make_caller().call(request), "chapter")
+        self.assertEqual(LLM_ATTEMPTS.get(kind="primary", outcome="unparsable"), before + 1)
+
+    async def test_attempt_deadline(self):
+        """Attempts over the deadline are abandoned; the last error is raised."""
+        request = ScriptedCalls((1, "too late"))
+        before = LLM_ATTEMPTS.get(kind="primary", outcome="timeout")
+        with self.assertRaises(asyncio.TimeoutError):
+            await make_caller(attempts=2, attempt_timeout=0.02).call(request)
+        self.assertEqual(request.calls, 2)
+        self.assertEqual(LLM_ATTEMPTS.get(kind="primary", outcome="timeout"), before + 2)
+
+    async def test_cancellation_is_not_retried(self):
+        """Cancelling the caller cancels the request instead of retrying it."""
+        request = ScriptedCalls((1, "chapter"))
+        task = asyncio.create_task(make_caller().call(request))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(request.calls, 1)
+
+
+class TestHedging(unittest.IsolatedAsyncioTestCase):
+    """Test cases for hedged requests."""
+
+    def make_calibrated(self) -> ResilientCaller:
+        caller = make_caller(hedge=True, hedge_quantile=0.9)
+        caller.latencies.extend([0.01] * ResilientCaller.HEDGE_MIN_SAMPLES)
+        return caller
+
+    async def test_no_hedge_until_calibrated(self):
+        """Without enough observed latencies no hedge is sent."""
+        caller = make_caller(hedge=True)
+        self.assertIsNone(caller.hedge_delay())
+        self.assertEqual(self.make_calibrated().hedge_delay(), 0.01)
+
+    async def test_slow_attempt_is_hedged(self):
+        """A second request past the threshold wins and the first is cancelled."""
+        request = ScriptedCalls((0.5, "slow"), (0, "fast"))
+        caller = self.make_calibrated()
+        before = LLM_ATTEMPTS.get(kind="primary", outcome="cancelled")
+
+        started = asyncio.get_running_loop().time()
+        self.assertEqual(await caller.call(request), "fast")
+        self.assertLess(asyncio.get_running_loop().time() - started, 0.3)
+        self.assertEqual(caller.stats, {"retries": 0, "hedges": 1, "hedge_wins": 1})
+        await asyncio.sleep(0.01)  # Let the cancelled primary unwind
+        self.assertEqual(LLM_ATTEMPTS.get(kind="primary", outcome="cancelled"), before + 1)
+
+    async def test_failed_hedge_waits_for_primary(self):
+        """If the hedge fails, the still-running primary can succeed."""
+        request = ScriptedCalls((0.05, "primary"), (0, FakeBackendError("boom")))
+        caller = self.make_calibrated()
+        self.assertEqual(await caller.call(request), "primary")
+        self.assertEqual(request.calls, 2)
+        self.assertEqual(caller.stats["hedge_wins"], 0)
+
+
+class TestRetryClassification(unittest.TestCase):
+    """Test cases for backend error classification."""
+
+    def test_gemini_errors(self):
+        """Rate limits and server errors are retried; other client errors are not."""
+        backend = GeminiBackend(api_key="test")
+        self.assertTrue(backend.is_retryable(errors.APIError(429, {})))
+        self.assertTrue(backend.is_retryable(errors.APIError(503, {})))
+        self.assertFalse(backend.is_retryable(errors.APIError(400, {})))
+        self.assertTrue(backend.is_retryable(asyncio.TimeoutError()))
+        self.assertFalse(backend.is_retryable(asyncio.CancelledError()))
+
+
+class UnparsableOnceBackend(LLMBackend):
+    """Backend whose first response does not parse."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_chapter(self, prompt):
+        self.calls += 1
+        if self.calls == 1:
+            return LLMResult(text='{"scene_background": "Classroom_Day", "scr', parsed=None)
+        chapter = Chapter.model_validate(SAMPLE_CHAPTER)
+        return LLMResult(text=chapter.model_dump_json(), parsed=chapter)
+
+
+class TestServiceRetries(unittest.IsolatedAsyncioTestCase):
+    """Test cases for retries inside GenerateScript."""
+
+    async def test_unparsable_chapter_is_requested_again(self):
+        """A truncated response triggers a new request instead of a failed chapter."""
+        with tempfile.TemporaryDirectory() as tmp:
+            service = make_service(tmp, backend=UnparsableOnceBackend())
+            service.resilience.backoff = service.resilience.backoff_max = 0.001
+            try:
+                result = await service.generate_script(1)
+            finally:
+                service.io_executor.shutdown(wait=True)
+        self.assertEqual(service.backend.calls, 2)
+        self.assertEqual(result["scripts"][0]["script"], "아침 교실.")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
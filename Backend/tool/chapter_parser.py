@@ -0,0 +1,172 @@
+"""
+Incremental Chapter JSON Parser
+
+This module parses the JSON produced for the ``Chapter`` schema while it is
+still being streamed, so callers can react to each part as soon as it is
+complete instead of waiting for the whole document.
+
+Key Features:
+- Emits ``scene_background`` as soon as its string value is closed
+- Emits each ``scripts`` entry as soon as its object is closed
+- Works on arbitrary chunk boundaries (inside strings, escapes, keys)
+- Keeps the full text so the finished document can still be validated
+- Tolerates common model slips inside values (raw newlines in strings,
+  trailing commas), so ``salvage_chapter`` can recover the complete parts of
+  a truncated or slightly malformed response
+
+Usage:
+    from tool.chapter_parser import ChapterStreamParser
+
+    parser = ChapterStreamParser()
+    for chunk in chunks:
+        for event, value in parser.feed(chunk):
+            if event == "scene_background":
+                ...
+            elif event == "script":
+                ...
+
+    scene_background, scripts = salvage_chapter(broken_text)
+"""
+
+import json
+import re
+
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def loads_lenient(fragment: str):
+    """Decode one JSON value, forgiving raw control characters and trailing commas.
+
+    Raises:
+        json.JSONDecodeError: if the fragment is still invalid after the repairs
+    """
+    try:
+        return json.loads(fragment, strict=False)
+    except json.JSONDecodeError:
+        repaired = TRAILING_COMMA.sub(r"\1", fragment)
+        if repaired == fragment:
+            raise
+        return json.loads(repaired, strict=False)
+
+
+def salvage_chapter(text: str) -> tuple:
+    """Recover what is complete in a truncated or malformed ``Chapter`` document.
+
+    Returns:
+        tuple: ``(scene_background, scripts)``; the raw background string (or
+        None) and every script object that was closed, in order
+    """
+    parser = ChapterStreamParser()
+    parser.feed(text)
+    return parser.scene_background, parser.scripts
+
+
+class ChapterStreamParser:
+    """
+    Character-level scanner for streamed ``Chapter`` JSON.
+
+    ``feed`` returns a list of ``(event, value)`` tuples, where event is
+    ``"scene_background"`` (value is the raw string) or ``"script"`` (value is
+    the decoded dictionary). Nothing is validated here; callers check the values
+    against their pydantic models.
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.text_length = 0
+        self.stack = []            # open containers: '{' or '['
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.expect_key = False    # inside the top-level object, next string is a key
+        self.current_key = None    # last key seen in the top-level object
+        self.object_start = None   # start offset of the script object being scanned
+        self.scene_background = None
+        self.scripts = []
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        if len(self.buffer) > 1:
+            self.buffer = ["".join(self.buffer)]
+        return self.buffer[0] if self.buffer else ""
+
+    def feed(self, chunk: str) -> list:
+        """Consume a chunk of text and return the events it completed."""
+        events = []
+        if not chunk:
+            return events
+
+        base = self.text_length
+        self.buffer.append(chunk)
+        self.text_length += len(chunk)
+        text = None  # joined lazily, only when a token needs slicing
+
+        for offset, char in enumerate(chunk):
+            position = base + offset
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1:
+                        if text is None:
+                            text = self.text
+                        try:
+                            value = loads_lenient(text[self.string_start:position + 1])
+                        except json.JSONDecodeError:
+                            value = None
+                        event = self._top_level_string(value)
+                        if event:
+                            events.append(event)
+                continue
+
+            if char == '"':
+                self.in_string = True
+                self.string_start = position
+            elif char == "{":
+                if self._in_scripts_array():
+                    self.object_start = position
+                self.stack.append("{")
+                if len(self.stack) == 1:
+                    self.expect_key = True
+            elif char == "[":
+                self.stack.append("[")
+            elif char in "}]":
+                if self.stack:
+                    self.stack.pop()
+                if char == "}" and self.object_start is not None and self._in_scripts_array():
+                    if text is None:
+                        text = self.text
+                    try:
+                        script = loads_lenient(text[self.object_start:position + 1])
+                    except json.JSONDecodeError:
+                        script = None
+                    self.object_start = None
+                    if isinstance(script, dict):
+                        self.scripts.append(script)
+                        events.append(("script", script))
+            elif len(self.stack) == 1:
+                if char == ":":
+                    self.expect_key = False
+                elif char == ",":
+                    self.expect_key = True
+
+        return events
+
+    def _in_scripts_array(self) -> bool:
+        """True when the scanner sits directly inside the top-level ``scripts`` array."""
+        return self.stack == ["{", "["] and self.current_key == "scripts"
+
+    def _top_level_string(self, value: str):
+        """Handle a completed string token that belongs to the top-level object."""
+        if self.expect_key:
+            self.current_key = value
+            return None
+        if self.current_key == "scene_background" and self.scene_background is None:
+            self.scene_background = value
+            return ("scene_background", value)
+        return None
@@ -8,16 +8,40 @@ Key Features:
 - Comprehensive character mapping for all characters in base_world.prompt
 - Case-insensitive matching
 - Korean language support
+- Partial matches through a precompiled Aho–Corasick automaton with
+  deterministic priority (longest variation wins, then the earliest one)
+- Fuzzy fallback for unseen romanizations ("Kim Taeseong", "Yun Seo-a")
+  through a character-bigram index and bit-parallel edit distance
+- LRU cache for repeated raw names and a ``normalize_many`` batch API
 - Safe fallback: preserves original names if no mapping found
 - Zero data loss architecture
 
 Usage:
-    from tool.character_normalizer import normalize_character_name
+    from tool.character_normalizer import normalize_character_name, normalize_many
     
     standardized_name = normalize_character_name("Princess Seraphina")
     # Returns: "Seraphina"
+    roles = normalize_many(["지훈", "Yoon Seo-ah"])
+    # Returns: ["강지훈", "윤서아"]
 """
 
+import os
+import unicodedata
+from bisect import bisect_right
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+# Minimum similarity (1 - edit distance / length) for a fuzzy match; 1 disables it
+FUZZY_THRESHOLD = float(os.getenv("AGVN_FUZZY_NAME_THRESHOLD", "0.8"))
+# Shorter keys are too ambiguous to match fuzzily
+FUZZY_MIN_LENGTH = 4
+# Romanization variants differ by a few letters; larger distances only cost time
+FUZZY_MAX_DISTANCE = 2
+# Latin vowels and Hangul medial vowels (jamo after NFD); swapping one for
+# another makes a different name ("Minji" / "Minju"), not a different spelling
+VOWELS = frozenset("aeiou" + "".join(chr(code) for code in range(0x1161, 0x1176)))
+
 # --- Character Name Mappings ---
 
 # Comprehensive mapping dictionary for all characters
@@ -57,6 +81,273 @@ CHARACTER_MAPPINGS = {
 }
 
 
+def fuzzy_key(name: str) -> str:
+    """
+    Spelling-insensitive form of a name used for fuzzy matching.
+
+    Lowercases, splits Hangul syllables into jamo (so one wrong consonant is
+    one edit), drops spaces and punctuation, and folds common romanization
+    variants ("oo"/"eo" -> "u"): "Kim Tae-seong" and "kim taesung" share a key.
+    """
+    decomposed = unicodedata.normalize("NFD", name.lower())
+    key = "".join(char for char in decomposed if char.isalnum())
+    return key.replace("oo", "u").replace("eo", "u")
+
+
+def bigrams(key: str) -> Set[str]:
+    padded = f"^{key}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance (bit-parallel algorithm of Myers/Hyyrö)."""
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+    # Bit masks of the positions of each character in b
+    positions: Dict[str, int] = {}
+    for i, char in enumerate(b):
+        positions[char] = positions.get(char, 0) | (1 << i)
+    mask = (1 << len(b)) - 1
+    last = 1 << (len(b) - 1)
+    plus, minus, score = mask, 0, len(b)
+    for char in a:
+        eq = positions.get(char, 0)
+        xv = eq | minus
+        xh = (((eq & plus) + plus) ^ plus) | eq
+        horizontal_plus = minus | ~(xh | plus)
+        horizontal_minus = plus & xh
+        if horizontal_plus & last:
+            score += 1
+        elif horizontal_minus & last:
+            score -= 1
+        horizontal_plus = ((horizontal_plus << 1) | 1) & mask
+        horizontal_minus = (horizontal_minus << 1) & mask
+        plus = horizontal_minus | (~(xv | horizontal_plus) & mask)
+        minus = horizontal_plus & xv
+    return score
+
+
+def name_distance(a: str, b: str) -> int:
+    """
+    Edit distance between fuzzy keys in which replacing a vowel by another
+    vowel costs 2, as much as deleting one and inserting the other.
+
+    Never smaller than ``edit_distance``, so it only needs to be computed
+    for candidates that already passed that filter.
+    """
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            if char_a == char_b:
+                substitution = 0
+            elif char_a in VOWELS and char_b in VOWELS:
+                substitution = 2
+            else:
+                substitution = 1
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + substitution))
+        previous = current
+    return previous[-1]
+
+
+class CharacterNameMatcher:
+    """
+    Mapping lookups compiled once for fast, order-independent matching.
+
+    A name resolves in three steps:
+    1. Exact (case-insensitive) variation lookup.
+    2. Variations contained in the name, found in one pass with an
+       Aho–Corasick automaton. The longest variation wins; equal lengths go
+       to the one that starts first.
+    3. The name contained in variations (e.g. "hoon" in "kang ji-hoon").
+       Used only when every such variation belongs to the same character,
+       so an ambiguous fragment is left unchanged.
+    4. Fuzzy match of the whole name (see ``fuzzy_match``).
+
+    Results are cached per stripped, lowercased name.
+    """
+
+    def __init__(self, mappings: Dict[str, str], cache_size: int = 4096,
+                 fuzzy_threshold: float = FUZZY_THRESHOLD):
+        # Lowercased variations; on collisions the first mapping wins
+        self.mappings: Dict[str, str] = {}
+        for variation, standardized_name in mappings.items():
+            key = variation.lower().strip()
+            if key:
+                self.mappings.setdefault(key, standardized_name)
+        self.fuzzy_threshold = fuzzy_threshold
+        self.build_automaton()
+        self.build_variation_index()
+        self.build_fuzzy_index()
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def build_automaton(self):
+        """Trie of all variations plus failure links (Aho–Corasick)."""
+        self.goto: List[Dict[str, int]] = [{}]
+        # Longest variation that ends at each state (directly or via failure links)
+        self.output: List[Optional[str]] = [None]
+        for variation in self.mappings:
+            state = 0
+            for char in variation:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.output.append(None)
+                state = next_state
+            self.output[state] = variation
+
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            if self.output[state] is None:
+                self.output[state] = self.output[self.fail[state]]
+            for char, next_state in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                queue.append(next_state)
+
+    def build_variation_index(self):
+        """All variations in one string, so "name inside a variation" is a C-level find."""
+        self.variations = list(self.mappings)
+        self.starts = []
+        offset = 0
+        for variation in self.variations:
+            self.starts.append(offset)
+            offset += len(variation) + 1
+        self.joined = "\0".join(self.variations)
+
+    def longest_contained(self, name: str) -> Optional[str]:
+        """Longest variation occurring in ``name`` (earliest on ties)."""
+        best, best_start = None, 0
+        state = 0
+        for position, char in enumerate(name):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            match = self.output[state]
+            if match is not None:
+                start = position - len(match) + 1
+                if best is None or len(match) > len(best) or (len(match) == len(best) and start < best_start):
+                    best, best_start = match, start
+        return best
+
+    def containing_character(self, name: str) -> Optional[str]:
+        """The one character whose variations contain ``name``, if unambiguous."""
+        if "\0" in name:
+            return None
+        found = None
+        position = self.joined.find(name)
+        while position != -1:
+            index = bisect_right(self.starts, position) - 1
+            standardized_name = self.mappings[self.variations[index]]
+            if found is not None and standardized_name != found:
+                return None
+            found = standardized_name
+            # Continue after this variation
+            next_index = index + 1
+            if next_index == len(self.starts):
+                break
+            position = self.joined.find(name, self.starts[next_index])
+        return found
+
+    def build_fuzzy_index(self):
+        """Bigram postings over the fuzzy keys of all variations."""
+        characters: Dict[str, Set[str]] = defaultdict(set)
+        for variation, standardized_name in self.mappings.items():
+            key = fuzzy_key(variation)
+            if len(key) >= FUZZY_MIN_LENGTH:
+                characters[key].add(standardized_name)
+        self.fuzzy_keys = list(characters)
+        # A key shared by variations of different characters identifies no one
+        self.fuzzy_names = [next(iter(names)) if len(names) == 1 else None for names in characters.values()]
+        self.fuzzy_exact = dict(zip(self.fuzzy_keys, self.fuzzy_names))
+        self.fuzzy_grams = [bigrams(key) for key in self.fuzzy_keys]
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        for index, grams in enumerate(self.fuzzy_grams):
+            for gram in grams:
+                self.postings[gram].append(index)
+
+    def fuzzy_match(self, name: str) -> Optional[str]:
+        """
+        Character whose variation is closest to ``name`` in edit distance.
+
+        Candidates come from the bigram index: a key within k edits shares
+        all but 2k of the query's bigrams, so it contains at least one of
+        the 2k + 1 rarest ones. Candidates are filtered by length and shared
+        bigram count before the distance is computed. A match needs a
+        similarity of at least ``fuzzy_threshold`` under ``name_distance``
+        (a changed vowel counts twice) and must be unambiguous: a tie between
+        different characters is no match.
+        """
+        if self.fuzzy_threshold >= 1:
+            return None
+        key = fuzzy_key(name)
+        if len(key) < FUZZY_MIN_LENGTH:
+            return None
+        if key in self.fuzzy_exact:
+            return self.fuzzy_exact[key]
+
+        # Largest distance that can still reach the threshold against a longer key
+        max_distance = min(FUZZY_MAX_DISTANCE, int((1 - self.fuzzy_threshold) * len(key) / self.fuzzy_threshold))
+        if max_distance == 0:
+            return None
+        grams = bigrams(key)
+        needed = len(grams) - 2 * max_distance
+        rarest = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))[:2 * max_distance + 1]
+        candidates = set()
+        for gram in rarest:
+            candidates.update(self.postings.get(gram, ()))
+
+        best, best_distance = None, None
+        for index in candidates:
+            candidate = self.fuzzy_keys[index]
+            if abs(len(candidate) - len(key)) > max_distance or len(grams & self.fuzzy_grams[index]) < needed:
+                continue
+            distance = edit_distance(key, candidate)
+            if 1 - distance / max(len(key), len(candidate)) < self.fuzzy_threshold:
+                continue
+            distance = name_distance(key, candidate)
+            if 1 - distance / max(len(key), len(candidate)) < self.fuzzy_threshold:
+                continue
+            standardized_name = self.fuzzy_names[index]
+            if best_distance is None or distance < best_distance:
+                best, best_distance = standardized_name, distance
+            elif distance == best_distance and standardized_name != best:
+                best = None
+        return best
+
+    def _resolve(self, lowercase_name: str) -> Optional[str]:
+        standardized_name = self.mappings.get(lowercase_name)
+        if standardized_name is not None:
+            return standardized_name
+        match = self.longest_contained(lowercase_name)
+        if match is not None:
+            return self.mappings[match]
+        standardized_name = self.containing_character(lowercase_name)
+        if standardized_name is not None:
+            return standardized_name
+        return self.fuzzy_match(lowercase_name)
+
+    def normalize(self, character_name: str) -> str:
+        if not character_name or not isinstance(character_name, str):
+            return character_name
+        lowercase_name = character_name.lower().strip()
+        if not lowercase_name:
+            return character_name
+        standardized_name = self.resolve(lowercase_name)
+        return standardized_name if standardized_name is not None else character_name
+
+
+_matcher = CharacterNameMatcher(CHARACTER_MAPPINGS)
+
+
 def normalize_character_name(character_name: str) -> str:
     """
     Normalize character name to standardized form.
@@ -81,28 +372,21 @@ def normalize_character_name(character_name: str) -> str:
         >>> normalize_character_name("Unknown Character")
         'Unknown Character'
     """
-    if not character_name or not isinstance(character_name, str):
-        return character_name
-    
-    # Convert to lowercase for case-insensitive matching
-    lowercase_name = character_name.lower().strip()
-    
-    # If after stripping we have an empty string, return original
-    if not lowercase_name:
-        return character_name
-    
-    # Direct mapping lookup
-    if lowercase_name in CHARACTER_MAPPINGS:
-        return CHARACTER_MAPPINGS[lowercase_name]
-    
-    # Substring matching for partial matches
-    # This handles cases like "Princess Seraphina Elara" matching "seraphina"
-    for mapping_key, standardized_name in CHARACTER_MAPPINGS.items():
-        if mapping_key in lowercase_name or lowercase_name in mapping_key:
-            return standardized_name
+    return _matcher.normalize(character_name)
+
+
+def normalize_many(character_names: List[str]) -> List[str]:
+    """
+    Normalize a batch of character names (e.g. every role in a chapter).
     
-    # Fallback: return original name unchanged
-    return character_name
+    Args:
+        character_names (list): Original character names
+        
+    Returns:
+        list: Standardized names in the same order
+    """
+    normalize = _matcher.normalize
+    return [normalize(name) for name in character_names]
 
 
 def get_all_standardized_characters() -> list:
@@ -1,47 +1,192 @@
+"""
+Background Structured Logger
+
+This module replaces the old synchronous ``log(filename, message)`` helper,
+which rewrote a whole file on every call, with an append-only logger whose
+disk I/O happens on a background thread.
+
+Key Features:
+- ``log()`` only enqueues a record, so it is safe to call from the event loop
+- One JSON object per line: timestamp, request id, message and extra fields
+- Size-based rotation; rotated files are gzip-compressed
+- Optional in-memory ring buffer of the last N records per log file
+- Request ids travel with the caller's context (``contextvars``)
+
+Configuration (environment):
+    AGVN_LOG_DIR        directory for log files (default: logs)
+    AGVN_LOG_MAX_BYTES  rotate a file once it grows past this size (default: 10 MB)
+    AGVN_LOG_BACKUPS    rotated .gz files kept per log (default: 5)
+    AGVN_LOG_RING_SIZE  records kept in memory per log file (default: 0, disabled)
+
+Usage:
+    from tool.logmaker import log, request_id_var
+
+    request_id_var.set("3f2a...")
+    log('story_generation_workflow', 'Chapter saved', chapter_id=12)
+    # logs/story_generation_workflow.log gets:
+    # {"ts": "...", "request_id": "3f2a...", "message": "Chapter saved", "chapter_id": 12}
+"""
+
+import atexit
+import contextvars
+import gzip
+import json
 import os
+import queue
+import shutil
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Id of the request being handled, attached to every record logged in its context
+request_id_var: contextvars.ContextVar = contextvars.ContextVar('request_id', default=None)
+
+
+class LogWriter:
+    """Queue-backed writer that appends JSON lines on a daemon thread."""
+
+    def __init__(self, log_dir: str = None, max_bytes: int = None, backups: int = None,
+                 ring_size: int = None):
+        self.log_dir = log_dir or os.getenv("AGVN_LOG_DIR", "logs")
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("AGVN_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+        self.backups = backups if backups is not None else int(os.getenv("AGVN_LOG_BACKUPS", "5"))
+        self.ring_size = ring_size if ring_size is not None else int(os.getenv("AGVN_LOG_RING_SIZE", "0"))
+        self.queue: queue.Queue = queue.Queue()
+        self.rings: Dict[str, deque] = {}
+        self.rings_lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.start_lock = threading.Lock()
+
+    def submit(self, filename: str, message: str, fields: dict) -> None:
+        """Record a message without touching the disk."""
+        record = {
+            'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'request_id': request_id_var.get(),
+            'message': message,
+        }
+        record.update(fields)
+
+        if self.ring_size > 0:
+            with self.rings_lock:
+                ring = self.rings.get(filename)
+                if ring is None:
+                    ring = self.rings[filename] = deque(maxlen=self.ring_size)
+                ring.append(record)
+
+        if self.thread is None:
+            self.start()
+        self.queue.put((filename, record))
+
+    def recent(self, filename: str) -> List[dict]:
+        """The last ``ring_size`` records of a log file, oldest first."""
+        with self.rings_lock:
+            return list(self.rings.get(filename, ()))
+
+    def start(self) -> None:
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='logmaker', daemon=True)
+                self.thread.start()
+
+    def flush(self, timeout: float = None) -> None:
+        """Block until every record logged so far has been written."""
+        if self.thread is None:
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def run(self) -> None:
+        while True:
+            item = self.queue.get()
+            # Drain whatever else is queued so a burst costs one open per file
+            batch = [item]
+            try:
+                while len(batch) < 1000:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
 
-def log(filename: str, log_message: str):
+            lines: Dict[str, List[str]] = {}
+            flushed = []
+            for entry in batch:
+                if isinstance(entry, threading.Event):
+                    flushed.append(entry)
+                    continue
+                filename, record = entry
+                lines.setdefault(filename, []).append(json.dumps(record, ensure_ascii=False, default=str))
+
+            for filename, file_lines in lines.items():
+                try:
+                    self.write(filename, file_lines)
+                except Exception as e:
+                    print(f"An error occurred while writing log {filename}: {e}")
+
+            for event in flushed:
+                event.set()
+
+    def path_for(self, filename: str) -> str:
+        # Add '.log' extension like the original helper did
+        return os.path.join(self.log_dir, filename + '.log')
+
+    def write(self, filename: str, lines: List[str]) -> None:
+        os.makedirs(self.log_dir, exist_ok=True)
+        path = self.path_for(filename)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            size = f.tell()
+        if self.max_bytes > 0 and size >= self.max_bytes:
+            self.rotate(path)
+
+    def rotate(self, path: str) -> None:
+        """Shift path.1.gz .. path.N.gz and compress the current file into path.1.gz."""
+        if self.backups <= 0:
+            os.remove(path)
+            return
+        for number in range(self.backups - 1, 0, -1):
+            older = f"{path}.{number}.gz"
+            if os.path.exists(older):
+                os.replace(older, f"{path}.{number + 1}.gz")
+        rotated = f"{path}.rotating"
+        os.replace(path, rotated)
+        with open(rotated, 'rb') as source, gzip.open(f"{path}.1.gz", 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.remove(rotated)
+
+
+_writer = LogWriter()
+atexit.register(_writer.flush, 5)
+
+
+def log(filename: str, log_message: str, **fields):
     """
-    Save debug logs to specified file.
+    Append a structured record to the specified log file.
 
-    This function creates a folder named 'logs' (if it doesn't exist)
-    and saves log messages with the specified filename inside it.
-    If the file already exists, it overwrites the content.
+    The record is queued and written by a background thread as one JSON line
+    in ``logs/<filename>.log``, so calling this never blocks on disk I/O.
 
     Args:
-        filename (str): The name of the file to save the log to. (e.g., 'app.log')
-        log_message (str): The log string to save to the file.
+        filename (str): The name of the log, without extension (e.g., 'database_manager')
+        log_message (str): The message to record.
+        **fields: Extra JSON-serializable values stored with the record.
     """
-    # Name of the folder to save logs
-    log_dir = 'logs'
-
-    # Create 'logs' folder if it doesn't exist
-    os.makedirs(log_dir, exist_ok=True)
-
-    # Generate complete file path (handle path separators for the operating system)
-    file_path = os.path.join(log_dir, filename)
-    # Add '.log' extension if filename is empty or has no extension
-    file_path += '.log'
-
-    try:
-        # Open file in write mode ('w') to write log message.
-        # 'w' mode overwrites existing content if file exists.
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(log_message)
-        print(f"Log successfully saved to '{file_path}'.")
-    except IOError as e:
-        print(f"An error occurred while writing file: {e}")
+    _writer.submit(filename, log_message, fields)
 
-# --- Function usage examples ---
-if __name__ == "__main__":
-    # Save first log
-    error_log = "[ERROR] User authentication failed. User ID: 'user123'"
-    log('error.log', error_log)
 
-    # Save second log (different file)
-    info_log = "[INFO] Application started. Version: 1.0.2"
-    log('info.log', info_log)
+def recent_logs(filename: str) -> List[dict]:
+    """Records kept in memory for a log file (empty unless AGVN_LOG_RING_SIZE is set)."""
+    return _writer.recent(filename)
+
 
-    # Overwrite existing log file
-    updated_error_log = "[ERROR] Database connection timeout. (1 retry attempt)"
-    log('error.log', updated_error_log)
\ No newline at end of file
+def flush_logs(timeout: float = None) -> None:
+    """Wait until all queued records are on disk."""
+    _writer.flush(timeout)
+
+
+# --- Function usage examples ---
+if __name__ == "__main__":
+    log('error', "User authentication failed.", user_id='user123')
+    log('info', "Application started.", version='1.0.2')
+    flush_logs()
+    print(f"Logs written to '{_writer.log_dir}'.")
@@ -0,0 +1,254 @@
+"""
+In-Process Metrics
+
+A small, dependency-free metrics registry that renders the Prometheus text
+exposition format, served by the API at ``/api/metrics``.
+
+Key Features:
+- Counters, gauges and histograms with labels
+- Thread-safe: updated from the event loop and from executor threads alike
+- ``Histogram.time()`` / ``Gauge.track()`` context managers for instrumenting code
+- The application's metrics are defined once here and imported where they are updated
+
+Usage:
+    from tool.metrics import STAGE_SECONDS, render
+
+    with STAGE_SECONDS.time(stage='save_chapter'):
+        db_manager.save_chapter(chapter_data, story_id)
+    print(render())
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Latency buckets (seconds) covering a fast DB call up to a long LLM request
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000, 256000, 512000, 1000000)
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    """Base class: a named family of series keyed by label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self.lock:
+            return self.values.get(self.key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in progress"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [bucket counts..., sum, count]
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self.key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the enclosed block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self.lock:
+            series = self.series.get(self.key(labels))
+            return series[-1] if series else 0
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted((key, list(series)) for key, series in self.series.items())
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, series in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets, series):
+                cumulative += hits
+                lines.append(f"{self.name}_bucket{format_labels(names, key + (format_value(bound),))} {cumulative}")
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+def index_bucket(index: int) -> str:
+    """Group chapter indexes into a few label values so series stay bounded"""
+    if index is None or index <= 1:
+        return "1"
+    for upper, label in ((5, "2-5"), (10, "6-10"), (20, "11-20"), (50, "21-50"), (100, "51-100")):
+        if index <= upper:
+            return label
+    return "101+"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "agvn_stage_seconds", "Time spent in each stage of chapter generation", ["stage"])
+CHAPTER_SECONDS = REGISTRY.histogram(
+    "agvn_chapter_generation_seconds", "End-to-end chapter generation time by chapter index", ["chapter_index"])
+LLM_TOKENS = REGISTRY.histogram(
+    "agvn_llm_tokens", "Tokens per chapter request by kind (prompt/output) and chapter index",
+    ["kind", "chapter_index"], buckets=TOKEN_BUCKETS)
+LLM_TOKENS_TOTAL = REGISTRY.counter(
+    "agvn_llm_tokens_total", "Tokens used by chapter requests", ["kind"])
+GENERATIONS_IN_FLIGHT = REGISTRY.gauge(
+    "agvn_generations_in_flight", "Chapter generations currently running", ["mode"])
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "agvn_http_requests_in_flight", "HTTP requests currently being handled")
+LLM_ATTEMPTS = REGISTRY.counter(
+    "agvn_llm_attempts_total", "Chapter requests sent to the LLM backend by kind (primary/hedge) and outcome",
+    ["kind", "outcome"])
+LLM_SALVAGE = REGISTRY.counter(
+    "agvn_llm_salvage_total",
+    "Unparsable chapter responses by outcome (recovered/continued/short/failed)", ["result"])
+CANDIDATES = REGISTRY.counter(
+    "agvn_candidates_total", "Best-of-N chapter candidates by outcome (valid/invalid/error/cancelled)", ["outcome"])
+JOBS = REGISTRY.counter(
+    "agvn_jobs_total", "Generation jobs by final status (done/failed/rejected)", ["status"])
+JOB_QUEUE_DEPTH = REGISTRY.gauge(
+    "agvn_job_queue_depth", "Generation jobs waiting for a worker by priority class", ["priority"])
+LLM_CACHE_REQUESTS = REGISTRY.counter(
+    "agvn_llm_cache_requests_total", "Response cache lookups by result (hit/miss)", ["result"])
+COALESCED_REQUESTS = REGISTRY.counter(
+    "agvn_coalesced_requests_total", "Chapter requests answered by an identical request already in flight")
+DB_OPERATIONS = REGISTRY.counter(
+    "agvn_db_operations_total", "DatabaseManager operations by method", ["operation"])
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return REGISTRY.render()
@@ -1,45 +1,34 @@
-import React, { useState } from 'react';
+import React, { useState, useCallback } from 'react';
 import MainScreen from './components/MainScreen';
-import LoadingScreen from './components/LoadingScreen';
 import GameScreen from './components/GameScreen';
 import apiService from './services/apiService';
 import './App.css';
 
 function App() {
   const [gameStarted, setGameStarted] = useState(false);
-  const [isLoading, setIsLoading] = useState(false);
   const [apiKey, setApiKey] = useState('');
-  const [storyData, setStoryData] = useState(null);
   const [error, setError] = useState(null);
 
-  const handleStartGame = async (providedApiKey) => {
+  const handleStartGame = (providedApiKey) => {
     setApiKey(providedApiKey);
-    setIsLoading(true);
     setError(null);
 
-    try {
-      // Set API key in service
-      apiService.setApiKey(providedApiKey);
-
-      // Generate initial script with index 1
-      const scriptData = await apiService.generateScript(1);
-
-      setStoryData(scriptData);
-      setIsLoading(false);
-      setGameStarted(true);
-    } catch (error) {
-      console.error('Failed to generate initial script:', error);
-      setError(error.message);
-      setIsLoading(false);
-    }
+    // Set API key in service; GameScreen opens the story connection and
+    // shows the loading screen until the first line of chapter 1 arrives
+    apiService.setApiKey(providedApiKey);
+    setGameStarted(true);
   };
 
+  const handleGameError = useCallback((message) => {
+    console.error('Failed to generate initial script:', message);
+    setError(message);
+    setGameStarted(false);
+  }, []);
+
   return (
     <div className="App">
       {gameStarted ? (
-        <GameScreen storyData={storyData} apiKey={apiKey} />
-      ) : isLoading ? (
-        <LoadingScreen />
+        <GameScreen apiKey={apiKey} onError={handleGameError} />
       ) : (
         <MainScreen onStartGame={handleStartGame} error={error} />
       )}
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import styled from 'styled-components';
 import BackgroundRenderer from './BackgroundRenderer';
 import CharacterDisplay from './CharacterDisplay';
@@ -25,14 +25,20 @@ const CharacterLayer = styled.div`
   z-index: 1;
 `;
 
-const GameScreen = ({ storyData, apiKey }) => {
-  const [currentStoryData, setCurrentStoryData] = useState(storyData);
+const EMPTY_CHAPTER = { scene_background: null, scripts: [] };
+
+const GameScreen = ({ apiKey, onError }) => {
+  const [currentStoryData, setCurrentStoryData] = useState(EMPTY_CHAPTER);
   const [currentScriptIndex, setCurrentScriptIndex] = useState(0);
   const [activeCharacters, setActiveCharacters] = useState({});
   const [currentChapterIndex, setCurrentChapterIndex] = useState(1);
-  const [isLoadingNext, setIsLoadingNext] = useState(false);
-  
+  // True while a chapter is being written; its lines arrive one by one
+  const [isGenerating, setIsGenerating] = useState(true);
+  const storyRef = useRef(null);
+
   const currentScript = currentStoryData?.scripts[currentScriptIndex];
+  // Only wait on the loading screen until the first line of the chapter arrives
+  const isLoadingNext = isGenerating && currentStoryData.scripts.length === 0;
   const isNarrator = currentScript?.role === 'narrator';
   
   // Handle character positioning logic
@@ -90,25 +96,56 @@ const GameScreen = ({ storyData, apiKey }) => {
     }
   }, [currentScriptIndex, currentScript, isNarrator]);
 
-  // Function to load next chapter
-  const loadNextChapter = useCallback(async () => {
-    if (isLoadingNext) return;
-    
-    setIsLoadingNext(true);
+  // Generate a chapter over the story connection, showing its lines as they arrive
+  const loadChapter = useCallback(async (story, index) => {
+    setIsGenerating(true);
+    setCurrentStoryData(EMPTY_CHAPTER);
+    setCurrentScriptIndex(0);
+    setActiveCharacters({}); // Reset characters for new chapter
     try {
-      const nextChapterData = await apiService.generateScript(currentChapterIndex + 1);
-      setCurrentStoryData(nextChapterData);
-      setCurrentScriptIndex(0);
-      setCurrentChapterIndex(prev => prev + 1);
-      setActiveCharacters({}); // Reset characters for new chapter
-      console.log(`Loaded chapter ${currentChapterIndex + 1}`);
+      const chapterData = await story.generate(index);
+      if (storyRef.current !== story) return; // Left the game meanwhile
+      setCurrentStoryData(chapterData); // The saved chapter replaces the streamed lines
+      setCurrentChapterIndex(index);
+      console.log(`Loaded chapter ${index}`);
     } catch (error) {
-      console.error('Failed to load next chapter:', error);
+      if (storyRef.current !== story) return;
+      console.error(`Failed to load chapter ${index}:`, error);
+      if (index === 1) {
+        onError?.(error.message); // Nothing to show yet: back to the main screen
+      }
       // Could show an error message to the user here
     } finally {
-      setIsLoadingNext(false);
+      if (storyRef.current === story) {
+        setIsGenerating(false);
+      }
     }
-  }, [currentChapterIndex, isLoadingNext]);
+  }, [onError]);
+
+  // One connection for the whole game; it starts with a new story
+  useEffect(() => {
+    const story = apiService.openStory(null, {
+      onBackground: (scene) => {
+        setCurrentStoryData(prev => ({ ...prev, scene_background: scene }));
+      },
+      onScript: (line) => {
+        setCurrentStoryData(prev => ({ ...prev, scripts: [...prev.scripts, line] }));
+      },
+      onPrefetched: (index) => console.log(`Chapter ${index} is ready ahead of time`),
+    });
+    storyRef.current = story;
+    loadChapter(story, 1);
+    return () => {
+      storyRef.current = null;
+      story.close();
+    };
+  }, [apiKey, loadChapter]);
+
+  // Function to load next chapter
+  const loadNextChapter = useCallback(async () => {
+    if (isGenerating || !storyRef.current) return;
+    await loadChapter(storyRef.current, currentChapterIndex + 1);
+  }, [currentChapterIndex, isGenerating, loadChapter]);
   
   // Handle click to advance script
   const handleAdvanceScript = useCallback(async () => {
@@ -116,11 +153,12 @@ const GameScreen = ({ storyData, apiKey }) => {
     
     if (currentScriptIndex < currentStoryData.scripts.length - 1) {
       setCurrentScriptIndex(prev => prev + 1);
-    } else {
+    } else if (!isGenerating) {
       // End of current chapter - load next chapter
       await loadNextChapter();
     }
-  }, [currentScriptIndex, currentStoryData, loadNextChapter]);
+    // Otherwise the next line is still being written; it appears on the next click
+  }, [currentScriptIndex, currentStoryData, isGenerating, loadNextChapter]);
   
   // Handle keyboard and mouse input
   useEffect(() => {
@@ -1,5 +1,92 @@
 // API service for communicating with the SYSE backend
 const API_BASE_URL = 'http://localhost:8000';
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, 'ws');
+
+// Persistent connection to /ws/story/{id} over which chapters are generated.
+// The server pushes the scene background and every dialogue line as soon as it is
+// written, so a chapter can be shown before it is complete.
+// handlers: onStoryId(id), onBackground(scene), onScript(line), onProgress(progress),
+// onPrefetched(index), onClose()
+class StoryConnection {
+  constructor(storyId, handlers = {}) {
+    this.storyId = storyId;
+    this.handlers = handlers;
+    this.pending = null; // { resolve, reject } of the chapter being generated
+    this.socket = new WebSocket(`${WS_BASE_URL}/ws/story/${storyId ?? 0}`);
+    this.opened = new Promise((resolve, reject) => {
+      this.socket.onopen = resolve;
+      this.socket.onerror = () => reject(
+        new Error('Failed to connect to backend server. Please ensure the backend is running.')
+      );
+    });
+    this.opened.catch(() => {}); // Reported by generate()
+    this.socket.onmessage = (message) => this.handleEvent(JSON.parse(message.data));
+    this.socket.onclose = () => {
+      this.settle(null, new Error('Connection to the backend server was closed.'));
+      this.handlers.onClose?.();
+    };
+  }
+
+  handleEvent(event) {
+    switch (event.type) {
+      case 'story_id':
+        this.storyId = event.story_id;
+        this.handlers.onStoryId?.(event.story_id);
+        break;
+      case 'scene_background':
+        this.handlers.onBackground?.(event.scene_background);
+        break;
+      case 'script':
+        this.handlers.onScript?.(event.script);
+        break;
+      case 'progress':
+        this.handlers.onProgress?.(event.progress);
+        break;
+      case 'prefetched':
+        this.handlers.onPrefetched?.(event.prefetched.index);
+        break;
+      case 'chapter':
+        this.settle(event.chapter, null);
+        break;
+      case 'error':
+        this.settle(null, new Error(event.detail));
+        break;
+      default:
+        console.warn('Unknown story event:', event);
+    }
+  }
+
+  settle(chapter, error) {
+    const pending = this.pending;
+    this.pending = null;
+    if (!pending) {
+      if (error) console.error('Story connection error:', error);
+      return;
+    }
+    if (error) {
+      pending.reject(error);
+    } else {
+      pending.resolve(chapter);
+    }
+  }
+
+  // Generate chapter `index`; lines arrive through the handlers while it is written.
+  // Resolves with the saved chapter (including story_id).
+  async generate(index) {
+    if (this.pending) {
+      throw new Error('A chapter is already being generated');
+    }
+    await this.opened;
+    return new Promise((resolve, reject) => {
+      this.pending = { resolve, reject };
+      this.socket.send(JSON.stringify({ type: 'generate', index }));
+    });
+  }
+
+  close() {
+    this.socket.close();
+  }
+}
 
 class ApiService {
   constructor() {
@@ -10,13 +97,22 @@ class ApiService {
     this.apiKey = apiKey;
   }
 
-  async generateScript(index) {
+  // Open the story connection; pass null to start a new game.
+  openStory(storyId = null, handlers = {}) {
+    if (!this.apiKey) {
+      throw new Error('API key is required');
+    }
+    return new StoryConnection(storyId, handlers);
+  }
+
+  async generateScript(index, storyId = null) {
     if (!this.apiKey) {
       throw new Error('API key is required');
     }
 
     try {
-      const response = await fetch(`${API_BASE_URL}/generate%20script?index=${index}`, {
+      const storyParam = storyId != null ? `&story_id=${storyId}` : '';
+      const response = await fetch(`${API_BASE_URL}/generate%20script?index=${index}${storyParam}`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -45,6 +141,33 @@ class ApiService {
     }
   }
 
+  // One page of a story's saved chapters, oldest first.
+  // Pass the returned next_cursor as `after` to load the following page (null on the last one).
+  async getChapters(storyId, after = null, limit = 20) {
+    const params = new URLSearchParams({ story_id: storyId, limit });
+    if (after != null) {
+      params.set('after', after);
+    }
+
+    try {
+      const response = await fetch(`${API_BASE_URL}/api/chapters?${params}`, {
+        method: 'GET',
+      });
+
+      if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
+      }
+
+      return await response.json();
+    } catch (error) {
+      if (error.name === 'TypeError' && error.message.includes('fetch')) {
+        throw new Error('Failed to connect to backend server. Please ensure the backend is running.');
+      }
+      throw error;
+    }
+  }
+
   async healthCheck() {
     try {
       const response = await fetch(`${API_BASE_URL}/`, {